@@ -0,0 +1,22 @@
+from django.contrib import admin
+from .models import DailyRouteRollup, DemandSummary, Watermark
+
+
+@admin.register(DailyRouteRollup)
+class DailyRouteRollupAdmin(admin.ModelAdmin):
+    list_display = ['route', 'date', 'departures', 'seats', 'bookings', 'cancellations', 'revenue_mtn', 'revenue_airtel', 'revenue_cash']
+    list_filter = ['route', 'date']
+    date_hierarchy = 'date'
+    readonly_fields = ['updated_at']
+
+
+@admin.register(DemandSummary)
+class DemandSummaryAdmin(admin.ModelAdmin):
+    list_display = ['route', 'weekday', 'departure_time', 'departures', 'bookings', 'load_factor', 'cancellation_rate', 'mean_lead_time_hours']
+    list_filter = ['route', 'weekday']
+    readonly_fields = ['computed_at']
+
+
+@admin.register(Watermark)
+class WatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'value', 'updated_at']
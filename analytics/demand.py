@@ -0,0 +1,152 @@
+"""
+Demand analytics computed in vectorised batches.
+
+Schedule occurrences in the period are loaded once into NumPy column arrays
+and grouped by weekly departure slot (route, weekday, departure time).
+Bookings are then streamed with values_list() in ranges of occurrence ids
+(the bookings (schedule_occurrence, status) index), so memory is bounded by
+the chunk size rather than by the size of the bookings table. Each chunk is
+mapped to its slot with searchsorted() and folded into per-slot counters
+with bincount(); no Python loop runs per booking apart from the column
+transpose. The results replace the DemandSummary table in one transaction.
+"""
+from datetime import datetime, time as dt_time
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from bookings.models import Booking, ScheduleOccurrence
+from .models import LEAD_TIME_EDGES, DemandSummary
+
+SECONDS_PER_DAY = 86400
+SLOT_STRIDE = 7 * SECONDS_PER_DAY
+
+
+def _slot_key(route_id, day, departure_time):
+    seconds = departure_time.hour * 3600 + departure_time.minute * 60 + departure_time.second
+    return route_id * SLOT_STRIDE + day.weekday() * SECONDS_PER_DAY + seconds
+
+
+def _decode_slot(key):
+    route_id, rest = divmod(int(key), SLOT_STRIDE)
+    weekday, seconds = divmod(rest, SECONDS_PER_DAY)
+    return route_id, weekday, dt_time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def load_occurrences(start, end):
+    """Return the period's occurrences as column arrays sorted by id."""
+    rows = list(ScheduleOccurrence.objects.filter(date__range=(start, end)).order_by('id').values_list(
+        'id', 'recurrence__route_id', 'date', 'departure_time', 'recurrence__bus__capacity', 'status'
+    ))
+    ids, route_ids, dates, times, capacities, statuses = zip(*rows) if rows else ((),) * 6
+    return {
+        'id': np.array(ids, dtype=np.int64),
+        'slot': np.array([_slot_key(*key) for key in zip(route_ids, dates, times)], dtype=np.int64),
+        'departure': np.array(
+            [timezone.make_aware(datetime.combine(day, at)).timestamp() for day, at in zip(dates, times)],
+            dtype=np.float64
+        ),
+        'capacity': np.array(capacities, dtype=np.int64),
+        'active': np.array(statuses, dtype=object) != 'cancelled',
+    }
+
+
+def iter_booking_chunks(occurrence_ids, chunk_size):
+    """Yield (occurrence_id, status, created_at epoch) arrays per range of occurrences."""
+    for start in range(0, len(occurrence_ids), chunk_size):
+        chunk = occurrence_ids[start:start + chunk_size]
+        rows = list(Booking.objects.filter(
+            schedule_occurrence_id__gte=int(chunk[0]),
+            schedule_occurrence_id__lte=int(chunk[-1])
+        ).order_by().values_list('schedule_occurrence_id', 'status', 'created_at'))
+        if not rows:
+            continue
+        occurrence, status, created = zip(*rows)
+        yield (
+            np.array(occurrence, dtype=np.int64),
+            np.array(status, dtype=object),
+            np.fromiter((value.timestamp() for value in created), dtype=np.float64, count=len(created)),
+        )
+
+
+def compute_demand(start, end, chunk_size=2000):
+    """
+    Compute per-slot demand figures for travel dates in [start, end].
+
+    Returns (summaries, stats) where summaries are unsaved DemandSummary rows.
+    """
+    occurrences = load_occurrences(start, end)
+    slots, occurrence_slot = np.unique(occurrences['slot'], return_inverse=True)
+    groups = len(slots)
+    buckets = len(LEAD_TIME_EDGES)
+
+    active = occurrences['active']
+    departures = np.bincount(occurrence_slot[active], minlength=groups)
+    seats = np.bincount(occurrence_slot[active], weights=occurrences['capacity'][active], minlength=groups)
+
+    confirmed = np.zeros(groups, dtype=np.int64)
+    cancelled = np.zeros(groups, dtype=np.int64)
+    total = np.zeros(groups, dtype=np.int64)
+    lead_sum = np.zeros(groups, dtype=np.float64)
+    histogram = np.zeros(groups * buckets, dtype=np.int64)
+    processed = 0
+
+    ids = occurrences['id']
+    for booking_occurrence, status, created in iter_booking_chunks(ids, chunk_size):
+        # Occurrence id ranges interleave with other dates; keep only this period's
+        position = np.searchsorted(ids, booking_occurrence)
+        in_period = position < len(ids)
+        in_period[in_period] &= ids[position[in_period]] == booking_occurrence[in_period]
+        position, status, created = position[in_period], status[in_period], created[in_period]
+
+        slot = occurrence_slot[position]
+        lead_hours = np.clip((occurrences['departure'][position] - created) / 3600, 0, None)
+        bucket = np.digitize(lead_hours, LEAD_TIME_EDGES[1:])
+
+        confirmed += np.bincount(slot[status == 'confirmed'], minlength=groups)
+        cancelled += np.bincount(slot[status == 'cancelled'], minlength=groups)
+        total += np.bincount(slot, minlength=groups)
+        lead_sum += np.bincount(slot, weights=lead_hours, minlength=groups)
+        histogram += np.bincount(slot * buckets + bucket, minlength=groups * buckets)
+        processed += len(slot)
+
+    histogram = histogram.reshape(groups, buckets)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        load_factor = np.where(seats > 0, confirmed / seats, 0.0)
+        cancellation_rate = np.where(total > 0, cancelled / total, 0.0)
+        mean_lead = np.where(total > 0, lead_sum / total, np.nan)
+
+    computed_at = timezone.now()
+    summaries = []
+    for index, key in enumerate(slots):
+        route_id, weekday, departure_time = _decode_slot(key)
+        summaries.append(DemandSummary(
+            route_id=route_id,
+            weekday=weekday,
+            departure_time=departure_time,
+            period_start=start,
+            period_end=end,
+            departures=int(departures[index]),
+            seats=int(seats[index]),
+            bookings=int(confirmed[index]),
+            cancellations=int(cancelled[index]),
+            total_bookings=int(total[index]),
+            load_factor=round(float(load_factor[index]), 4),
+            cancellation_rate=round(float(cancellation_rate[index]), 4),
+            mean_lead_time_hours=None if np.isnan(mean_lead[index]) else round(float(mean_lead[index]), 2),
+            lead_time_histogram=histogram[index].tolist(),
+            computed_at=computed_at,
+        ))
+
+    stats = {'occurrences': len(ids), 'bookings': processed, 'slots': groups}
+    return summaries, stats
+
+
+def refresh_demand_summaries(start, end, chunk_size=2000):
+    """Recompute and replace the DemandSummary table; returns the run stats."""
+    summaries, stats = compute_demand(start, end, chunk_size)
+    with transaction.atomic():
+        DemandSummary.objects.all().delete()
+        DemandSummary.objects.bulk_create(summaries, batch_size=1000)
+    return stats
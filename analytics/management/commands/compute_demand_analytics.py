@@ -0,0 +1,51 @@
+"""
+Management command to recompute the demand summaries (load factor,
+cancellation rate and booking lead times per route, weekday and departure
+time). Bookings are streamed in chunks and aggregated with NumPy, so a run
+over millions of bookings takes seconds. Run it nightly (via cron).
+"""
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from analytics.demand import refresh_demand_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recomputes per-route, per-weekday, per-departure demand summaries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Number of travel days to analyse, ending at --end (default: 90)',
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            default=None,
+            help='Last travel date to include, YYYY-MM-DD (default: today)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Schedule occurrences whose bookings are fetched per query (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--days and --chunk-size must be positive')
+        
+        end = options['end'] or date.today()
+        start = end - timedelta(days=options['days'] - 1)
+        self.stdout.write(f'Computing demand summaries for {start} to {end}...')
+        
+        started = time.perf_counter()
+        stats = refresh_demand_summaries(start, end, chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Summarised {stats['bookings']} bookings on {stats['occurrences']} departures "
+            f"into {stats['slots']} slots in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,33 @@
+"""
+Management command to bring the daily route rollups up to date.
+Only (route, date) pairs with bookings, payments or schedules changed since
+the last run are recomputed. Run it every few minutes (via cron).
+"""
+import time
+from django.core.management.base import BaseCommand
+from analytics.rollups import update_rollups
+
+
+class Command(BaseCommand):
+    help = 'Updates the per-route daily rollups used by the admin dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every route and date instead of only changed ones',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rollup rows recomputed per transaction (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        updated = update_rollups(full=options['full'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Updated {updated} daily rollups in {elapsed:.2f}s')
+        )
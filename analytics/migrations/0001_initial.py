@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('routes', '0002_route_fare'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'analytics_watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRouteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('departures', models.PositiveIntegerField(default=0)),
+                ('seats', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('cancellations', models.PositiveIntegerField(default=0)),
+                ('revenue_mtn', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue_airtel', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue_cash', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='routes.route')),
+            ],
+            options={
+                'db_table': 'analytics_daily_route_rollups',
+                'indexes': [models.Index(fields=['date'], name='analytics_d_date_409223_idx')],
+                'unique_together': {('route', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0002_route_fare'),
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('departure_time', models.TimeField()),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('departures', models.PositiveIntegerField(default=0)),
+                ('seats', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('cancellations', models.PositiveIntegerField(default=0)),
+                ('total_bookings', models.PositiveIntegerField(default=0)),
+                ('load_factor', models.FloatField(default=0)),
+                ('cancellation_rate', models.FloatField(default=0)),
+                ('mean_lead_time_hours', models.FloatField(blank=True, null=True)),
+                ('lead_time_histogram', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField()),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_summaries', to='routes.route')),
+            ],
+            options={
+                'db_table': 'analytics_demand_summaries',
+                'unique_together': {('route', 'weekday', 'departure_time')},
+            },
+        ),
+    ]
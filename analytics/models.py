@@ -0,0 +1,87 @@
+import calendar
+
+from django.db import models
+from routes.models import Route
+
+# Lead-time histogram bucket edges in hours; the last bucket is open-ended
+LEAD_TIME_EDGES = [0, 1, 3, 6, 12, 24, 48, 72, 168, 336, 720]
+
+
+class DailyRouteRollup(models.Model):
+    """Pre-aggregated bookings, cancellations and revenue for a route on one travel date."""
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    departures = models.PositiveIntegerField(default=0)
+    seats = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+    revenue_mtn = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revenue_airtel = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revenue_cash = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'analytics_daily_route_rollups'
+        unique_together = [['route', 'date']]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.route.name} - {self.date}"
+    
+    @property
+    def load_factor(self):
+        """Confirmed bookings as a fraction of the seats offered."""
+        return self.bookings / self.seats if self.seats else 0.0
+    
+    @property
+    def revenue(self):
+        return self.revenue_mtn + self.revenue_airtel + self.revenue_cash
+
+
+class Watermark(models.Model):
+    """Point in time up to which an incremental analytics job has processed changes."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'analytics_watermarks'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
+
+
+class DemandSummary(models.Model):
+    """Load factor, cancellation rate and booking lead times for a route's weekly departure slot."""
+    WEEKDAY_CHOICES = list(enumerate(calendar.day_name))
+    
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='demand_summaries')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    departure_time = models.TimeField()
+    period_start = models.DateField()
+    period_end = models.DateField()
+    departures = models.PositiveIntegerField(default=0)
+    seats = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+    total_bookings = models.PositiveIntegerField(default=0)
+    load_factor = models.FloatField(default=0)
+    cancellation_rate = models.FloatField(default=0)
+    mean_lead_time_hours = models.FloatField(blank=True, null=True)
+    lead_time_histogram = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'analytics_demand_summaries'
+        unique_together = [['route', 'weekday', 'departure_time']]
+    
+    def __str__(self):
+        return f"{self.route.name} - {self.get_weekday_display()} {self.departure_time}"
+    
+    def lead_time_distribution(self):
+        """Map bucket labels ('0-1h', ..., '720h+') to booking counts."""
+        labels = [f'{low}-{high}h' for low, high in zip(LEAD_TIME_EDGES, LEAD_TIME_EDGES[1:])]
+        labels.append(f'{LEAD_TIME_EDGES[-1]}h+')
+        return dict(zip(labels, self.lead_time_histogram))
@@ -0,0 +1,141 @@
+"""
+Incremental daily route rollups.
+
+DailyRouteRollup holds one row per route and travel date with the figures
+the admin dashboard shows, so the dashboard never aggregates the bookings
+or payment_transactions tables. update_rollups() finds the (route, date)
+pairs whose schedule occurrences, bookings or payment transactions changed
+since the stored watermark and recomputes just those rows from the source
+tables. Recomputing a pair is idempotent, so each run re-reads the last
+ANALYTICS_ROLLUP_OVERLAP_SECONDS before the watermark to catch rows whose
+transactions committed after the previous run had read past them.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from bookings.models import Booking, ScheduleOccurrence
+from payments.models import PaymentTransaction
+from travel_suite.db.routers import reset_pin, restore_pin
+from .models import DailyRouteRollup, Watermark
+
+WATERMARK_NAME = 'daily_route_rollups'
+REVENUE_FIELDS = {
+    'mtn': 'revenue_mtn',
+    'airtel': 'revenue_airtel',
+    'cash': 'revenue_cash',
+}
+ROLLUP_FIELDS = ['departures', 'seats', 'bookings', 'cancellations', *REVENUE_FIELDS.values()]
+
+
+def changed_route_days(since, until):
+    """Return the (route_id, date) pairs with source rows updated in (since, until]."""
+    window = {'updated_at__lte': until}
+    if since is not None:
+        window['updated_at__gt'] = since
+
+    keys = set(ScheduleOccurrence.objects.filter(**window).values_list(
+        'recurrence__route_id', 'date'
+    ).distinct())
+    keys.update(Booking.objects.filter(**window).values_list(
+        'schedule_occurrence__recurrence__route_id', 'schedule_occurrence__date'
+    ).distinct())
+    keys.update(PaymentTransaction.objects.filter(**window).values_list(
+        'booking__schedule_occurrence__recurrence__route_id', 'booking__schedule_occurrence__date'
+    ).distinct())
+    return keys
+
+
+def compute_rollups(keys):
+    """Aggregate the source tables for the given (route_id, date) pairs."""
+    rows = {key: dict.fromkeys(ROLLUP_FIELDS, 0) for key in keys}
+    route_ids = {route_id for route_id, _ in rows}
+    dates = {day for _, day in rows}
+
+    occurrences = ScheduleOccurrence.objects.filter(
+        recurrence__route_id__in=route_ids,
+        date__in=dates
+    ).exclude(status='cancelled').values_list('recurrence__route_id', 'date').annotate(
+        departures=Count('id'),
+        seats=Sum('recurrence__bus__capacity')
+    ).order_by()
+    for route_id, day, departures, seats in occurrences:
+        if (route_id, day) in rows:
+            rows[(route_id, day)].update(departures=departures, seats=seats or 0)
+
+    bookings = Booking.objects.filter(
+        schedule_occurrence__recurrence__route_id__in=route_ids,
+        schedule_occurrence__date__in=dates
+    ).values_list('schedule_occurrence__recurrence__route_id', 'schedule_occurrence__date').annotate(
+        confirmed=Count('id', filter=Q(status='confirmed')),
+        cancelled=Count('id', filter=Q(status='cancelled'))
+    ).order_by()
+    for route_id, day, confirmed, cancelled in bookings:
+        if (route_id, day) in rows:
+            rows[(route_id, day)].update(bookings=confirmed, cancellations=cancelled)
+
+    revenue = PaymentTransaction.objects.filter(
+        status='completed',
+        booking__schedule_occurrence__recurrence__route_id__in=route_ids,
+        booking__schedule_occurrence__date__in=dates
+    ).values_list(
+        'booking__schedule_occurrence__recurrence__route_id', 'booking__schedule_occurrence__date', 'provider'
+    ).annotate(total=Sum('amount')).order_by()
+    for route_id, day, provider, total in revenue:
+        if (route_id, day) in rows and provider in REVENUE_FIELDS:
+            rows[(route_id, day)][REVENUE_FIELDS[provider]] = total
+
+    return rows
+
+
+def save_rollups(rows):
+    """Insert or overwrite rollup rows keyed by (route_id, date)."""
+    # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target (it fires on
+    # any unique key, here only (route, date)); PostgreSQL and SQLite need one
+    features = connections[router.db_for_write(DailyRouteRollup)].features
+    unique_fields = ['route', 'date'] if features.supports_update_conflicts_with_target else None
+    DailyRouteRollup.objects.bulk_create(
+        [
+            DailyRouteRollup(route_id=route_id, date=day, **values)
+            for (route_id, day), values in rows.items()
+        ],
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=ROLLUP_FIELDS + ['updated_at']
+    )
+
+
+def update_rollups(full=False, batch_size=500):
+    """
+    Bring the rollups up to date and advance the watermark.
+
+    With full=True every (route, date) pair is recomputed. Returns the
+    number of rollup rows rewritten.
+    """
+    # Read from the primary: a lagging replica would let the watermark skip rows
+    token = reset_pin(True)
+    try:
+        until = timezone.now()
+        watermark = Watermark.objects.filter(name=WATERMARK_NAME).first()
+        since = None
+        if watermark is not None and not full:
+            since = watermark.value - timedelta(seconds=settings.ANALYTICS_ROLLUP_OVERLAP_SECONDS)
+
+        keys = sorted(changed_route_days(since, until))
+        for start in range(0, len(keys), batch_size):
+            with transaction.atomic():
+                save_rollups(compute_rollups(keys[start:start + batch_size]))
+
+        Watermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'value': until})
+        return len(keys)
+    finally:
+        restore_pin(token)
+
+
+def last_updated():
+    """Return when the rollups were last brought up to date, or None."""
+    watermark = Watermark.objects.filter(name=WATERMARK_NAME).first()
+    return watermark.value if watermark else None
@@ -0,0 +1,100 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+
+from routes.models import District, Route
+from buses.models import Bus
+from bookings.models import ScheduleRecurrence, ScheduleOccurrence, Booking
+from payments.models import PaymentTransaction
+from analytics.models import DailyRouteRollup, DemandSummary
+from analytics.rollups import save_rollups, update_rollups
+from analytics.demand import refresh_demand_summaries
+
+
+class AnalyticsTest(TestCase):
+    """Test the rollup and demand analytics jobs."""
+    
+    def setUp(self):
+        origin = District.objects.create(name="Kigali", code="KG")
+        destination = District.objects.create(name="Huye", code="HU")
+        self.route = Route.objects.create(name="Kigali - Huye", origin=origin, destination=destination, distance_km=130)
+        bus = Bus.objects.create(plate_number="RAC001A", capacity=4)
+        recurrence = ScheduleRecurrence.objects.create(
+            route=self.route,
+            bus=bus,
+            departure_time=time(8, 0),
+            arrival_time=time(11, 0)
+        )
+        self.day = date.today() + timedelta(days=1)
+        self.occurrence = ScheduleOccurrence.objects.create(
+            recurrence=recurrence,
+            date=self.day,
+            departure_time=time(8, 0),
+            arrival_time=time(11, 0)
+        )
+    
+    def book(self, booking_status, provider, amount):
+        booking = Booking.objects.create(
+            passenger_name="Passenger",
+            phone_number="+250788123456",
+            schedule_occurrence=self.occurrence,
+            payment_method=provider,
+            status=booking_status
+        )
+        PaymentTransaction.objects.create(booking=booking, provider=provider, amount=amount, status='completed')
+        return booking
+    
+    def test_incremental_update(self):
+        """Test rollups pick up new and changed bookings."""
+        self.book('confirmed', 'mtn', Decimal('5000'))
+        self.book('confirmed', 'cash', Decimal('5000'))
+        update_rollups()
+        
+        rollup = DailyRouteRollup.objects.get(route=self.route, date=self.day)
+        self.assertEqual(rollup.departures, 1)
+        self.assertEqual(rollup.bookings, 2)
+        self.assertEqual(rollup.load_factor, 0.5)
+        self.assertEqual(rollup.revenue_mtn, Decimal('5000'))
+        self.assertEqual(rollup.revenue, Decimal('10000'))
+        
+        cancelled = Booking.objects.filter(payment_method='cash').get()
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        cancelled.payment_transaction.status = 'refunded'
+        cancelled.payment_transaction.save()
+        update_rollups()
+        
+        rollup.refresh_from_db()
+        self.assertEqual(rollup.bookings, 1)
+        self.assertEqual(rollup.cancellations, 1)
+        self.assertEqual(rollup.revenue_cash, Decimal('0'))
+    
+    def test_save_rollups_without_conflict_target(self):
+        """Test the upsert names no conflict target on backends that reject one (MySQL)."""
+        rows = {(self.route.id, self.day): {'departures': 1}}
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                mock.patch.object(DailyRouteRollup.objects, 'bulk_create') as bulk_create:
+            save_rollups(rows)
+        self.assertIsNone(bulk_create.call_args.kwargs['unique_fields'])
+        self.assertTrue(bulk_create.call_args.kwargs['update_conflicts'])
+        
+        if connection.features.supports_update_conflicts_with_target:
+            save_rollups(rows)
+            self.assertEqual(DailyRouteRollup.objects.get(route=self.route, date=self.day).departures, 1)
+    
+    def test_demand_summary(self):
+        """Test demand figures per weekly departure slot."""
+        self.book('confirmed', 'mtn', Decimal('5000'))
+        self.book('cancelled', 'mtn', Decimal('5000'))
+        stats = refresh_demand_summaries(self.day, self.day, chunk_size=1)
+        
+        self.assertEqual(stats['bookings'], 2)
+        summary = DemandSummary.objects.get()
+        self.assertEqual(summary.weekday, self.day.weekday())
+        self.assertEqual(summary.departure_time, time(8, 0))
+        self.assertEqual(summary.load_factor, 0.25)
+        self.assertEqual(summary.cancellation_rate, 0.5)
+        self.assertEqual(sum(summary.lead_time_histogram), 2)
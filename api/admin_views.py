@@ -10,20 +10,26 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
 from django.db import transaction
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from datetime import date, time
+from django.db.models import Sum
+from datetime import date, time, timedelta
 
 from routes.models import District, Route
 from buses.models import Bus
-from bookings.models import ScheduleRecurrence, ScheduleOccurrence, Booking
+from bookings.models import ScheduleRecurrence, ScheduleOccurrence, Booking, ArchivedBooking
+from bookings.archive import includes_archive
 from operators.models import OperatorUser, OperatorAssignment
+from operators.access import invalidate_operator_access
 from payments.models import PaymentTransaction, Refund
 from accounts.models import User
+from monitoring.profiling import list_profiles, profile_path, render_profile_stats
+from analytics.models import DailyRouteRollup, DemandSummary
+from analytics.rollups import ROLLUP_FIELDS, last_updated
 
 from .serializers import (
     DistrictSerializer, RouteSerializer, BusSerializer,
-    ScheduleOccurrenceSerializer, BookingSerializer, ScheduleRecurrenceSerializer
+    ScheduleOccurrenceSerializer, BookingSerializer, ScheduleRecurrenceSerializer, ArchivedBookingSerializer
 )
 
 
@@ -295,19 +301,186 @@ def admin_schedule_recurrence_detail(request, pk):
 @authentication_classes([SessionAuthentication])
 @api_view(['GET'])
 def admin_bookings(request):
-    """List all bookings."""
+    """
+    List all bookings, or with ?start= and/or ?end= those departing in that
+    date range. Ranges starting before the archive cutoff also list the
+    bookings of archived departures, after the live ones.
+    """
     if not request.user.is_authenticated:
         return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
     if not (request.user.is_staff or request.user.is_superuser):
         return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
     
+    try:
+        start = date.fromisoformat(request.query_params['start']) if 'start' in request.query_params else None
+        end = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else None
+    except ValueError:
+        return Response({'error': 'start and end must be dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+    filters = {}
+    if start:
+        filters['schedule_occurrence__date__gte'] = start
+    if end:
+        filters['schedule_occurrence__date__lte'] = end
+    
     bookings = Booking.objects.select_related(
         'schedule_occurrence__recurrence__route',
         'schedule_occurrence__recurrence__bus'
-    ).all().order_by('-created_at')
+    ).filter(**filters).order_by('-created_at')
+    
+    data = BookingSerializer(bookings, many=True).data
+    if start and includes_archive(start):
+        archived = ArchivedBooking.objects.select_related(
+            'schedule_occurrence__recurrence__route__origin',
+            'schedule_occurrence__recurrence__route__destination',
+            'schedule_occurrence__recurrence__bus'
+        ).filter(**filters).order_by('-created_at')
+        data += ArchivedBookingSerializer(archived, many=True).data
+    return Response(data)
+
+
+# Request Profiles
+@csrf_exempt
+@authentication_classes([SessionAuthentication])
+@api_view(['GET'])
+def admin_profiles(request):
+    """List the slowest stored request profiles."""
+    if not request.user.is_authenticated:
+        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    if not (request.user.is_staff or request.user.is_superuser):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(list_profiles(limit))
+
+
+@csrf_exempt
+@authentication_classes([SessionAuthentication])
+@api_view(['GET'])
+def admin_profile_download(request, name):
+    """Download a stored profile (.prof), or a pstats text report with ?stats=<sort>."""
+    if not request.user.is_authenticated:
+        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    if not (request.user.is_staff or request.user.is_superuser):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
     
-    serializer = BookingSerializer(bookings, many=True)
-    return Response(serializer.data)
+    path = profile_path(name)
+    if path is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    sort = request.query_params.get('stats')
+    if sort:
+        if sort not in ('cumulative', 'tottime', 'calls'):
+            return Response({'error': 'stats must be cumulative, tottime or calls'}, status=status.HTTP_400_BAD_REQUEST)
+        return HttpResponse(render_profile_stats(name, sort=sort), content_type='text/plain; charset=utf-8')
+    
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{name}.prof')
+
+
+# Analytics
+def _rollup_figures(row):
+    """Shape summed rollup columns for the dashboard."""
+    revenue = {
+        'mtn': row['revenue_mtn'] or 0,
+        'airtel': row['revenue_airtel'] or 0,
+        'cash': row['revenue_cash'] or 0,
+    }
+    revenue['total'] = sum(revenue.values())
+    seats = row['seats'] or 0
+    bookings = row['bookings'] or 0
+    return {
+        'departures': row['departures'] or 0,
+        'seats': seats,
+        'bookings': bookings,
+        'cancellations': row['cancellations'] or 0,
+        'revenue': revenue,
+        'load_factor': round(bookings / seats, 4) if seats else 0.0,
+    }
+
+
+@csrf_exempt
+@authentication_classes([SessionAuthentication])
+@api_view(['GET'])
+def admin_analytics(request):
+    """
+    Bookings, cancellations, revenue and load factor from the daily rollups.
+    
+    ?start=&end= (ISO dates, default the last 30 days) select travel dates;
+    figures are returned as totals, per day and per route.
+    """
+    if not request.user.is_authenticated:
+        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    if not (request.user.is_staff or request.user.is_superuser):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        end = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else date.today()
+        start = date.fromisoformat(request.query_params['start']) if 'start' in request.query_params else end - timedelta(days=29)
+    except ValueError:
+        return Response({'error': 'start and end must be dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    rollups = DailyRouteRollup.objects.filter(date__range=(start, end))
+    sums = {field: Sum(field) for field in ROLLUP_FIELDS}
+    
+    daily = rollups.values('date').annotate(**sums).order_by('date')
+    routes = rollups.values('route_id', 'route__name').annotate(**sums).order_by('route__name')
+    
+    return Response({
+        'start': start,
+        'end': end,
+        'last_updated': last_updated(),
+        'totals': _rollup_figures(rollups.aggregate(**sums)),
+        'daily': [{'date': row['date'], **_rollup_figures(row)} for row in daily],
+        'routes': [
+            {'route_id': row['route_id'], 'route_name': row['route__name'], **_rollup_figures(row)}
+            for row in routes
+        ],
+    })
+
+
+@csrf_exempt
+@authentication_classes([SessionAuthentication])
+@api_view(['GET'])
+def admin_demand_summaries(request):
+    """Demand per route, weekday and departure time from the last compute_demand_analytics run."""
+    if not request.user.is_authenticated:
+        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    if not (request.user.is_staff or request.user.is_superuser):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    summaries = DemandSummary.objects.select_related('route').order_by('route__name', 'weekday', 'departure_time')
+    try:
+        if 'route_id' in request.query_params:
+            summaries = summaries.filter(route_id=int(request.query_params['route_id']))
+        if 'weekday' in request.query_params:
+            summaries = summaries.filter(weekday=int(request.query_params['weekday']))
+    except ValueError:
+        return Response({'error': 'route_id and weekday must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response([{
+        'route_id': summary.route_id,
+        'route_name': summary.route.name,
+        'weekday': summary.weekday,
+        'weekday_name': summary.get_weekday_display(),
+        'departure_time': summary.departure_time,
+        'period_start': summary.period_start,
+        'period_end': summary.period_end,
+        'departures': summary.departures,
+        'seats': summary.seats,
+        'bookings': summary.bookings,
+        'cancellations': summary.cancellations,
+        'total_bookings': summary.total_bookings,
+        'load_factor': summary.load_factor,
+        'cancellation_rate': summary.cancellation_rate,
+        'mean_lead_time_hours': summary.mean_lead_time_hours,
+        'lead_time_histogram': summary.lead_time_distribution(),
+        'computed_at': summary.computed_at,
+    } for summary in summaries])
 
 
 # Operator Management
@@ -398,7 +571,7 @@ def admin_operator_assignments(request):
         return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
     
     if request.method == 'GET':
-        assignments = OperatorAssignment.objects.select_related('operator', 'route').all()
+        assignments = OperatorAssignment.objects.select_related('operator', 'route').filter(is_active=True)
         data = []
         for assignment in assignments:
             data.append({
@@ -427,6 +600,7 @@ def admin_operator_assignments(request):
         if not created:
             assignment.is_active = True
             assignment.save()
+        invalidate_operator_access(operator.id)
         
         return Response({
             'id': assignment.id,
@@ -439,13 +613,20 @@ def admin_operator_assignments(request):
 @authentication_classes([SessionAuthentication])
 @api_view(['DELETE'])
 def admin_operator_assignment_detail(request, pk):
-    """Delete an operator assignment."""
+    """
+    Remove an operator assignment.
+    
+    The row is deactivated rather than deleted, so the next delta sync
+    (api/sync_views.py) can tell the operator's devices the route was removed.
+    """
     if not request.user.is_authenticated:
         return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
     if not (request.user.is_staff or request.user.is_superuser):
         return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
     
-    assignment = get_object_or_404(OperatorAssignment, pk=pk)
-    assignment.delete()
+    assignment = get_object_or_404(OperatorAssignment, pk=pk, is_active=True)
+    assignment.is_active = False
+    assignment.save(update_fields=['is_active', 'updated_at'])
+    invalidate_operator_access(assignment.operator_id)
     return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -0,0 +1,258 @@
+"""
+Async (ASGI) versions of the schedule listing and booking create/status endpoints.
+
+DRF 3.14 views are synchronous, so these are plain Django async views
+returning JsonResponse, served under /api/async/. Run under an ASGI server
+(uvicorn travel_suite.asgi:application), a request waiting on the database
+or a payment provider yields the event loop instead of pinning a worker
+thread. Under WSGI they still work, one request per thread.
+
+Reads use the async ORM. Serializers and transactions are synchronous and
+run through sync_to_async. The async ORM has no transactions, so booking
+runs in three steps instead of one long transaction:
+    1. a short transaction locks the departure, assigns the seat and saves a
+       pending booking whose hold (bookings/holds.py) protects the seat;
+    2. the provider is charged with the adapters' async methods, with no
+       transaction or row lock held;
+    3. a second short transaction confirms the booking, or expires it and
+       frees the seat.
+Notifications are sent after commit by the background notifier.
+"""
+import json
+import time
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.utils import timezone
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from bookings.models import Booking, ScheduleOccurrence
+from bookings.seats import assign_seats, release_seats, SeatUnavailable
+from bookings.fares import QuoteInvalid, booking_fare
+from bookings.holds import hold_expiry
+from payments.models import PaymentTransaction
+from payments.registry import get_adapter
+from payments.refunds import queue_refund
+from payments.events import payment_event, record_events
+from payments.resilience import ProviderUnavailable
+from notifications.email import defer_notifications
+from monitoring.metrics import BOOKINGS_CREATED, SEAT_LOCK_WAIT
+
+from .serializers import (
+    ScheduleOccurrenceSerializer, BookingSerializer, BookingCreateSerializer, BookingStatusSerializer
+)
+from .idempotency import aidempotent
+from .views import schedule_queryset
+
+def _error(message, status_code):
+    return JsonResponse({'error': message}, status=status_code)
+
+
+def _csrf_exempt(view):
+    # django.views.decorators.csrf.csrf_exempt wraps views in a sync
+    # function before Django 5.0, which would hide the coroutine.
+    view.csrf_exempt = True
+    return view
+
+
+def _page_url(request, page, last_page):
+    url = request.build_absolute_uri()
+    if page < 1 or page > last_page:
+        return None
+    if page == 1:
+        return remove_query_param(url, 'page')
+    return replace_query_param(url, 'page', page)
+
+
+async def schedule_list(request):
+    """Async GET /api/async/schedules/ - same filters and page format as /api/schedules/."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    queryset = schedule_queryset(request.GET, upcoming=True)
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    count = await queryset.acount()
+    last_page = max(1, -(-count // page_size))
+    if page < 1 or page > last_page:
+        return JsonResponse({'detail': 'Invalid page.'}, status=404)
+
+    offset = (page - 1) * page_size
+    occurrences = [occurrence async for occurrence in queryset[offset:offset + page_size]]
+    results = await sync_to_async(lambda: ScheduleOccurrenceSerializer(occurrences, many=True).data)()
+    return JsonResponse({
+        'count': count,
+        'next': _page_url(request, page + 1, last_page),
+        'previous': _page_url(request, page - 1, last_page),
+        'results': results,
+    })
+
+
+async def booking_status(request, pk):
+    """Async GET /api/async/bookings/<id>/status/."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    booking = await Booking.objects.select_related(
+        'schedule_occurrence__recurrence__route__origin',
+        'schedule_occurrence__recurrence__route__destination',
+        'schedule_occurrence__recurrence__bus'
+    ).filter(pk=pk).afirst()
+    if booking is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    data = await sync_to_async(lambda: BookingStatusSerializer(booking).data)()
+    return JsonResponse(data)
+
+
+@transaction.atomic
+def _reserve(data):
+    """Step 1: hold a seat with a pending booking. Returns (booking, fare) or an error response."""
+    lock_started = time.perf_counter()
+    schedule_occurrence = ScheduleOccurrence.objects.select_for_update().select_related(
+        'recurrence__route',
+        'recurrence__bus'
+    ).filter(id=data['schedule_occurrence_id'], status='scheduled').first()
+    SEAT_LOCK_WAIT.observe(time.perf_counter() - lock_started)
+    if schedule_occurrence is None:
+        return None, _error('Schedule not found', 404)
+
+    now = timezone.now()
+    departure_datetime = timezone.make_aware(
+        datetime.combine(schedule_occurrence.date, schedule_occurrence.departure_time)
+    )
+    if departure_datetime <= now:
+        return None, _error('Cannot book for a schedule that has already departed', 400)
+    if schedule_occurrence.remaining_seats <= 0:
+        return None, JsonResponse({'error': 'No seats available for this schedule', 'waitlist': True}, status=400)
+
+    try:
+        fare = booking_fare(schedule_occurrence, data.get('quote'))
+    except QuoteInvalid as e:
+        return None, _error(str(e), 400)
+
+    requested_seat = data.get('seat_number')
+    try:
+        seat_number = assign_seats(
+            schedule_occurrence,
+            requested=[requested_seat] if requested_seat else None
+        )[0]
+    except SeatUnavailable as e:
+        return None, _error(str(e), 400)
+
+    booking = Booking.objects.create(
+        passenger_name=data['passenger_name'],
+        phone_number=data['phone_number'],
+        email=data.get('email'),
+        schedule_occurrence=schedule_occurrence,
+        payment_method=data['payment_method'],
+        status='pending',
+        seat_number=seat_number,
+        hold_expires_at=hold_expiry(now)
+    )
+    return (booking, fare), None
+
+
+@transaction.atomic
+def _settle(booking_id, amount, payment_result, paid, calls=()):
+    """Step 3: record the payment (and the provider calls made) and confirm or expire the booking."""
+    booking = Booking.objects.select_for_update().get(pk=booking_id)
+    schedule_occurrence = ScheduleOccurrence.objects.select_related(
+        'recurrence__route__origin',
+        'recurrence__route__destination',
+        'recurrence__bus'
+    ).get(id=booking.schedule_occurrence_id)
+    booking.schedule_occurrence = schedule_occurrence
+
+    # The hold worker may have expired the booking while the provider was slow
+    held = booking.status == 'pending'
+    payment_transaction = PaymentTransaction.objects.create(
+        provider=booking.payment_method,
+        provider_transaction_id=payment_result.get('transaction_id'),
+        amount=amount,
+        status='completed' if paid else 'failed',
+        idempotency_key=str(booking.id),
+        booking=booking
+    )
+    if calls:
+        record_events([
+            payment_event(operation, result, payment_transaction=payment_transaction)
+            for operation, result in calls
+        ])
+
+    if not paid:
+        if held:
+            booking.status = 'expired'
+            booking.save()
+            release_seats(schedule_occurrence.id, [booking.seat_number], reason='payment_failed')
+        return None, _error('Payment verification failed', 402)
+    if not held:
+        # The seat was released while the provider was charging; give the money back
+        response = {'error': 'The seat hold expired before payment completed'}
+        if get_adapter(booking.payment_method).supports_refunds:
+            response['refund_status'] = queue_refund(payment_transaction).status
+        return None, JsonResponse(response, status=409)
+
+    booking.status = 'confirmed'
+    booking.save()
+    BOOKINGS_CREATED.inc(
+        route=schedule_occurrence.recurrence.route.name,
+        payment_method=booking.payment_method
+    )
+    defer_notifications([booking])
+    return BookingSerializer(booking).data, None
+
+
+@_csrf_exempt
+@aidempotent
+async def booking_create(request):
+    """Async POST /api/async/bookings/ - same request and response as POST /api/bookings/."""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return _error('Request body must be JSON', 400)
+    serializer = BookingCreateSerializer(data=payload)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    data = serializer.validated_data
+
+    reserved, error = await sync_to_async(_reserve)(data)
+    if error is not None:
+        return error
+    booking, fare = reserved
+
+    # If the provider call raises, the booking stays pending and the hold
+    # worker frees the seat when the hold expires.
+    amount = float(fare)
+    adapter = get_adapter(booking.payment_method)
+    try:
+        payment_result = await adapter.acreate_payment(
+            phone_number=booking.phone_number,
+            amount=amount,
+            idempotency_key=str(booking.id)
+        )
+    except ProviderUnavailable as e:
+        # The provider was never contacted; free the seat straight away
+        await sync_to_async(_settle)(booking.id, amount, {}, False)
+        response = _error(str(e.detail), e.status_code)
+        response['Retry-After'] = str(e.wait)
+        return response
+    calls = [('create', payment_result)] if adapter.external else []
+    paid = bool(payment_result.get('success'))
+    if paid and adapter.supports_async_confirmation:
+        verify_result = await adapter.averify_payment(payment_result['transaction_id'])
+        calls.append(('verify', verify_result))
+        paid = verify_result['success'] and verify_result['status'] == 'completed'
+
+    data, error = await sync_to_async(_settle)(booking.id, amount, payment_result, paid, calls)
+    if error is not None:
+        return error
+    return JsonResponse(data, status=201)
@@ -0,0 +1,185 @@
+"""
+Idempotency-Key support for booking endpoints.
+
+A client that retries a request (e.g. after a timeout on a mobile network)
+sends the same Idempotency-Key header each time. The first request claims
+the key by inserting an IdempotencyRecord, runs the view and stores its
+response. Later requests with that key are answered from the record with
+one lookup on the (scope, key) unique index, without re-running the
+booking pipeline. Only successful responses are stored: after an error
+(e.g. 402 payment verification failed, or the seat was taken) the key is
+released, so the client can retry the same booking with the same key. A retry that arrives while the first request is still
+running gets 409. A key reused with a different request body gets 422.
+Records expire after IDEMPOTENCY_KEY_TTL_SECONDS. Expired records are
+replaced on reuse and removed by the purge_idempotency_records command.
+
+idempotent() wraps DRF ViewSet methods; aidempotent() wraps the plain
+async views in api/async_views.py, which return JsonResponse.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from bookings.models import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _scope(request):
+    user_id = request.user.pk if request.user and request.user.is_authenticated else ''
+    return f'{request.method} {request.path} {user_id}'[:255]
+
+
+def _lookup(scope, key):
+    # Read from the primary so a lagging replica cannot hide a claimed key
+    return IdempotencyRecord.objects.using(DEFAULT_DB_ALIAS).filter(scope=scope, key=key).first()
+
+
+def _replay(record, request_hash):
+    """Return (body, status code, replayed) answering a request for a claimed key."""
+    if record is None or (record.status_code is None and record.request_hash == request_hash):
+        return (
+            {'error': f'A request with this {HEADER} is still being processed'},
+            status.HTTP_409_CONFLICT,
+            False
+        )
+    if record.request_hash != request_hash:
+        return (
+            {'error': f'{HEADER} was already used for a different request'},
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            False
+        )
+    return record.response_body, record.status_code, True
+
+
+def _claim(scope, key, request_hash):
+    """Insert the in-progress record; returns None if another request holds the key."""
+    expires_at = timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            return IdempotencyRecord.objects.create(
+                scope=scope,
+                key=key,
+                request_hash=request_hash,
+                expires_at=expires_at
+            )
+    except IntegrityError:
+        return None
+
+
+def _begin(request, key):
+    """
+    Claim key for this request.
+
+    Returns (record, None) when the view should run, or (None, replay) with
+    the _replay() answer when the key is already taken.
+    """
+    scope = _scope(request)
+    request_hash = hashlib.sha256(request.body).hexdigest()
+    record = _lookup(scope, key)
+    if record is not None and record.expires_at <= timezone.now():
+        record.delete()
+        record = None
+    if record is not None:
+        return None, _replay(record, request_hash)
+
+    record = _claim(scope, key, request_hash)
+    if record is None:
+        return None, _replay(_lookup(scope, key), request_hash)
+    return record, None
+
+
+def _too_long():
+    return {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}, status.HTTP_400_BAD_REQUEST
+
+
+def _drf_response(body, status_code, replayed=False):
+    response = Response(body, status=status_code)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _json_response(body, status_code, replayed=False):
+    response = JsonResponse(body, status=status_code, safe=False)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """
+    Honour the Idempotency-Key header on a ViewSet method.
+
+    Apply it outside @transaction.atomic so the claim is committed before the
+    view runs. 2xx responses are stored and replayed. Error responses and
+    exceptions release the key so the client can retry.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _drf_response(*_too_long())
+
+        record, replay = _begin(request, key)
+        if replay is not None:
+            return _drf_response(*replay)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if not status.is_success(response.status_code) or not hasattr(response, 'data'):
+            record.delete()
+            return response
+
+        record.status_code = response.status_code
+        record.response_body = response.data
+        record.save(update_fields=['status_code', 'response_body'])
+        return response
+    return wrapper
+
+
+def aidempotent(view):
+    """Honour the Idempotency-Key header on an async view returning JsonResponse."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return await view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _json_response(*_too_long())
+
+        record, replay = await sync_to_async(_begin)(request, key)
+        if replay is not None:
+            return _json_response(*replay)
+
+        try:
+            response = await view(request, *args, **kwargs)
+        except Exception:
+            await record.adelete()
+            raise
+
+        if not status.is_success(response.status_code) or not isinstance(response, JsonResponse):
+            await record.adelete()
+            return response
+
+        record.status_code = response.status_code
+        record.response_body = json.loads(response.content)
+        await record.asave(update_fields=['status_code', 'response_body'])
+        return response
+    return wrapper
@@ -0,0 +1,37 @@
+"""
+DRF permission classes shared by the operator endpoints.
+"""
+from rest_framework.permissions import BasePermission
+
+from bookings.models import Booking, ScheduleOccurrence
+from operators.access import can_access_route
+
+
+class IsOperator(BasePermission):
+    """Allow authenticated users that have an operator profile."""
+    message = 'User is not an operator'
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and hasattr(user, 'operator_profile'))
+
+
+class IsAssignedOperator(IsOperator):
+    """
+    Also require, for object access, an active assignment to the object's route.
+
+    Works with bookings and schedule occurrences; assignments come from the
+    cached set in operators.access, so no query is made per check.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        if isinstance(obj, Booking):
+            route_id = obj.schedule_occurrence.recurrence.route_id
+        elif isinstance(obj, ScheduleOccurrence):
+            route_id = obj.recurrence.route_id
+        else:
+            route_id = getattr(obj, 'route_id', None)
+        if not can_access_route(request.user.operator_profile, route_id, request):
+            self.message = 'Operator not assigned to this route'
+            return False
+        return True
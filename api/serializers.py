@@ -1,7 +1,8 @@
+from django.conf import settings
 from rest_framework import serializers
 from routes.models import District, Route
 from buses.models import Bus
-from bookings.models import ScheduleRecurrence, ScheduleOccurrence, Booking
+from bookings.models import ScheduleRecurrence, ScheduleOccurrence, Booking, WaitlistEntry, ArchivedOccurrence, ArchivedBooking
 from payments.models import PaymentTransaction, Refund
 from operators.models import OperatorUser, OperatorAssignment
 
@@ -42,6 +43,16 @@ class ScheduleOccurrenceSerializer(serializers.ModelSerializer):
                   'status', 'route', 'bus', 'remaining_seats', 'time_to_departure']
 
 
+class OccurrenceHistorySerializer(serializers.ModelSerializer):
+    """Past departure, live or archived (see bookings/archive.py); no seat or countdown figures."""
+    route = RouteSerializer(read_only=True)
+    bus = BusSerializer(read_only=True, source='recurrence.bus')
+    
+    class Meta:
+        model = ArchivedOccurrence
+        fields = ['id', 'recurrence', 'date', 'departure_time', 'arrival_time', 'status', 'route', 'bus']
+
+
 class BookingSerializer(serializers.ModelSerializer):
     schedule_occurrence = ScheduleOccurrenceSerializer(read_only=True)
     schedule_occurrence_id = serializers.PrimaryKeyRelatedField(
@@ -54,16 +65,110 @@ class BookingSerializer(serializers.ModelSerializer):
         model = Booking
         fields = ['id', 'passenger_name', 'phone_number', 'email', 'schedule_occurrence', 
                   'schedule_occurrence_id', 'payment_method', 'status', 'created_at', 
-                  'cancelled_at', 'refund_id']
-        read_only_fields = ['id', 'status', 'created_at', 'cancelled_at', 'refund_id']
+                  'cancelled_at', 'refund_id', 'seat_number', 'group_id', 'hold_expires_at']
+        read_only_fields = ['id', 'status', 'created_at', 'cancelled_at', 'refund_id', 'seat_number', 'group_id',
+                            'hold_expires_at']
 
 
 class BookingCreateSerializer(serializers.ModelSerializer):
     schedule_occurrence_id = serializers.IntegerField()
+    seat_number = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    quote = serializers.CharField(required=False, allow_blank=True)
     
     class Meta:
         model = Booking
-        fields = ['passenger_name', 'phone_number', 'email', 'schedule_occurrence_id', 'payment_method']
+        fields = ['passenger_name', 'phone_number', 'email', 'schedule_occurrence_id', 'payment_method', 'seat_number', 'quote']
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    schedule_occurrence_id = serializers.IntegerField()
+    
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'passenger_name', 'phone_number', 'email', 'schedule_occurrence_id', 'payment_method',
+                  'status', 'position', 'created_at']
+        read_only_fields = ['id', 'status', 'position', 'created_at']
+
+
+class GroupPassengerSerializer(serializers.Serializer):
+    passenger_name = serializers.CharField(max_length=200)
+    seat_number = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+
+
+class GroupBookingCreateSerializer(serializers.Serializer):
+    """One contact and payment for several passengers on the same departure."""
+    schedule_occurrence_id = serializers.IntegerField()
+    phone_number = serializers.CharField(max_length=20)
+    email = serializers.EmailField(required=False, allow_null=True, allow_blank=True)
+    payment_method = serializers.ChoiceField(choices=Booking.PAYMENT_METHOD_CHOICES)
+    passengers = GroupPassengerSerializer(many=True)
+    quote = serializers.CharField(required=False, allow_blank=True)
+    
+    def validate_passengers(self, value):
+        if not value:
+            raise serializers.ValidationError('At least one passenger is required.')
+        if len(value) > settings.GROUP_BOOKING_MAX_PASSENGERS:
+            raise serializers.ValidationError(
+                f'A group booking can include at most {settings.GROUP_BOOKING_MAX_PASSENGERS} passengers.'
+            )
+        seats = [passenger.get('seat_number') for passenger in value]
+        if any(seats) and not all(seats):
+            raise serializers.ValidationError('Give a seat number for every passenger or for none.')
+        return value
+
+
+class CashSaleSerializer(serializers.Serializer):
+    passenger_name = serializers.CharField(max_length=200)
+    phone_number = serializers.CharField(max_length=20)
+    email = serializers.EmailField(required=False, allow_null=True, allow_blank=True)
+    schedule_occurrence_id = serializers.IntegerField()
+    seat_number = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+
+
+class BulkCashSaleSerializer(serializers.Serializer):
+    """Cash tickets sold by an operator, across one or more departures."""
+    bookings = CashSaleSerializer(many=True)
+    
+    def validate_bookings(self, value):
+        if not value:
+            raise serializers.ValidationError('At least one booking is required.')
+        if len(value) > settings.OPERATOR_BULK_SALE_MAX:
+            raise serializers.ValidationError(
+                f'At most {settings.OPERATOR_BULK_SALE_MAX} bookings can be sold in one batch.'
+            )
+        requested = [
+            (sale['schedule_occurrence_id'], sale['seat_number'])
+            for sale in value if sale.get('seat_number')
+        ]
+        if len(set(requested)) != len(requested):
+            raise serializers.ValidationError('The same seat is requested more than once.')
+        return value
+
+
+class SeatAllocationRequestSerializer(serializers.Serializer):
+    schedule_occurrence_id = serializers.IntegerField()
+    seats = serializers.IntegerField(min_value=1)
+
+
+class OfflineSaleSerializer(CashSaleSerializer):
+    client_reference = serializers.CharField(max_length=64)
+
+
+class OfflineSyncUploadSerializer(serializers.Serializer):
+    """Cash sales queued on an operator device while offline."""
+    sales = OfflineSaleSerializer(many=True)
+    
+    def validate_sales(self, value):
+        if not value:
+            raise serializers.ValidationError('At least one sale is required.')
+        if len(value) > settings.OPERATOR_SYNC_MAX_UPLOAD:
+            raise serializers.ValidationError(
+                f'At most {settings.OPERATOR_SYNC_MAX_UPLOAD} sales can be uploaded in one batch.'
+            )
+        references = [sale['client_reference'] for sale in value]
+        if len(set(references)) != len(references):
+            raise serializers.ValidationError('client_reference values must be unique within a batch.')
+        return value
 
 
 class BookingStatusSerializer(serializers.ModelSerializer):
@@ -72,7 +177,19 @@ class BookingStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = ['id', 'passenger_name', 'phone_number', 'email', 'schedule_occurrence', 
-                  'payment_method', 'status', 'created_at', 'cancelled_at', 'refund_id']
+                  'payment_method', 'status', 'created_at', 'cancelled_at', 'refund_id', 'seat_number', 'group_id',
+                  'hold_expires_at']
+
+
+class ArchivedBookingSerializer(serializers.ModelSerializer):
+    """Booking of an archived departure, in the shape of BookingStatusSerializer."""
+    schedule_occurrence = OccurrenceHistorySerializer(read_only=True)
+    
+    class Meta:
+        model = ArchivedBooking
+        fields = ['id', 'passenger_name', 'phone_number', 'email', 'schedule_occurrence', 
+                  'payment_method', 'status', 'created_at', 'cancelled_at', 'refund_id', 'seat_number', 'group_id',
+                  'hold_expires_at']
 
 
 class OperatorUserSerializer(serializers.ModelSerializer):
@@ -0,0 +1,397 @@
+"""
+Operator sync protocol for terminals with poor connectivity.
+
+A device downloads its assigned routes and upcoming schedules once, then
+asks only for what changed since the version token it was last given. It
+can reserve a block of seats per departure (a SeatAllocation) to sell while
+offline, and uploads the queued sales in one batch when it reconnects.
+Uploads are idempotent on each sale's client_reference, so a batch can be
+retried safely after a dropped connection.
+"""
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.response import Response
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from bookings.models import ScheduleOccurrence, Booking
+from bookings.seats import assign_seats, release_seats, occupied_seats, SeatUnavailable
+from operators.access import assigned_route_ids, can_access_route
+from operators.models import OperatorAssignment, SeatAllocation
+from payments.models import PaymentTransaction
+from notifications.email import defer_notifications
+from monitoring.metrics import BOOKINGS_CREATED, SEAT_LOCK_WAIT
+
+from .permissions import IsOperator
+from .serializers import RouteSerializer, SeatAllocationRequestSerializer, OfflineSyncUploadSerializer
+
+
+def _make_token(moment):
+    return str(int(moment.timestamp() * 1000))
+
+
+def _parse_token(token):
+    """Return the datetime a version token was issued at, or None for a full sync."""
+    if not token:
+        return None
+    try:
+        return datetime.fromtimestamp(int(token) / 1000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValueError('Invalid sync token')
+
+
+def _allocation_data(allocation):
+    return {
+        'schedule_occurrence_id': allocation.schedule_occurrence_id,
+        'seats': allocation.seats,
+        'updated_at': allocation.updated_at,
+    }
+
+
+@api_view(['GET'])
+@authentication_classes([SessionAuthentication])
+@permission_classes([IsOperator])
+def operator_sync(request):
+    """
+    Return the operator's routes and upcoming schedules changed since ?since=<token>.
+
+    Without a token the full set is returned. Schedules include the occupied
+    seats and the seats allocated to this operator, so the device can sell
+    offline. Keep the returned token and pass it on the next sync.
+    """
+    operator = request.user.operator_profile
+    now = timezone.now()
+    try:
+        since = _parse_token(request.query_params.get('since'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if since is not None:
+        # Re-send a short overlap so rows committed late by slow transactions are not missed
+        since -= timedelta(seconds=settings.OPERATOR_SYNC_OVERLAP_SECONDS)
+
+    today = timezone.localdate()
+    days_ahead = settings.OPERATOR_SYNC_DAYS_AHEAD
+    window_end = today + timedelta(days=days_ahead)
+
+    assignments = list(OperatorAssignment.objects.filter(operator=operator).select_related(
+        'route__origin',
+        'route__destination'
+    ))
+    active_route_ids = {assignment.route_id for assignment in assignments if assignment.is_active}
+    if since is None:
+        routes = [assignment.route for assignment in assignments if assignment.is_active]
+        removed_route_ids = []
+    else:
+        routes = [
+            assignment.route for assignment in assignments
+            if assignment.is_active and (assignment.updated_at > since or assignment.route.updated_at > since)
+        ]
+        removed_route_ids = [
+            assignment.route_id for assignment in assignments
+            if not assignment.is_active and assignment.updated_at > since
+        ]
+
+    occurrences = ScheduleOccurrence.objects.filter(
+        recurrence__route_id__in=active_route_ids,
+        date__gte=today,
+        date__lte=window_end
+    )
+    if since is not None:
+        newly_assigned = {
+            assignment.route_id for assignment in assignments
+            if assignment.is_active and assignment.updated_at > since
+        }
+        occurrences = occurrences.filter(
+            Q(updated_at__gt=since) |
+            Q(recurrence__updated_at__gt=since) |
+            Q(seat_inventory__updated_at__gt=since) |
+            Q(seat_allocations__operator=operator, seat_allocations__updated_at__gt=since) |
+            Q(recurrence__route_id__in=newly_assigned) |
+            # Days that have entered the sync window since the last sync
+            Q(date__gt=timezone.localdate(since) + timedelta(days=days_ahead))
+        ).distinct()
+
+    rows = list(occurrences.values(
+        'id', 'recurrence__route_id', 'date', 'departure_time', 'arrival_time', 'status',
+        'recurrence__bus__capacity', 'recurrence__route__fare', 'seat_inventory__occupied'
+    ).order_by('date', 'departure_time'))
+    allocations = dict(SeatAllocation.objects.filter(
+        operator=operator,
+        schedule_occurrence_id__in=[row['id'] for row in rows]
+    ).values_list('schedule_occurrence_id', 'seats'))
+
+    schedules = [
+        {
+            'id': row['id'],
+            'route_id': row['recurrence__route_id'],
+            'date': row['date'],
+            'departure_time': row['departure_time'],
+            'arrival_time': row['arrival_time'],
+            'status': row['status'],
+            'capacity': row['recurrence__bus__capacity'],
+            'fare': row['recurrence__route__fare'],
+            'occupied': occupied_seats(row['seat_inventory__occupied'] or b''),
+            'allocated': allocations.get(row['id'], []),
+        }
+        for row in rows
+    ]
+
+    return Response({
+        'token': _make_token(now),
+        'full': since is None,
+        'window_end': window_end,
+        'routes': RouteSerializer(routes, many=True).data,
+        'removed_route_ids': removed_route_ids,
+        'schedules': schedules,
+    })
+
+
+@api_view(['GET', 'POST', 'DELETE'])
+@authentication_classes([SessionAuthentication])
+@permission_classes([IsOperator])
+def operator_seat_allocations(request):
+    """
+    List, extend or return the seats held for this operator's offline sales.
+
+    POST {schedule_occurrence_id, seats} reserves that many more free seats.
+    DELETE ?schedule_occurrence_id= returns the unsold seats to general sale.
+    """
+    operator = request.user.operator_profile
+
+    if request.method == 'GET':
+        allocations = SeatAllocation.objects.filter(
+            operator=operator,
+            schedule_occurrence__date__gte=timezone.localdate()
+        ).order_by('schedule_occurrence_id')
+        return Response([_allocation_data(allocation) for allocation in allocations if allocation.seats])
+
+    if request.method == 'DELETE':
+        schedule_occurrence_id = request.query_params.get('schedule_occurrence_id')
+        if not schedule_occurrence_id:
+            return Response(
+                {'error': 'schedule_occurrence_id parameter required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        with transaction.atomic():
+            allocation = SeatAllocation.objects.select_for_update().filter(
+                operator=operator,
+                schedule_occurrence_id=schedule_occurrence_id
+            ).first()
+            if allocation is None:
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            release_seats(allocation.schedule_occurrence_id, allocation.seats)
+            allocation.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    serializer = SeatAllocationRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    count = serializer.validated_data['seats']
+
+    with transaction.atomic():
+        lock_started = time.perf_counter()
+        try:
+            schedule_occurrence = ScheduleOccurrence.objects.select_for_update().select_related(
+                'recurrence__route',
+                'recurrence__bus'
+            ).get(id=serializer.validated_data['schedule_occurrence_id'], status='scheduled')
+        except ScheduleOccurrence.DoesNotExist:
+            return Response(
+                {'error': 'Schedule does not exist or is not open for booking'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        SEAT_LOCK_WAIT.observe(time.perf_counter() - lock_started)
+
+        if not can_access_route(operator, schedule_occurrence.recurrence.route_id, request):
+            return Response(
+                {'error': 'Operator not assigned to this route'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        departure_datetime = timezone.make_aware(
+            datetime.combine(schedule_occurrence.date, schedule_occurrence.departure_time)
+        )
+        if departure_datetime <= timezone.now():
+            return Response(
+                {'error': 'Cannot allocate seats on a schedule that has already departed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        allocation = SeatAllocation.objects.get_or_create(
+            operator=operator,
+            schedule_occurrence=schedule_occurrence
+        )[0]
+        if len(allocation.seats) + count > settings.OPERATOR_SYNC_MAX_ALLOCATION:
+            return Response(
+                {'error': f'At most {settings.OPERATOR_SYNC_MAX_ALLOCATION} seats can be held per schedule'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            seats = assign_seats(schedule_occurrence, count=count)
+        except SeatUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        allocation.seats = sorted(allocation.seats + seats)
+        allocation.save()
+
+    return Response(_allocation_data(allocation), status=status.HTTP_201_CREATED)
+
+
+def _take_seat(schedule_occurrence, allocation, requested):
+    """
+    Pick the seat for an offline sale.
+
+    Prefers the seat the device sold from its allocation, then the requested
+    seat if still free, then any allocated or free seat. Returns
+    (seat or None, reassigned).
+    """
+    if allocation is not None and allocation.seats:
+        if requested in allocation.seats:
+            allocation.seats.remove(requested)
+            return requested, False
+        if requested is None:
+            return allocation.seats.pop(0), False
+    if requested is not None:
+        try:
+            return assign_seats(schedule_occurrence, requested=[requested])[0], False
+        except SeatUnavailable:
+            pass
+    if allocation is not None and allocation.seats:
+        return allocation.seats.pop(0), True
+    try:
+        return assign_seats(schedule_occurrence)[0], requested is not None
+    except SeatUnavailable:
+        return None, True
+
+
+@api_view(['POST'])
+@authentication_classes([SessionAuthentication])
+@permission_classes([IsOperator])
+@transaction.atomic
+def operator_sync_upload(request):
+    """
+    Apply a batch of cash sales made offline.
+
+    Each sale is applied independently and reported back as 'created',
+    'reassigned' (sold, but on a different seat because the one sold offline
+    was taken), 'duplicate' (already uploaded) or 'rejected' with a reason.
+    """
+    operator = request.user.operator_profile
+
+    serializer = OfflineSyncUploadSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    sales = serializer.validated_data['sales']
+
+    assigned_routes = assigned_route_ids(operator, request)
+
+    # Lock the departures in id order, as bulk sales do, to avoid deadlocks
+    lock_started = time.perf_counter()
+    locked_ids = list(ScheduleOccurrence.objects.select_for_update().filter(
+        id__in={sale['schedule_occurrence_id'] for sale in sales}
+    ).order_by('id').values_list('id', flat=True))
+    SEAT_LOCK_WAIT.observe(time.perf_counter() - lock_started)
+    occurrences = ScheduleOccurrence.objects.select_related(
+        'recurrence__route',
+        'recurrence__bus'
+    ).in_bulk(locked_ids)
+    allocations = {
+        allocation.schedule_occurrence_id: allocation
+        for allocation in SeatAllocation.objects.select_for_update().filter(
+            operator=operator,
+            schedule_occurrence_id__in=locked_ids
+        )
+    }
+
+    # Checked after locking so a concurrent retry of the same batch sees our rows
+    existing = {
+        client_reference: (booking_id, seat_number)
+        for client_reference, booking_id, seat_number in Booking.objects.filter(
+            client_reference__in=[sale['client_reference'] for sale in sales]
+        ).values_list('client_reference', 'id', 'seat_number')
+    }
+
+    results = []
+    bookings = []
+    for sale in sales:
+        result = {'client_reference': sale['client_reference']}
+        results.append(result)
+
+        if sale['client_reference'] in existing:
+            booking_id, seat_number = existing[sale['client_reference']]
+            result.update(status='duplicate', booking_id=str(booking_id), seat_number=seat_number)
+            continue
+
+        schedule_occurrence = occurrences.get(sale['schedule_occurrence_id'])
+        if schedule_occurrence is None:
+            result.update(status='rejected', reason='Schedule does not exist')
+            continue
+        if schedule_occurrence.recurrence.route_id not in assigned_routes:
+            result.update(status='rejected', reason='Operator not assigned to this route')
+            continue
+        if schedule_occurrence.status == 'cancelled':
+            result.update(status='rejected', reason='Schedule was cancelled')
+            continue
+
+        requested = sale.get('seat_number')
+        seat_number, reassigned = _take_seat(
+            schedule_occurrence,
+            allocations.get(schedule_occurrence.id),
+            requested
+        )
+        if seat_number is None:
+            result.update(status='rejected', reason='No seats available for this schedule')
+            continue
+
+        booking = Booking(
+            passenger_name=sale['passenger_name'],
+            phone_number=sale['phone_number'],
+            email=sale.get('email') or None,
+            schedule_occurrence=schedule_occurrence,
+            payment_method='cash',
+            status='confirmed',
+            operator=operator,
+            seat_number=seat_number,
+            client_reference=sale['client_reference']
+        )
+        bookings.append(booking)
+        result.update(
+            status='reassigned' if reassigned else 'created',
+            booking_id=str(booking.id),
+            seat_number=seat_number
+        )
+        if reassigned and requested is not None:
+            result['reason'] = f'Seat {requested} was taken'
+
+    for allocation in allocations.values():
+        allocation.save(update_fields=['seats', 'updated_at'])
+
+    Booking.objects.bulk_create(bookings)
+    PaymentTransaction.objects.bulk_create([
+        PaymentTransaction(
+            provider='cash',
+            provider_transaction_id=f'CASH_{booking.id}',
+            amount=booking.schedule_occurrence.recurrence.route.fare,
+            status='completed',
+            idempotency_key=booking.client_reference,
+            booking=booking
+        )
+        for booking in bookings
+    ])
+    for booking in bookings:
+        BOOKINGS_CREATED.inc(
+            route=booking.schedule_occurrence.recurrence.route.name,
+            payment_method='cash'
+        )
+
+    defer_notifications(bookings)
+
+    return Response({
+        'results': results,
+        'created': sum(1 for result in results if result['status'] in ('created', 'reassigned')),
+        'conflicts': sum(1 for result in results if result['status'] in ('reassigned', 'rejected')),
+    })
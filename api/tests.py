@@ -0,0 +1,153 @@
+import json
+from datetime import date, time, timedelta
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase
+from rest_framework import status, viewsets
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from api.async_views import _settle
+from api.idempotency import aidempotent, idempotent
+from routes.models import District, Route
+from buses.models import Bus
+from bookings.models import ScheduleRecurrence, ScheduleOccurrence, Booking
+from payments.models import PaymentTransaction, Refund
+
+
+class CountingViewSet(viewsets.ViewSet):
+    calls = 0
+    status_code = status.HTTP_201_CREATED
+    
+    @idempotent
+    def create(self, request):
+        CountingViewSet.calls += 1
+        return Response({'call': CountingViewSet.calls}, status=CountingViewSet.status_code)
+
+
+@aidempotent
+async def counting_async_view(request):
+    CountingViewSet.calls += 1
+    return JsonResponse({'call': CountingViewSet.calls}, status=status.HTTP_201_CREATED)
+
+
+class IdempotencyKeyTest(TestCase):
+    """Test Idempotency-Key replay."""
+    
+    def setUp(self):
+        CountingViewSet.calls = 0
+        CountingViewSet.status_code = status.HTTP_201_CREATED
+        self.view = CountingViewSet.as_view({'post': 'create'})
+        self.factory = APIRequestFactory()
+    
+    def post(self, body, key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.view(self.factory.post('/api/bookings/', body, format='json', **headers))
+    
+    def test_retry_is_replayed(self):
+        """Test that a retried request is answered from the stored response."""
+        first = self.post({'seat': 1}, key='abc')
+        retry = self.post({'seat': 1}, key='abc')
+        
+        self.assertEqual(CountingViewSet.calls, 1)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        
+        self.assertEqual(self.post({'seat': 2}, key='abc').status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.post({'seat': 1})
+        self.assertEqual(CountingViewSet.calls, 2)
+    
+    def test_retry_after_error_runs_again(self):
+        """Test that an error response is not stored, so the same key can be retried."""
+        CountingViewSet.status_code = status.HTTP_402_PAYMENT_REQUIRED
+        self.assertEqual(self.post({'seat': 1}, key='abc').status_code, status.HTTP_402_PAYMENT_REQUIRED)
+        
+        CountingViewSet.status_code = status.HTTP_201_CREATED
+        retry = self.post({'seat': 1}, key='abc')
+        self.assertEqual(CountingViewSet.calls, 2)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', retry)
+    
+    async def test_async_retry_is_replayed(self):
+        """Test that the async decorator replays like the sync one."""
+        def request():
+            request = RequestFactory().post(
+                '/api/async/bookings/', {'seat': 1}, content_type='application/json',
+                HTTP_IDEMPOTENCY_KEY='abc'
+            )
+            request.user = AnonymousUser()
+            return request
+        
+        first = await counting_async_view(request())
+        retry = await counting_async_view(request())
+        
+        self.assertEqual(CountingViewSet.calls, 1)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+
+class AsyncBookingTest(TestCase):
+    """Test the async booking endpoints."""
+    
+    def setUp(self):
+        route = Route.objects.create(
+            name="Kigali - Rubavu",
+            origin=District.objects.create(name="Kigali", code="KG"),
+            destination=District.objects.create(name="Rubavu", code="RU")
+        )
+        recurrence = ScheduleRecurrence.objects.create(
+            route=route,
+            bus=Bus.objects.create(plate_number="RAD100A", capacity=2),
+            departure_time=time(8, 0),
+            arrival_time=time(11, 0)
+        )
+        self.occurrence = ScheduleOccurrence.objects.create(
+            recurrence=recurrence,
+            date=date.today() + timedelta(days=1),
+            departure_time=time(8, 0),
+            arrival_time=time(11, 0)
+        )
+    
+    async def test_create_and_status(self):
+        """Test that an async cash booking is confirmed and its status readable."""
+        response = await self.async_client.post('/api/async/bookings/', {
+            'passenger_name': 'Async Passenger',
+            'phone_number': '+250788123456',
+            'schedule_occurrence_id': self.occurrence.id,
+            'payment_method': 'cash',
+        }, content_type='application/json')
+        
+        self.assertEqual(response.status_code, 201)
+        booking = json.loads(response.content)
+        self.assertEqual(booking['status'], 'confirmed')
+        self.assertEqual(booking['seat_number'], 1)
+        
+        response = await self.async_client.get(f"/api/async/bookings/{booking['id']}/status/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['status'], 'confirmed')
+    
+    def test_paid_after_hold_expired_is_refunded(self):
+        """Test that a payment completing after the hold expired is refunded, not kept."""
+        booking = Booking.objects.create(
+            passenger_name="Slow Provider",
+            phone_number="+250788123456",
+            schedule_occurrence=self.occurrence,
+            payment_method='mtn',
+            status='expired',  # The hold worker got there first and released seat 1
+            seat_number=1
+        )
+        
+        data, error = _settle(booking.id, 5000, {'success': True, 'transaction_id': 'MTN_LATE'}, True)
+        
+        self.assertIsNone(data)
+        self.assertEqual(error.status_code, 409)
+        self.assertEqual(json.loads(error.content)['refund_status'], 'pending')
+        payment_transaction = PaymentTransaction.objects.get(booking=booking)
+        self.assertEqual(payment_transaction.status, 'completed')
+        refund = Refund.objects.get(payment_transaction=payment_transaction)
+        self.assertEqual((refund.status, refund.amount), ('pending', payment_transaction.amount))
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'expired')
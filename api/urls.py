@@ -5,6 +5,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 from . import admin_views
+from . import sync_views
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'districts', views.DistrictViewSet, basename='district')
@@ -17,6 +19,15 @@ router.register(r'operator/bookings', views.OperatorBookingViewSet, basename='op
 api_urlpatterns = [
     path('', include(router.urls)),
     path('operator/schedules/<int:schedule_id>/mark_departed/', views.mark_schedule_departed, name='mark-departed'),
+    path('operator/schedules/<int:schedule_id>/manifest/', views.operator_manifest, name='operator-manifest'),
+    # Async (ASGI) endpoints
+    path('async/schedules/', async_views.schedule_list, name='async-schedule-list'),
+    path('async/bookings/', async_views.booking_create, name='async-booking-create'),
+    path('async/bookings/<uuid:pk>/status/', async_views.booking_status, name='async-booking-status'),
+    # Offline operator sync
+    path('operator/sync/', sync_views.operator_sync, name='operator-sync'),
+    path('operator/sync/allocations/', sync_views.operator_seat_allocations, name='operator-seat-allocations'),
+    path('operator/sync/upload/', sync_views.operator_sync_upload, name='operator-sync-upload'),
     # Admin management endpoints
     path('admin/districts/', admin_views.admin_districts, name='admin-districts'),
     path('admin/districts/<int:pk>/', admin_views.admin_district_detail, name='admin-district-detail'),
@@ -27,6 +38,10 @@ api_urlpatterns = [
     path('admin/schedule-recurrences/', admin_views.admin_schedule_recurrences, name='admin-schedule-recurrences'),
     path('admin/schedule-recurrences/<int:pk>/', admin_views.admin_schedule_recurrence_detail, name='admin-schedule-recurrence-detail'),
     path('admin/bookings/', admin_views.admin_bookings, name='admin-bookings'),
+    path('admin/analytics/', admin_views.admin_analytics, name='admin-analytics'),
+    path('admin/analytics/demand/', admin_views.admin_demand_summaries, name='admin-demand-summaries'),
+    path('admin/profiles/', admin_views.admin_profiles, name='admin-profiles'),
+    path('admin/profiles/<str:name>/', admin_views.admin_profile_download, name='admin-profile-download'),
     path('admin/operators/', admin_views.admin_operators, name='admin-operators'),
     path('admin/operators/<int:pk>/', admin_views.admin_operator_detail, name='admin-operator-detail'),
     path('admin/operator-assignments/', admin_views.admin_operator_assignments, name='admin-operator-assignments'),
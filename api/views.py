@@ -1,26 +1,44 @@
-from rest_framework import viewsets, status, permissions
+from rest_framework import generics, viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authentication import SessionAuthentication
 from django.db import transaction
 from django.utils import timezone
 from django.shortcuts import get_object_or_404, render
+from django.http import FileResponse, Http404, HttpResponse
 from django.db.models import Q, Prefetch
 from datetime import date, timedelta
+import time
+import uuid
 
 from routes.models import District, Route
-from bookings.models import ScheduleOccurrence, Booking, ScheduleRecurrence
-from payments.models import PaymentTransaction, Refund
-from payments.mtn_adapter import MTNAdapter
-from payments.airtel_adapter import AirtelAdapter
-from notifications.email import send_notification_async
-from operators.models import OperatorUser, OperatorAssignment
+from bookings.models import ScheduleOccurrence, Booking, ScheduleRecurrence, ArchivedOccurrence, ArchivedBooking
+from bookings.archive import ArchiveChain, includes_archive
+from bookings.seats import assign_seats, release_seats, seat_map, SeatUnavailable
+from bookings.fares import QuoteInvalid, booking_fare, quote_listing
+from bookings.holds import hold_expiry
+from bookings.manifest import (
+    MANIFEST_FORMATS, build_manifest, finalize_manifest, open_stored_manifest, render_manifest
+)
+from payments.models import PaymentTransaction
+from payments.registry import UnknownPaymentMethod, get_adapter
+from payments.refunds import queue_refund
+from payments.events import record_event
+from notifications.email import send_notification_async, send_group_notification_async, defer_notifications
+from operators.models import OperatorUser
+from operators.access import assigned_route_ids, can_access_route
+from monitoring.metrics import BOOKINGS_CREATED, BOOKINGS_CANCELLED, SEAT_LOCK_WAIT
 
 from .serializers import (
-    DistrictSerializer, RouteSerializer, ScheduleOccurrenceSerializer,
-    BookingSerializer, BookingCreateSerializer, BookingStatusSerializer,
+    DistrictSerializer, RouteSerializer, ScheduleOccurrenceSerializer, OccurrenceHistorySerializer,
+    BookingSerializer, BookingCreateSerializer, BookingStatusSerializer, GroupBookingCreateSerializer,
+    ArchivedBookingSerializer,
+    WaitlistEntrySerializer,
+    BulkCashSaleSerializer,
     OperatorUserSerializer, OperatorAssignmentSerializer
 )
+from .permissions import IsOperator, IsAssignedOperator
+from .idempotency import idempotent
 
 
 class DistrictViewSet(viewsets.ReadOnlyModelViewSet):
@@ -44,6 +62,62 @@ class RouteViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
+def schedule_queryset(query_params, upcoming=True):
+    """
+    Schedule occurrences filtered by the route_id and date query parameters.
+    
+    With upcoming=True (listings) only scheduled occurrences that have not
+    departed yet are included; otherwise any status is (detail views).
+    """
+    if not upcoming:
+        queryset = ScheduleOccurrence.objects.select_related(
+            'recurrence__route__origin',
+            'recurrence__route__destination',
+            'recurrence__bus'
+        )
+    else:
+        now = timezone.now()
+        today = date.today()
+        
+        queryset = ScheduleOccurrence.objects.select_related(
+            'recurrence__route__origin',
+            'recurrence__route__destination',
+            'recurrence__bus'
+        ).filter(
+            status='scheduled'
+        ).exclude(
+            # Exclude schedules where departure time has passed
+            Q(date__lt=today) |  # Past dates
+            Q(
+                date=today,
+                departure_time__lt=now.time()
+            )  # Today but departure time has passed
+        )
+    
+    route_id = query_params.get('route_id', None)
+    schedule_date = query_params.get('date', None)
+    
+    if route_id:
+        queryset = queryset.filter(recurrence__route_id=route_id)
+    
+    if schedule_date:
+        try:
+            date_obj = date.fromisoformat(schedule_date)
+            queryset = queryset.filter(date=date_obj)
+            # For specific date, also filter out past times if it's today
+            if date_obj == date.today():
+                now = timezone.now()
+                queryset = queryset.exclude(departure_time__lt=now.time())
+        except ValueError:
+            pass
+    else:
+        # Default to today and future dates (only for listings)
+        if upcoming:
+            queryset = queryset.filter(date__gte=date.today())
+    
+    return queryset.order_by('date', 'departure_time')
+
+
 class ScheduleOccurrenceViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for schedule occurrences."""
     queryset = ScheduleOccurrence.objects.select_related(
@@ -56,54 +130,75 @@ class ScheduleOccurrenceViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         # For list view, only show scheduled occurrences that haven't departed yet
-        # For retrieve (detail) view, allow any status for validation
-        if self.action == 'retrieve':
-            queryset = ScheduleOccurrence.objects.select_related(
-                'recurrence__route__origin',
-                'recurrence__route__destination',
-                'recurrence__bus'
-            )
-        else:
-            now = timezone.now()
-            today = date.today()
-            
-            queryset = ScheduleOccurrence.objects.select_related(
-                'recurrence__route__origin',
-                'recurrence__route__destination',
-                'recurrence__bus'
-            ).filter(
-                status='scheduled'
-            ).exclude(
-                # Exclude schedules where departure time has passed
-                Q(date__lt=today) |  # Past dates
-                Q(
-                    date=today,
-                    departure_time__lt=now.time()
-                )  # Today but departure time has passed
+        # For retrieve (detail) and seat map views, allow any status for validation
+        return schedule_queryset(self.request.query_params, upcoming=self.action not in ('retrieve', 'seats'))
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Occurrence details; archived departures are read from the archive."""
+        try:
+            schedule_occurrence = self.get_object()
+        except Http404:
+            archived = generics.get_object_or_404(
+                ArchivedOccurrence.objects.select_related(
+                    'recurrence__route__origin',
+                    'recurrence__route__destination',
+                    'recurrence__bus'
+                ),
+                pk=kwargs['pk']
             )
+            return Response(OccurrenceHistorySerializer(archived).data)
+        return Response(self.get_serializer(schedule_occurrence).data)
+    
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """
+        Departures of any status from ?start= to ?end= (default today),
+        optionally for one route_id. Ranges reaching before the archive
+        cutoff include archived departures.
+        """
+        if 'start' not in request.query_params:
+            return Response({'error': 'start is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start = date.fromisoformat(request.query_params['start'])
+            end = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else date.today()
+        except ValueError:
+            return Response({'error': 'start and end must be dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
         
-        route_id = self.request.query_params.get('route_id', None)
-        schedule_date = self.request.query_params.get('date', None)
-        
+        filters = {'date__range': (start, end)}
+        route_id = request.query_params.get('route_id')
         if route_id:
-            queryset = queryset.filter(recurrence__route_id=route_id)
+            filters['recurrence__route_id'] = route_id
+        related = ('recurrence__route__origin', 'recurrence__route__destination', 'recurrence__bus')
+        ordering = ('date', 'departure_time', 'id')
         
-        if schedule_date:
-            try:
-                date_obj = date.fromisoformat(schedule_date)
-                queryset = queryset.filter(date=date_obj)
-                # For specific date, also filter out past times if it's today
-                if date_obj == date.today():
-                    now = timezone.now()
-                    queryset = queryset.exclude(departure_time__lt=now.time())
-            except ValueError:
-                pass
-        else:
-            # Default to today and future dates (only for list view)
-            if self.action != 'retrieve':
-                queryset = queryset.filter(date__gte=date.today())
+        departures = ScheduleOccurrence.objects.select_related(*related).filter(**filters).order_by(*ordering)
+        if includes_archive(start):
+            departures = ArchiveChain(
+                ArchivedOccurrence.objects.select_related(*related).filter(**filters).order_by(*ordering),
+                departures
+            )
         
-        return queryset.order_by('date', 'departure_time')
+        page = self.paginate_queryset(departures)
+        return self.get_paginated_response(OccurrenceHistorySerializer(page, many=True).data)
+    
+    @action(detail=False, methods=['get'])
+    def quotes(self, request):
+        """Current prices, with signed quotes to book at, for a schedule listing."""
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(quote_listing(page))
+        return Response(quote_listing(queryset))
+    
+    @action(detail=True, methods=['get'])
+    def seats(self, request, pk=None):
+        """Get the seat map (occupied and available seat numbers)."""
+        schedule_occurrence = self.get_object()
+        data = seat_map(schedule_occurrence)
+        data['schedule_id'] = schedule_occurrence.id
+        return Response(data)
 
 
 class BookingViewSet(viewsets.ModelViewSet):
@@ -118,10 +213,42 @@ class BookingViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'create':
             return BookingCreateSerializer
+        elif self.action == 'group':
+            return GroupBookingCreateSerializer
+        elif self.action == 'waitlist':
+            return WaitlistEntrySerializer
         elif self.action == 'status':
             return BookingStatusSerializer
         return BookingSerializer
     
+    def get_archived_object(self):
+        """The archived booking with the URL's id, once its departure has been archived."""
+        return generics.get_object_or_404(
+            ArchivedBooking.objects.select_related(
+                'schedule_occurrence__recurrence__route__origin',
+                'schedule_occurrence__recurrence__route__destination',
+                'schedule_occurrence__recurrence__bus'
+            ),
+            pk=self.kwargs['pk']
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Booking details; bookings of archived departures are read from the archive."""
+        try:
+            booking = self.get_object()
+        except Http404:
+            return Response(ArchivedBookingSerializer(self.get_archived_object()).data)
+        return Response(self.get_serializer(booking).data)
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Expose the seat lock wait as a Server-Timing metric."""
+        response = super().finalize_response(request, response, *args, **kwargs)
+        lock_wait = getattr(request, 'seat_lock_wait', None)
+        if lock_wait is not None:
+            response['Server-Timing'] = f'lock;dur={lock_wait * 1000:.2f}'
+        return response
+    
+    @idempotent
     @transaction.atomic
     def create(self, request, *args, **kwargs):
         """Create a new booking with payment processing."""
@@ -131,10 +258,13 @@ class BookingViewSet(viewsets.ModelViewSet):
         schedule_occurrence_id = serializer.validated_data['schedule_occurrence_id']
         
         # Lock the schedule occurrence to prevent overbooking
+        lock_started = time.perf_counter()
         schedule_occurrence = ScheduleOccurrence.objects.select_for_update().get(
             id=schedule_occurrence_id,
             status='scheduled'
         )
+        request.seat_lock_wait = time.perf_counter() - lock_started
+        SEAT_LOCK_WAIT.observe(request.seat_lock_wait)
         
         # Check if departure time has passed
         from datetime import datetime
@@ -151,10 +281,26 @@ class BookingViewSet(viewsets.ModelViewSet):
         # Check availability
         if schedule_occurrence.remaining_seats <= 0:
             return Response(
-                {'error': 'No seats available for this schedule'},
+                {'error': 'No seats available for this schedule', 'waitlist': True},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Price at the quoted fare if the client holds a valid quote
+        try:
+            fare = booking_fare(schedule_occurrence, serializer.validated_data.get('quote'))
+        except QuoteInvalid as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Assign the requested seat, or the first free one
+        requested_seat = serializer.validated_data.get('seat_number')
+        try:
+            seat_number = assign_seats(
+                schedule_occurrence,
+                requested=[requested_seat] if requested_seat else None
+            )[0]
+        except SeatUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
         # Create booking
         booking = Booking.objects.create(
             passenger_name=serializer.validated_data['passenger_name'],
@@ -162,37 +308,31 @@ class BookingViewSet(viewsets.ModelViewSet):
             email=serializer.validated_data.get('email'),
             schedule_occurrence=schedule_occurrence,
             payment_method=serializer.validated_data['payment_method'],
-            status='pending'
+            status='pending',
+            seat_number=seat_number,
+            hold_expires_at=hold_expiry(now)
         )
         
         # Process payment
         payment_method = serializer.validated_data['payment_method']
         phone_number = serializer.validated_data['phone_number']
-        amount = float(schedule_occurrence.recurrence.route.fare)  # Get fare from route
+        amount = float(fare)
         
-        if payment_method == 'mtn':
-            payment_result = MTNAdapter.create_payment(
-                phone_number=phone_number,
-                amount=amount,
-                idempotency_key=str(booking.id)
-            )
-        elif payment_method == 'airtel':
-            payment_result = AirtelAdapter.create_payment(
-                phone_number=phone_number,
-                amount=amount,
-                idempotency_key=str(booking.id)
-            )
-        elif payment_method == 'cash':
-            payment_result = {
-                'success': True,
-                'transaction_id': f'CASH_{booking.id}',
-                'status': 'completed'
-            }
-        else:
+        try:
+            adapter = get_adapter(payment_method)
+        except UnknownPaymentMethod:
+            booking.status = 'expired'
+            booking.save()
+            release_seats(schedule_occurrence.id, [seat_number], reason='payment_failed')
             return Response(
                 {'error': 'Invalid payment method'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        payment_result = adapter.create_payment(
+            phone_number=phone_number,
+            amount=amount,
+            idempotency_key=str(booking.id)
+        )
         
         # Create payment transaction
         payment_transaction = PaymentTransaction.objects.create(
@@ -200,35 +340,47 @@ class BookingViewSet(viewsets.ModelViewSet):
             provider_transaction_id=payment_result.get('transaction_id'),
             amount=amount,
             status='pending',
-            response_raw=payment_result.get('response_raw', {}),
             idempotency_key=str(booking.id),
             booking=booking
         )
+        if adapter.external:
+            record_event('create', payment_result, payment_transaction=payment_transaction)
         
         # Verify payment (for mobile money)
-        if payment_method in ['mtn', 'airtel']:
-            adapter = MTNAdapter if payment_method == 'mtn' else AirtelAdapter
+        if adapter.supports_async_confirmation:
             verify_result = adapter.verify_payment(payment_result['transaction_id'])
+            record_event('verify', verify_result, payment_transaction=payment_transaction)
             if verify_result['success'] and verify_result['status'] == 'completed':
                 payment_transaction.status = 'completed'
-                payment_transaction.save()
+                payment_transaction.save(update_fields=['status', 'updated_at'])
                 booking.status = 'confirmed'
                 booking.save()
+                BOOKINGS_CREATED.inc(
+                    route=schedule_occurrence.recurrence.route.name,
+                    payment_method=payment_method
+                )
                 
                 # Send notifications
                 send_notification_async(booking, schedule_occurrence)
             else:
                 payment_transaction.status = 'failed'
-                payment_transaction.save()
+                payment_transaction.save(update_fields=['status', 'updated_at'])
+                booking.status = 'expired'
+                booking.save()
+                release_seats(schedule_occurrence.id, [seat_number], reason='payment_failed')
                 return Response(
                     {'error': 'Payment verification failed'},
                     status=status.HTTP_402_PAYMENT_REQUIRED
                 )
-        else:  # Cash
+        else:  # Confirmed synchronously (cash)
             payment_transaction.status = 'completed'
-            payment_transaction.save()
+            payment_transaction.save(update_fields=['status', 'updated_at'])
             booking.status = 'confirmed'
             booking.save()
+            BOOKINGS_CREATED.inc(
+                route=schedule_occurrence.recurrence.route.name,
+                payment_method=payment_method
+            )
             
             # Send notifications
             send_notification_async(booking, schedule_occurrence)
@@ -236,10 +388,272 @@ class BookingViewSet(viewsets.ModelViewSet):
         response_serializer = BookingSerializer(booking)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'])
+    @idempotent
+    @transaction.atomic
+    def group(self, request):
+        """
+        Book several passengers on one departure with a single payment.
+        
+        All seats are reserved under one lock on the schedule occurrence, the
+        provider is charged once for the total fare, and the contact receives
+        one SMS/email with a QR ticket per passenger.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        passengers = data['passengers']
+        payment_method = data['payment_method']
+        phone_number = data['phone_number']
+        
+        # Lock the schedule occurrence once for the whole party
+        lock_started = time.perf_counter()
+        schedule_occurrence = get_object_or_404(
+            ScheduleOccurrence.objects.select_for_update(),
+            id=data['schedule_occurrence_id'],
+            status='scheduled'
+        )
+        request.seat_lock_wait = time.perf_counter() - lock_started
+        SEAT_LOCK_WAIT.observe(request.seat_lock_wait)
+        
+        # Check if departure time has passed
+        from datetime import datetime
+        departure_datetime = timezone.make_aware(
+            datetime.combine(schedule_occurrence.date, schedule_occurrence.departure_time)
+        )
+        if departure_datetime <= timezone.now():
+            return Response(
+                {'error': 'Cannot book for a schedule that has already departed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if schedule_occurrence.remaining_seats < len(passengers):
+            return Response(
+                {'error': f'Only {schedule_occurrence.remaining_seats} seats available for this schedule'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            fare = booking_fare(schedule_occurrence, data.get('quote'))
+        except QuoteInvalid as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        requested_seats = [passenger.get('seat_number') for passenger in passengers]
+        try:
+            seats = assign_seats(
+                schedule_occurrence,
+                count=len(passengers),
+                requested=requested_seats if all(requested_seats) else None
+            )
+        except SeatUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        group_id = uuid.uuid4()
+        hold_expires_at = hold_expiry()
+        bookings = Booking.objects.bulk_create([
+            Booking(
+                passenger_name=passenger['passenger_name'],
+                phone_number=phone_number,
+                email=data.get('email') or None,
+                schedule_occurrence=schedule_occurrence,
+                payment_method=payment_method,
+                status='pending',
+                seat_number=seat,
+                group_id=group_id,
+                hold_expires_at=hold_expires_at
+            )
+            for passenger, seat in zip(passengers, seats)
+        ])
+        
+        # One payment for the whole party
+        total = fare * len(bookings)
+        adapter = get_adapter(payment_method)
+        payment_result = adapter.create_payment(
+            phone_number=phone_number,
+            amount=float(total),
+            idempotency_key=str(group_id)
+        )
+        
+        # Each booking keeps its own transaction (for per-passenger refunds),
+        # all pointing at the same provider transaction
+        created = PaymentTransaction.objects.bulk_create([
+            PaymentTransaction(
+                provider=payment_method,
+                provider_transaction_id=payment_result.get('transaction_id'),
+                amount=fare,
+                status='pending',
+                idempotency_key=str(booking.id),
+                booking=booking
+            )
+            for booking in bookings
+        ])
+        payment_transactions = PaymentTransaction.objects.filter(booking__group_id=group_id)
+        # The provider call is logged once, against the first passenger's transaction
+        if adapter.external:
+            record_event('create', payment_result, payment_transaction=created[0])
+        
+        if not payment_result.get('success'):
+            paid = False
+        elif not adapter.supports_async_confirmation:
+            paid = True
+        else:
+            verify_result = adapter.verify_payment(payment_result['transaction_id'])
+            record_event('verify', verify_result, payment_transaction=created[0])
+            paid = verify_result['success'] and verify_result['status'] == 'completed'
+        
+        if not paid:
+            payment_transactions.update(status='failed', updated_at=timezone.now())
+            Booking.objects.filter(group_id=group_id).update(status='expired', updated_at=timezone.now())
+            release_seats(schedule_occurrence.id, seats, reason='payment_failed')
+            return Response(
+                {'error': 'Payment verification failed'},
+                status=status.HTTP_402_PAYMENT_REQUIRED
+            )
+        
+        payment_transactions.update(status='completed', updated_at=timezone.now())
+        Booking.objects.filter(group_id=group_id).update(status='confirmed', updated_at=timezone.now())
+        for booking in bookings:
+            booking.status = 'confirmed'
+        BOOKINGS_CREATED.inc(
+            len(bookings),
+            route=schedule_occurrence.recurrence.route.name,
+            payment_method=payment_method
+        )
+        
+        # One consolidated notification for the party
+        send_group_notification_async(bookings, schedule_occurrence)
+        
+        return Response({
+            'group_id': str(group_id),
+            'total_amount': str(total),
+            'bookings': BookingSerializer(bookings, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'])
+    def waitlist(self, request):
+        """
+        Join the waitlist of a sold-out departure.
+        
+        When a seat frees up, the process_waitlist worker holds it for the
+        first passenger in line and sends them an SMS to pay (see pay).
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        schedule_occurrence = get_object_or_404(
+            ScheduleOccurrence.objects.select_related('recurrence__bus'),
+            id=serializer.validated_data['schedule_occurrence_id'],
+            status='scheduled'
+        )
+        from datetime import datetime
+        departure_datetime = timezone.make_aware(
+            datetime.combine(schedule_occurrence.date, schedule_occurrence.departure_time)
+        )
+        if departure_datetime <= timezone.now():
+            return Response(
+                {'error': 'Cannot join the waitlist for a schedule that has already departed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if seat_map(schedule_occurrence)['available']:
+            return Response(
+                {'error': 'Seats are still available for this schedule'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        entry = serializer.save()
+        return Response(WaitlistEntrySerializer(entry).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'])
+    @idempotent
+    @transaction.atomic
+    def pay(self, request, pk=None):
+        """
+        Pay for a pending booking that holds a seat, e.g. a waitlist promotion.
+        
+        Charges the current fare, or the quoted one if a valid quote is given.
+        A failed payment expires the booking and frees its seat.
+        """
+        booking = get_object_or_404(Booking.objects.select_for_update(), pk=pk)
+        if booking.status != 'pending':
+            return Response(
+                {'error': 'Booking is not awaiting payment'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if booking.hold_expires_at is None or booking.hold_expires_at <= timezone.now():
+            return Response(
+                {'error': 'The seat hold has expired'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        schedule_occurrence = ScheduleOccurrence.objects.select_related(
+            'recurrence__route',
+            'recurrence__bus'
+        ).get(id=booking.schedule_occurrence_id)
+        try:
+            fare = booking_fare(schedule_occurrence, request.data.get('quote'))
+        except QuoteInvalid as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        payment_method = booking.payment_method
+        amount = float(fare)
+        adapter = get_adapter(payment_method)
+        payment_result = adapter.create_payment(
+            phone_number=booking.phone_number,
+            amount=amount,
+            idempotency_key=str(booking.id)
+        )
+        
+        payment_transaction = PaymentTransaction.objects.create(
+            provider=payment_method,
+            provider_transaction_id=payment_result.get('transaction_id'),
+            amount=amount,
+            status='pending',
+            idempotency_key=str(booking.id),
+            booking=booking
+        )
+        if adapter.external:
+            record_event('create', payment_result, payment_transaction=payment_transaction)
+        
+        if not payment_result.get('success'):
+            paid = False
+        elif not adapter.supports_async_confirmation:
+            paid = True
+        else:
+            verify_result = adapter.verify_payment(payment_result['transaction_id'])
+            record_event('verify', verify_result, payment_transaction=payment_transaction)
+            paid = verify_result['success'] and verify_result['status'] == 'completed'
+        
+        if not paid:
+            payment_transaction.status = 'failed'
+            payment_transaction.save(update_fields=['status', 'updated_at'])
+            booking.status = 'expired'
+            booking.save()
+            release_seats(schedule_occurrence.id, [booking.seat_number], reason='payment_failed')
+            return Response(
+                {'error': 'Payment verification failed'},
+                status=status.HTTP_402_PAYMENT_REQUIRED
+            )
+        
+        payment_transaction.status = 'completed'
+        payment_transaction.save(update_fields=['status', 'updated_at'])
+        booking.status = 'confirmed'
+        booking.save()
+        BOOKINGS_CREATED.inc(
+            route=schedule_occurrence.recurrence.route.name,
+            payment_method=payment_method
+        )
+        send_notification_async(booking, schedule_occurrence)
+        
+        return Response(BookingSerializer(booking).data)
+    
     @action(detail=True, methods=['post'])
+    @idempotent
+    @transaction.atomic
     def cancel(self, request, pk=None):
         """Cancel a booking and process refund if eligible."""
-        booking = self.get_object()
+        # Lock the booking so concurrent cancels run one after the other: the
+        # second sees 'cancelled' and never releases the (possibly resold) seat
+        booking = get_object_or_404(Booking.objects.select_for_update(), pk=pk)
         
         if not booking.can_cancel():
             return Response(
@@ -253,49 +667,35 @@ class BookingViewSet(viewsets.ModelViewSet):
         booking.status = 'cancelled'
         booking.cancelled_at = timezone.now()
         booking.save()
+        release_seats(booking.schedule_occurrence_id, [booking.seat_number], reason='cancelled')
+        BOOKINGS_CANCELLED.inc(
+            route=booking.schedule_occurrence.recurrence.route.name,
+            payment_method=booking.payment_method
+        )
         
-        refund_id = None
-        if can_refund and booking.payment_method != 'cash':
-            # Process automatic refund
-            try:
-                payment_transaction = booking.payment_transaction
-                adapter = MTNAdapter if booking.payment_method == 'mtn' else AirtelAdapter
-                
-                refund_result = adapter.refund_payment(
-                    transaction_id=payment_transaction.provider_transaction_id,
-                    amount=payment_transaction.amount
-                )
-                
-                if refund_result['success']:
-                    refund_id = refund_result['refund_id']
-                    booking.refund_id = refund_id
-                    booking.save()
-                    
-                    # Create refund record
-                    Refund.objects.create(
-                        payment_transaction=payment_transaction,
-                        amount=payment_transaction.amount,
-                        status='completed',
-                        provider_refund_id=refund_id,
-                        response_raw=refund_result.get('response_raw', {})
-                    )
-                    
-                    payment_transaction.status = 'refunded'
-                    payment_transaction.save()
-            except Exception as e:
-                # Log error but don't fail cancellation
-                pass
+        adapter = get_adapter(booking.payment_method)
+        refund = None
+        if can_refund and adapter.supports_refunds:
+            # Queue an automatic refund; the process_refunds worker submits
+            # it to the provider with the other pending refunds in a batch
+            payment_transaction = PaymentTransaction.objects.filter(booking=booking, status='completed').first()
+            if payment_transaction is not None:
+                refund = queue_refund(payment_transaction)
         
         return Response({
             'message': 'Booking cancelled successfully',
-            'refund_processed': can_refund and booking.payment_method != 'cash',
-            'refund_id': refund_id
+            'refund_processed': can_refund and adapter.supports_refunds,
+            'refund_id': booking.refund_id,
+            'refund_status': refund.status if refund else None
         })
     
     @action(detail=True, methods=['get'])
     def status(self, request, pk=None):
         """Get booking status."""
-        booking = self.get_object()
+        try:
+            booking = self.get_object()
+        except Http404:
+            return Response(ArchivedBookingSerializer(self.get_archived_object()).data)
         serializer = BookingStatusSerializer(booking)
         return Response(serializer.data)
 
@@ -307,33 +707,20 @@ class OperatorBookingViewSet(viewsets.ModelViewSet):
         'schedule_occurrence__recurrence__bus'
     ).all()
     serializer_class = BookingSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [IsAssignedOperator]
     authentication_classes = [SessionAuthentication]
     
     def get_queryset(self):
         """Filter bookings by operator's assigned routes."""
-        if not hasattr(self.request.user, 'operator_profile'):
-            return Booking.objects.none()
-        
         operator = self.request.user.operator_profile
-        assigned_routes = OperatorAssignment.objects.filter(
-            operator=operator,
-            is_active=True
-        ).values_list('route_id', flat=True)
-        
         return self.queryset.filter(
-            schedule_occurrence__recurrence__route_id__in=assigned_routes
+            schedule_occurrence__recurrence__route_id__in=assigned_route_ids(operator, self.request)
         )
     
+    @idempotent
     @transaction.atomic
     def create(self, request, *args, **kwargs):
         """Create a cash booking on behalf of customer."""
-        if not hasattr(request.user, 'operator_profile'):
-            return Response(
-                {'error': 'User is not an operator'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
         operator = request.user.operator_profile
         
         serializer = BookingCreateSerializer(data=request.data)
@@ -342,10 +729,12 @@ class OperatorBookingViewSet(viewsets.ModelViewSet):
         schedule_occurrence_id = serializer.validated_data['schedule_occurrence_id']
         
         # Lock the schedule occurrence
+        lock_started = time.perf_counter()
         schedule_occurrence = ScheduleOccurrence.objects.select_for_update().get(
             id=schedule_occurrence_id,
             status='scheduled'
         )
+        SEAT_LOCK_WAIT.observe(time.perf_counter() - lock_started)
         
         # Check if departure time has passed
         from datetime import datetime
@@ -360,11 +749,7 @@ class OperatorBookingViewSet(viewsets.ModelViewSet):
             )
         
         # Verify operator has access to this route
-        if not OperatorAssignment.objects.filter(
-            operator=operator,
-            route=schedule_occurrence.recurrence.route,
-            is_active=True
-        ).exists():
+        if not can_access_route(operator, schedule_occurrence.recurrence.route_id, request):
             return Response(
                 {'error': 'Operator not assigned to this route'},
                 status=status.HTTP_403_FORBIDDEN
@@ -377,6 +762,16 @@ class OperatorBookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Assign the requested seat, or the first free one
+        requested_seat = serializer.validated_data.get('seat_number')
+        try:
+            seat_number = assign_seats(
+                schedule_occurrence,
+                requested=[requested_seat] if requested_seat else None
+            )[0]
+        except SeatUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
         # Create booking with cash payment
         booking = Booking.objects.create(
             passenger_name=serializer.validated_data['passenger_name'],
@@ -385,7 +780,8 @@ class OperatorBookingViewSet(viewsets.ModelViewSet):
             schedule_occurrence=schedule_occurrence,
             payment_method='cash',
             status='confirmed',
-            operator=operator
+            operator=operator,
+            seat_number=seat_number
         )
         
         # Create payment transaction
@@ -397,6 +793,10 @@ class OperatorBookingViewSet(viewsets.ModelViewSet):
             status='completed',
             booking=booking
         )
+        BOOKINGS_CREATED.inc(
+            route=schedule_occurrence.recurrence.route.name,
+            payment_method='cash'
+        )
         
         # Send notifications
         send_notification_async(booking, schedule_occurrence)
@@ -404,6 +804,126 @@ class OperatorBookingViewSet(viewsets.ModelViewSet):
         response_serializer = BookingSerializer(booking)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'])
+    @idempotent
+    @transaction.atomic
+    def bulk(self, request):
+        """
+        Sell many cash tickets, across one or more departures, in one request.
+        
+        The batch is all-or-nothing. Operator assignments are loaded once,
+        occurrences are locked in id order (so concurrent batches cannot
+        deadlock), bookings and payment transactions are bulk-created, and
+        notifications are sent in the background after commit.
+        """
+        operator = request.user.operator_profile
+        
+        serializer = BulkCashSaleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sales = serializer.validated_data['bookings']
+        
+        sales_by_occurrence = {}
+        for sale in sales:
+            sales_by_occurrence.setdefault(sale['schedule_occurrence_id'], []).append(sale)
+        
+        assigned_routes = assigned_route_ids(operator, request)
+        
+        # Lock every occurrence in the batch in a consistent (id) order
+        lock_started = time.perf_counter()
+        locked_ids = list(ScheduleOccurrence.objects.select_for_update().filter(
+            id__in=sales_by_occurrence.keys(),
+            status='scheduled'
+        ).order_by('id').values_list('id', flat=True))
+        SEAT_LOCK_WAIT.observe(time.perf_counter() - lock_started)
+        occurrences = ScheduleOccurrence.objects.select_related(
+            'recurrence__route',
+            'recurrence__bus'
+        ).in_bulk(locked_ids)
+        
+        missing = sorted(set(sales_by_occurrence) - set(occurrences))
+        if missing:
+            return Response(
+                {'error': f'Schedule {missing[0]} does not exist or is not open for booking'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        from datetime import datetime
+        now = timezone.now()
+        for occurrence_id in locked_ids:
+            schedule_occurrence = occurrences[occurrence_id]
+            if schedule_occurrence.recurrence.route_id not in assigned_routes:
+                return Response(
+                    {'error': f'Operator not assigned to the route of schedule {occurrence_id}'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            departure_datetime = timezone.make_aware(
+                datetime.combine(schedule_occurrence.date, schedule_occurrence.departure_time)
+            )
+            if departure_datetime <= now:
+                return Response(
+                    {'error': f'Schedule {occurrence_id} has already departed'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        # Assign seats per occurrence; any failure rolls back the whole batch
+        bookings = []
+        for occurrence_id in locked_ids:
+            schedule_occurrence = occurrences[occurrence_id]
+            occurrence_sales = sales_by_occurrence[occurrence_id]
+            seated = [sale for sale in occurrence_sales if sale.get('seat_number')]
+            unseated = [sale for sale in occurrence_sales if not sale.get('seat_number')]
+            try:
+                if schedule_occurrence.remaining_seats < len(occurrence_sales):
+                    raise SeatUnavailable('Not enough seats available for this schedule')
+                seats = []
+                if seated:
+                    seats += assign_seats(schedule_occurrence, requested=[sale['seat_number'] for sale in seated])
+                if unseated:
+                    seats += assign_seats(schedule_occurrence, count=len(unseated))
+            except SeatUnavailable as e:
+                transaction.set_rollback(True)
+                return Response(
+                    {'error': f'Schedule {occurrence_id}: {e}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            for sale, seat in zip(seated + unseated, seats):
+                bookings.append(Booking(
+                    passenger_name=sale['passenger_name'],
+                    phone_number=sale['phone_number'],
+                    email=sale.get('email') or None,
+                    schedule_occurrence=schedule_occurrence,
+                    payment_method='cash',
+                    status='confirmed',
+                    operator=operator,
+                    seat_number=seat
+                ))
+        
+        Booking.objects.bulk_create(bookings)
+        PaymentTransaction.objects.bulk_create([
+            PaymentTransaction(
+                provider='cash',
+                provider_transaction_id=f'CASH_{booking.id}',
+                amount=booking.schedule_occurrence.recurrence.route.fare,
+                status='completed',
+                booking=booking
+            )
+            for booking in bookings
+        ])
+        for occurrence_id in locked_ids:
+            BOOKINGS_CREATED.inc(
+                len(sales_by_occurrence[occurrence_id]),
+                route=occurrences[occurrence_id].recurrence.route.name,
+                payment_method='cash'
+            )
+        
+        defer_notifications(bookings)
+        
+        return Response({
+            'count': len(bookings),
+            'bookings': BookingSerializer(bookings, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=False, methods=['get'])
     def route_bookings(self, request):
         """Get bookings for a specific route."""
@@ -414,20 +934,10 @@ class OperatorBookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        if not hasattr(request.user, 'operator_profile'):
-            return Response(
-                {'error': 'User is not an operator'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
         operator = request.user.operator_profile
         
         # Verify operator has access
-        if not OperatorAssignment.objects.filter(
-            operator=operator,
-            route_id=route_id,
-            is_active=True
-        ).exists():
+        if not can_access_route(operator, route_id, request):
             return Response(
                 {'error': 'Operator not assigned to this route'},
                 status=status.HTTP_403_FORBIDDEN
@@ -443,42 +953,26 @@ class OperatorBookingViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def assigned_routes(self, request):
         """Get routes assigned to the operator."""
-        if not hasattr(request.user, 'operator_profile'):
-            return Response(
-                {'error': 'User is not an operator'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
         operator = request.user.operator_profile
-        assignments = OperatorAssignment.objects.filter(
-            operator=operator,
-            is_active=True
-        ).select_related('route')
-        
-        routes = [assignment.route for assignment in assignments]
+        routes = Route.objects.filter(
+            id__in=assigned_route_ids(operator, request)
+        ).select_related('origin', 'destination').order_by('name')
         serializer = RouteSerializer(routes, many=True)
         return Response(serializer.data)
 
 
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([IsOperator])
 def mark_schedule_departed(request, schedule_id):
     """Mark a schedule occurrence as departed."""
-    if not hasattr(request.user, 'operator_profile'):
-        return Response(
-            {'error': 'User is not an operator'},
-            status=status.HTTP_403_FORBIDDEN
-        )
-    
     operator = request.user.operator_profile
-    schedule_occurrence = get_object_or_404(ScheduleOccurrence, id=schedule_id)
+    schedule_occurrence = get_object_or_404(
+        ScheduleOccurrence.objects.select_related('recurrence__route', 'recurrence__bus'),
+        id=schedule_id
+    )
     
     # Verify operator has access
-    if not OperatorAssignment.objects.filter(
-        operator=operator,
-        route=schedule_occurrence.recurrence.route,
-        is_active=True
-    ).exists():
+    if not can_access_route(operator, schedule_occurrence.recurrence.route_id, request):
         return Response(
             {'error': 'Operator not assigned to this route'},
             status=status.HTTP_403_FORBIDDEN
@@ -486,6 +980,7 @@ def mark_schedule_departed(request, schedule_id):
     
     schedule_occurrence.status = 'departed'
     schedule_occurrence.save()
+    finalize_manifest(schedule_occurrence)
     
     return Response({
         'message': 'Schedule marked as departed',
@@ -493,6 +988,51 @@ def mark_schedule_departed(request, schedule_id):
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsOperator])
+def operator_manifest(request, schedule_id):
+    """
+    Passenger manifest for a schedule occurrence.
+    
+    ?output=json (default), csv (gzip'd) or pdf. Departed schedules serve the
+    copy finalised at departure; otherwise the file is rendered on the fly.
+    """
+    operator = request.user.operator_profile
+    schedule_occurrence = get_object_or_404(
+        ScheduleOccurrence.objects.select_related('recurrence__route', 'recurrence__bus'),
+        id=schedule_id
+    )
+    
+    if not can_access_route(operator, schedule_occurrence.recurrence.route_id, request):
+        return Response(
+            {'error': 'Operator not assigned to this route'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    output = request.query_params.get('output', 'json')
+    if output == 'json':
+        return Response(build_manifest(schedule_occurrence))
+    if output not in MANIFEST_FORMATS:
+        return Response(
+            {'error': f"output must be one of: json, {', '.join(MANIFEST_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    extension, content_type = MANIFEST_FORMATS[output]
+    filename = f'manifest-{schedule_occurrence.id}.{extension}'
+    if schedule_occurrence.status == 'departed':
+        stored = open_stored_manifest(schedule_occurrence.id, output)
+        if stored is not None:
+            return FileResponse(stored, as_attachment=True, filename=filename, content_type=content_type)
+    
+    response = HttpResponse(
+        render_manifest(build_manifest(schedule_occurrence), output),
+        content_type=content_type
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 # Frontend views
 def index_view(request):
     """Landing page."""
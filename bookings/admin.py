@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import ScheduleRecurrence, ScheduleOccurrence, Booking
+from .models import (
+    ScheduleRecurrence, ScheduleOccurrence, SeatInventory, SeatEvent, Booking, FareRule, WaitlistEntry,
+    ArchivedOccurrence, ArchivedBooking,
+)
+from .fares import invalidate_fares
 
 
 @admin.register(ScheduleRecurrence)
@@ -17,10 +21,76 @@ class ScheduleOccurrenceAdmin(admin.ModelAdmin):
     readonly_fields = ['remaining_seats', 'time_to_departure']
 
 
+@admin.register(SeatInventory)
+class SeatInventoryAdmin(admin.ModelAdmin):
+    list_display = ['schedule_occurrence', 'version', 'updated_at']
+    readonly_fields = ['occupied', 'version', 'updated_at']
+
+
+@admin.register(SeatEvent)
+class SeatEventAdmin(admin.ModelAdmin):
+    list_display = ['schedule_occurrence', 'reason', 'seats', 'created_at', 'processed_at']
+    list_filter = ['reason']
+    readonly_fields = ['schedule_occurrence', 'reason', 'seats', 'created_at', 'processed_at']
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
-    list_display = ['id', 'passenger_name', 'phone_number', 'schedule_occurrence', 'payment_method', 'status', 'created_at']
+    list_display = ['id', 'passenger_name', 'phone_number', 'schedule_occurrence', 'seat_number', 'payment_method', 'status', 'created_at']
     list_filter = ['status', 'payment_method', 'created_at']
     search_fields = ['passenger_name', 'phone_number', 'id']
-    readonly_fields = ['id', 'created_at', 'cancelled_at']
+    readonly_fields = ['id', 'created_at', 'cancelled_at', 'hold_expires_at']
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['passenger_name', 'phone_number', 'schedule_occurrence', 'status', 'created_at', 'promoted_at']
+    list_filter = ['status']
+    search_fields = ['passenger_name', 'phone_number']
+    readonly_fields = ['id', 'booking', 'created_at', 'promoted_at']
+
+
+class ArchiveAdmin(admin.ModelAdmin):
+    """Archived rows are history: viewable, not editable (see bookings/archive.py)."""
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedOccurrence)
+class ArchivedOccurrenceAdmin(ArchiveAdmin):
+    list_display = ['id', 'recurrence', 'date', 'departure_time', 'status', 'archived_at']
+    list_filter = ['status', 'recurrence__route']
+    date_hierarchy = 'date'
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(ArchiveAdmin):
+    list_display = ['id', 'passenger_name', 'phone_number', 'schedule_occurrence', 'seat_number', 'payment_method', 'status', 'created_at']
+    list_filter = ['status', 'payment_method']
+    search_fields = ['passenger_name', 'phone_number', 'id']
+    raw_id_fields = ['schedule_occurrence']
+
+
 
+@admin.register(FareRule)
+class FareRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'route', 'weekdays', 'start_time', 'end_time', 'min_lead_hours', 'max_lead_hours',
+                    'min_load_factor', 'max_load_factor', 'multiplier', 'amount', 'priority', 'is_active']
+    list_filter = ['is_active', 'route']
+    search_fields = ['name', 'route__name']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_fares()
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_fares()
+    
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        invalidate_fares()
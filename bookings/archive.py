@@ -0,0 +1,145 @@
+"""
+Archival of departed schedule occurrences.
+
+schedule_occurrences and bookings (with payment_transactions and refunds)
+only ever grow, but almost every query on them is about upcoming or
+recent departures. archive_departures() moves occurrences dated more than
+ARCHIVE_RETENTION_DAYS ago, with their bookings, payment transactions and
+refunds, to archive tables of the same shape (*_archive). Seat
+inventories, seat events, waitlist entries and operator seat allocations
+are only needed before departure and are deleted with their occurrence.
+
+Each batch of occurrences is copied and deleted in one transaction, so a
+row is always in exactly one of the live and archive tables, and the
+occurrences are claimed with SKIP LOCKED, so the job never waits on (or
+blocks) a request. Rows keep their ids, and payment events are not moved:
+they keep pointing at the archived transactions and refunds.
+
+Archive tables were chosen over MySQL RANGE partitions of the live
+tables: MySQL does not partition tables with foreign keys, and every
+unique key (bookings.client_reference, the UUID primary keys) would have
+to include the partition column.
+
+Read paths that accept historical ranges (the schedule history, booking
+lookup and admin booking list APIs) also read the archive when asked about
+dates before archive_cutoff(). The daily route rollups are not affected:
+rows are not recomputed when their source rows are archived.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from payments.models import ArchivedPaymentTransaction, ArchivedRefund, PaymentTransaction, Refund
+from .models import ArchivedBooking, ArchivedOccurrence, Booking, ScheduleOccurrence
+
+# Archive columns that do not come from the live table
+ARCHIVE_ONLY_FIELDS = {'archived_at'}
+
+
+def archive_cutoff(today=None):
+    """First travel date still kept in the live tables."""
+    today = today or timezone.localdate()
+    return today - timedelta(days=settings.ARCHIVE_RETENTION_DAYS)
+
+
+def includes_archive(start):
+    """Whether a date range starting at start reaches archived dates."""
+    return start < archive_cutoff()
+
+
+class ArchiveChain:
+    """
+    Read-only sequence of an archive queryset followed by a live one, so a
+    date range spanning both tables can be paginated with two LIMIT queries.
+
+    Both querysets must have the same ordering by date. Archived rows are
+    all older than the live ones, apart from departures held back for
+    pending refunds, which are listed with the live rows.
+    """
+
+    def __init__(self, archived, live):
+        self.archived = archived
+        self.live = live
+        self._archived_count = None
+
+    def _split(self):
+        if self._archived_count is None:
+            self._archived_count = self.archived.count()
+        return self._archived_count
+
+    def count(self):
+        return self._split() + self.live.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        split = self._split()
+        rows = []
+        if start < split:
+            rows.extend(self.archived[start:split if stop is None else min(stop, split)])
+        if stop is None or stop > split:
+            rows.extend(self.live[max(start - split, 0):None if stop is None else stop - split])
+        return rows
+
+
+def _copy(archive_model, queryset):
+    """Insert queryset's rows into archive_model, which has the same columns. Returns the row count."""
+    fields = [field.attname for field in archive_model._meta.concrete_fields if field.name not in ARCHIVE_ONLY_FIELDS]
+    rows = [archive_model(**row) for row in queryset.values(*fields)]
+    archive_model.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _archive_batch(before, batch_size):
+    """Move up to batch_size occurrences dated before `before`. Returns counts, or None when done."""
+    with transaction.atomic():
+        occurrence_ids = list(ScheduleOccurrence.objects.select_for_update(skip_locked=True).filter(
+            date__lt=before
+        ).exclude(
+            # Leave departures with refunds still being paid out for a later run
+            bookings__payment_transaction__refunds__status='pending'
+        ).order_by('date', 'id').values_list('id', flat=True)[:batch_size])
+        if not occurrence_ids:
+            return None
+
+        occurrences = ScheduleOccurrence.objects.filter(id__in=occurrence_ids)
+        bookings = Booking.objects.filter(schedule_occurrence_id__in=occurrence_ids)
+        transactions = PaymentTransaction.objects.filter(booking__schedule_occurrence_id__in=occurrence_ids)
+        refunds = Refund.objects.filter(payment_transaction__booking__schedule_occurrence_id__in=occurrence_ids)
+
+        # Parents before children on insert, children before parents on delete
+        counts = {
+            'occurrences': _copy(ArchivedOccurrence, occurrences),
+            'bookings': _copy(ArchivedBooking, bookings),
+            'payment_transactions': _copy(ArchivedPaymentTransaction, transactions),
+            'refunds': _copy(ArchivedRefund, refunds),
+        }
+        refunds.delete()
+        transactions.delete()
+        bookings.delete()
+        occurrences.delete()
+    return counts
+
+
+def archive_departures(before=None, batch_size=200):
+    """
+    Move all occurrences dated before `before` (default: archive_cutoff())
+    and their bookings and payments to the archive tables.
+
+    Returns a dict of counts: occurrences, bookings, payment_transactions
+    and refunds archived.
+    """
+    before = before or archive_cutoff()
+    totals = {'occurrences': 0, 'bookings': 0, 'payment_transactions': 0, 'refunds': 0}
+    while True:
+        counts = _archive_batch(before, batch_size)
+        if counts is None:
+            return totals
+        for key, count in counts.items():
+            totals[key] += count
@@ -0,0 +1,223 @@
+"""
+Fare engine.
+
+A departure's price is its route fare adjusted by the FareRule rows that
+match it. Weekday and time-of-day conditions are fixed for a departure,
+but lead time and load factor change as departure approaches and seats
+sell. build_price_table() therefore precomputes, per departure, a small
+grid of prices for every lead-time band x load-factor band that the rules
+distinguish. Quoting is then two bisects and a lookup. Tables are cached
+per departure. Keys include a rules version bumped by invalidate_fares()
+and the route fare, date and departure time, so edits take effect on the
+next quote.
+
+Quotes are signed (django.core.signing) with the departure and price and
+honoured at booking for FARE_QUOTE_TTL_SECONDS, so a passenger pays the
+price they were shown even if it changes while they fill in the form.
+"""
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Booking, FareRule
+
+QUOTE_SALT = 'bookings.fares.quote'
+VERSION_KEY = 'fares:version'
+CENT = Decimal('0.01')
+
+
+class QuoteInvalid(Exception):
+    """Raised when a fare quote is malformed, expired or for another departure."""
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_fares():
+    """Discard cached price tables after fare rules change."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def _route_fare(occurrence):
+    # Unsaved or freshly created routes can hold the model's float default
+    return Decimal(str(occurrence.recurrence.route.fare)).quantize(CENT)
+
+
+def _table_key(occurrence, version):
+    return (
+        f'fares:table:{occurrence.id}:{version}:{_route_fare(occurrence)}:'
+        f'{occurrence.date.isoformat()}:{occurrence.departure_time.strftime("%H%M%S")}'
+    )
+
+
+def _matches_departure(rule, occurrence):
+    if rule.route_id is not None and rule.route_id != occurrence.recurrence.route_id:
+        return False
+    if rule.weekdays and occurrence.date.weekday() not in rule.weekdays:
+        return False
+    departure = occurrence.departure_time
+    if rule.start_time is not None and rule.end_time is not None and rule.end_time <= rule.start_time:
+        # Window wraps past midnight, e.g. 22:00-05:00
+        return departure >= rule.start_time or departure < rule.end_time
+    if rule.start_time is not None and departure < rule.start_time:
+        return False
+    if rule.end_time is not None and departure >= rule.end_time:
+        return False
+    return True
+
+
+def _bands(edges):
+    """Split the number line at edges into (low, high) bands; None is unbounded."""
+    bounds = [None, *edges, None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _covers(minimum, maximum, band):
+    """Whether a rule range [minimum, maximum) contains the whole band."""
+    low, high = band
+    if minimum is not None and (low is None or low < float(minimum)):
+        return False
+    if maximum is not None and (high is None or high > float(maximum)):
+        return False
+    return True
+
+
+def build_price_table(occurrence, rules):
+    """Precompute prices for a departure across its lead-time and load-factor bands."""
+    rules = [rule for rule in rules if _matches_departure(rule, occurrence)]
+    lead_edges = sorted({
+        float(value) for rule in rules
+        for value in (rule.min_lead_hours, rule.max_lead_hours) if value is not None
+    })
+    load_edges = sorted({
+        float(value) for rule in rules
+        for value in (rule.min_load_factor, rule.max_load_factor) if value is not None
+    })
+
+    prices = []
+    for lead_band in _bands(lead_edges):
+        row = []
+        for load_band in _bands(load_edges):
+            price = _route_fare(occurrence)
+            for rule in rules:
+                if (_covers(rule.min_lead_hours, rule.max_lead_hours, lead_band) and
+                        _covers(rule.min_load_factor, rule.max_load_factor, load_band)):
+                    price = price * rule.multiplier + rule.amount
+            row.append(str(max(price, Decimal('0')).quantize(CENT)))
+        prices.append(row)
+
+    return {'lead_edges': lead_edges, 'load_edges': load_edges, 'prices': prices}
+
+
+def price_tables(occurrences):
+    """
+    Return {occurrence id: price table}, from the cache where possible.
+
+    Occurrences need recurrence__route select_related. Missing tables are
+    built with one query for the rules of all the listed routes.
+    """
+    version = _version()
+    keys = {occurrence.id: _table_key(occurrence, version) for occurrence in occurrences}
+    cached = cache.get_many(keys.values())
+    tables = {occurrence_id: cached[key] for occurrence_id, key in keys.items() if key in cached}
+
+    missing = [occurrence for occurrence in occurrences if occurrence.id not in tables]
+    if missing:
+        route_ids = {occurrence.recurrence.route_id for occurrence in missing}
+        rules = list(FareRule.objects.filter(
+            Q(route_id__in=route_ids) | Q(route__isnull=True),
+            is_active=True
+        ).order_by('priority', 'id'))
+        built = {occurrence.id: build_price_table(occurrence, rules) for occurrence in missing}
+        cache.set_many(
+            {keys[occurrence_id]: table for occurrence_id, table in built.items()},
+            settings.FARE_TABLE_CACHE_TIMEOUT
+        )
+        tables.update(built)
+    return tables
+
+
+def lookup_price(table, lead_hours, load_factor):
+    row = table['prices'][bisect_right(table['lead_edges'], lead_hours)]
+    return Decimal(row[bisect_right(table['load_edges'], load_factor)])
+
+
+def quote_prices(occurrences, now=None):
+    """Return {occurrence id: current price} for a listing of departures in one pass."""
+    occurrences = list(occurrences)
+    now = now or timezone.now()
+    tables = price_tables(occurrences)
+    confirmed = dict(Booking.objects.filter(
+        schedule_occurrence_id__in=[occurrence.id for occurrence in occurrences],
+        status='confirmed'
+    ).values_list('schedule_occurrence_id').annotate(count=Count('id')).order_by())
+
+    prices = {}
+    for occurrence in occurrences:
+        departure = timezone.make_aware(datetime.combine(occurrence.date, occurrence.departure_time))
+        lead_hours = (departure - now).total_seconds() / 3600
+        capacity = occurrence.recurrence.bus.capacity
+        load_factor = confirmed.get(occurrence.id, 0) / capacity if capacity else 1.0
+        prices[occurrence.id] = lookup_price(tables[occurrence.id], lead_hours, load_factor)
+    return prices
+
+
+def current_price(occurrence):
+    return quote_prices([occurrence])[occurrence.id]
+
+
+def sign_quote(occurrence_id, price):
+    """Return a signed, short-lived quote token for a departure's price."""
+    return signing.dumps({'schedule_id': occurrence_id, 'price': str(price)}, salt=QUOTE_SALT, compress=True)
+
+
+def verify_quote(token, occurrence_id):
+    """Return the quoted price, or raise QuoteInvalid."""
+    try:
+        payload = signing.loads(token, salt=QUOTE_SALT, max_age=settings.FARE_QUOTE_TTL_SECONDS)
+    except signing.SignatureExpired:
+        raise QuoteInvalid('Fare quote has expired; please refresh the schedule')
+    except signing.BadSignature:
+        raise QuoteInvalid('Invalid fare quote')
+    if payload.get('schedule_id') != occurrence_id:
+        raise QuoteInvalid('Fare quote is for a different schedule')
+    return Decimal(payload['price'])
+
+
+def booking_fare(occurrence, quote=None):
+    """Price to charge for one seat: the quoted price if a valid quote is given."""
+    if quote:
+        return verify_quote(quote, occurrence.id)
+    return current_price(occurrence)
+
+
+def quote_listing(occurrences):
+    """Prices with signed quotes for a schedule listing."""
+    occurrences = list(occurrences)
+    prices = quote_prices(occurrences)
+    expires_at = timezone.now() + timedelta(seconds=settings.FARE_QUOTE_TTL_SECONDS)
+    return [
+        {
+            'schedule_id': occurrence.id,
+            'base_fare': _route_fare(occurrence),
+            'price': prices[occurrence.id],
+            'quote': sign_quote(occurrence.id, prices[occurrence.id]),
+            'expires_at': expires_at,
+        }
+        for occurrence in occurrences
+    ]
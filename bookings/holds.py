@@ -0,0 +1,60 @@
+"""
+Seat holds for unpaid bookings.
+
+A booking is created 'pending' with its seat already assigned and
+hold_expires_at set BOOKING_HOLD_SECONDS ahead. If payment has not
+confirmed it by then, expire_holds() reclaims the seat: it locks a batch
+of expired holds through the (status, hold_expires_at) index, skipping
+rows a payment callback is still working on, marks them 'expired' and
+their pending transactions 'failed' with two set-based updates, and
+releases the seats with one inventory update per schedule occurrence.
+Each release is recorded as a SeatEvent so waiting passengers can be
+offered the seat.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from payments.models import PaymentTransaction
+from .models import Booking
+from .seats import release_seats
+
+
+def hold_expiry(now=None):
+    """Return when a hold placed now should be released."""
+    return (now or timezone.now()) + timedelta(seconds=settings.BOOKING_HOLD_SECONDS)
+
+
+def expire_holds(now=None, batch_size=500):
+    """
+    Expire one batch of pending bookings whose hold has run out.
+
+    Returns the number of bookings expired; call again until it returns
+    less than batch_size.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = list(Booking.objects.select_for_update(skip_locked=True).filter(
+            status='pending',
+            hold_expires_at__lte=now
+        ).order_by('hold_expires_at').values_list('id', 'schedule_occurrence_id', 'seat_number')[:batch_size])
+        if not rows:
+            return 0
+
+        booking_ids = [booking_id for booking_id, _, _ in rows]
+        Booking.objects.filter(id__in=booking_ids).update(status='expired', updated_at=now)
+        PaymentTransaction.objects.filter(
+            booking_id__in=booking_ids,
+            status='pending'
+        ).update(status='failed', updated_at=now)
+
+        seats = defaultdict(list)
+        for _, schedule_occurrence_id, seat_number in rows:
+            seats[schedule_occurrence_id].append(seat_number)
+        # Fixed order so concurrent workers lock inventory rows consistently
+        for schedule_occurrence_id in sorted(seats):
+            release_seats(schedule_occurrence_id, seats[schedule_occurrence_id], reason='expired')
+    return len(rows)
@@ -0,0 +1,43 @@
+"""
+Management command to move old departures and their bookings and payments to the archive tables.
+Run it nightly (via cron) to keep schedule_occurrences and bookings small.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from bookings.archive import archive_cutoff, archive_departures
+
+
+class Command(BaseCommand):
+    help = 'Archives schedule occurrences older than the retention window with their bookings and payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            help='Travel days kept in the live tables (default: ARCHIVE_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Occurrences archived per transaction (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if options['retention_days'] is None:
+            before = archive_cutoff()
+        elif options['retention_days'] < 1:
+            raise CommandError('--retention-days must be positive')
+        else:
+            before = timezone.localdate() - timedelta(days=options['retention_days'])
+        
+        counts = archive_departures(before=before, batch_size=options['batch_size'])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {counts['occurrences']} occurrences before {before}, {counts['bookings']} bookings, "
+            f"{counts['payment_transactions']} payment transactions and {counts['refunds']} refunds"
+        ))
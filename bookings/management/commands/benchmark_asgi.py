@@ -0,0 +1,150 @@
+"""
+Management command to compare concurrent-request capacity of the WSGI and
+ASGI deployments.
+
+Start both servers with the same number of worker processes, e.g.
+
+    gunicorn travel_suite.wsgi -w 4 -b 127.0.0.1:8001
+    uvicorn travel_suite.asgi:application --workers 4 --port 8002
+
+then fire the same load at the sync DRF endpoints on the WSGI server and at
+the async endpoints (/api/async/...) on the ASGI server, at increasing
+concurrency. Both servers must run with PAYMENTS_MODE=mock.
+"""
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from .load_test_bookings import Command as LoadTestCommand, percentile
+
+ENDPOINTS = {
+    # endpoint: (WSGI path, ASGI path, method)
+    'schedules': ('/api/schedules/', '/api/async/schedules/', 'GET'),
+    'bookings': ('/api/bookings/', '/api/async/bookings/', 'POST'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compares throughput and latency of the sync (WSGI) and async (ASGI) endpoints under concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--wsgi-url',
+            help='Base URL of the WSGI server (e.g. http://127.0.0.1:8001)',
+        )
+        parser.add_argument(
+            '--asgi-url',
+            help='Base URL of the ASGI server (e.g. http://127.0.0.1:8002)',
+        )
+        parser.add_argument(
+            '--endpoint',
+            choices=sorted(ENDPOINTS),
+            default='bookings',
+            help='Endpoint pair to compare (default: bookings)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            default='10,50,100,200',
+            help='Comma-separated concurrency levels (default: 10,50,100,200)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Requests per concurrency level (default: 200)',
+        )
+        parser.add_argument(
+            '--payment-method',
+            choices=['cash', 'mtn', 'airtel'],
+            default='mtn',
+            help='Payment method for booking requests (default: mtn, which waits on the mock provider)',
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Delete the benchmark departure and its bookings afterwards',
+        )
+
+    def handle(self, *args, **options):
+        targets = [
+            (name, url.rstrip('/') + path)
+            for name, url, path in [
+                ('wsgi', options['wsgi_url'], ENDPOINTS[options['endpoint']][0]),
+                ('asgi', options['asgi_url'], ENDPOINTS[options['endpoint']][1]),
+            ]
+            if url
+        ]
+        if not targets:
+            raise CommandError('Pass --wsgi-url and/or --asgi-url.')
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma-separated list of integers.')
+
+        method = ENDPOINTS[options['endpoint']][2]
+        total = options['requests']
+        occurrence = None
+        if method == 'POST':
+            # One departure with a seat for every request in the run
+            occurrence = LoadTestCommand()._create_occurrence(total * len(levels) * len(targets))
+
+        run_id = int(time.time()) % 100000
+        counter = iter(range(10 ** 9))
+
+        def payload():
+            if occurrence is None:
+                return None
+            index = next(counter)
+            return {
+                'passenger_name': f'Benchmark {index}',
+                'phone_number': f'+2507{run_id:05d}{index:05d}',
+                'schedule_occurrence_id': occurrence.id,
+                'payment_method': options['payment_method'],
+            }
+
+        self.stdout.write(f"{'server':<6} {'conc':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        try:
+            for concurrency in levels:
+                for name, url in targets:
+                    started = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                        results = list(executor.map(
+                            lambda _: self._send(url, method, payload()),
+                            range(total)
+                        ))
+                    elapsed = time.perf_counter() - started
+                    self._report(name, concurrency, results, elapsed)
+        finally:
+            if occurrence is not None and options['cleanup']:
+                occurrence.recurrence.delete()
+
+    def _send(self, url, method, payload):
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(payload).encode() if payload is not None else None,
+            headers={'Content-Type': 'application/json'},
+            method=method
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                response.read()
+                status_code = response.status
+        except urllib.error.HTTPError as e:
+            status_code = e.code
+        except (urllib.error.URLError, OSError):
+            status_code = None
+        return status_code, time.perf_counter() - started
+
+    def _report(self, name, concurrency, results, elapsed):
+        latencies = [latency * 1000 for _, latency in results]
+        errors = sum(1 for code, _ in results if code is None or code >= 500)
+        self.stdout.write(
+            f'{name:<6} {concurrency:>5} {len(results) / elapsed:>8.1f} '
+            f'{percentile(latencies, 50):>9.1f} {percentile(latencies, 95):>9.1f} '
+            f'{percentile(latencies, 99):>9.1f} {errors:>7}'
+        )
@@ -0,0 +1,88 @@
+"""
+Management command to benchmark database connection setup cost.
+Replays GET /api/schedules/ and GET /api/bookings/<id>/status/ through the
+in-process client with connections closed after every request
+(CONN_MAX_AGE=0) and with persistent connections, and reports latency and
+the number of connections opened in each mode.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+from bookings.models import Booking
+from bookings.management.commands.load_test_bookings import percentile
+
+
+class Command(BaseCommand):
+    help = 'Compares request latency with and without persistent/pooled DB connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Requests per endpoint and mode (default: 200)',
+        )
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=600,
+            help='CONN_MAX_AGE used for the persistent mode (default: 600)',
+        )
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        endpoints = ['/api/schedules/']
+        booking = Booking.objects.order_by('-created_at').first()
+        if booking:
+            endpoints.append(f'/api/bookings/{booking.id}/status/')
+        else:
+            self.stdout.write(self.style.WARNING('No bookings found; benchmarking schedules only.'))
+
+        pool = getattr(connection, 'pool', None)
+        modes = [('CONN_MAX_AGE=0', 0), (f'CONN_MAX_AGE={options["max_age"]}', options['max_age'])]
+        original_max_age = connection.settings_dict['CONN_MAX_AGE']
+
+        opened = []
+
+        def on_connection_created(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(on_connection_created)
+        try:
+            client = Client(HTTP_HOST='localhost')
+            for label, max_age in modes:
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                pool_before = pool.stats() if pool else None
+
+                self.stdout.write(f'\n{label} ({connection.vendor}, {connection.settings_dict["ENGINE"]})')
+                for endpoint in endpoints:
+                    del opened[:]
+                    latencies = []
+                    for _ in range(total):
+                        started = time.perf_counter()
+                        response = client.get(endpoint)
+                        latencies.append((time.perf_counter() - started) * 1000)
+                        if response.status_code != 200:
+                            self.stdout.write(self.style.ERROR(f'  {endpoint} returned {response.status_code}'))
+                            break
+                    self.stdout.write(
+                        f'  {endpoint}: mean={sum(latencies) / len(latencies):.2f}ms '
+                        f'p50={percentile(latencies, 50):.2f}ms p95={percentile(latencies, 95):.2f}ms '
+                        f'connections opened={len(opened)}'
+                    )
+
+                if pool:
+                    after = pool.stats()
+                    self.stdout.write(
+                        f'  pool: {after["created"] - pool_before["created"]} physical connects, '
+                        f'{after["reused"] - pool_before["reused"]} reused'
+                    )
+        finally:
+            connection_created.disconnect(on_connection_created)
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = original_max_age
@@ -0,0 +1,150 @@
+"""
+Management command to benchmark seat assignment under concurrency.
+Runs assign_seats() from many threads against one schedule occurrence until
+the bus is full, then checks that no seat was handed out twice and that the
+stored seat map matches the assignments. With --cycles, each thread also
+releases its seats and assigns again to measure sustained throughput.
+
+Run against a real database (MySQL); SQLite serialises writers, so it does
+not show contention.
+"""
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from bookings.models import ScheduleOccurrence, SeatInventory
+from bookings.seats import assign_seats, release_seats, seat_map, SeatUnavailable
+from bookings.management.commands.load_test_bookings import percentile, Command as LoadTestCommand
+
+
+class Command(BaseCommand):
+    help = 'Measures concurrent seat assignment throughput and checks for double-assigned seats'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--occurrence',
+            type=int,
+            help='ID of the schedule occurrence to assign seats on (its seat map is reset)',
+        )
+        parser.add_argument(
+            '--capacity',
+            type=int,
+            default=60,
+            help='Bus capacity when creating a benchmark occurrence (default: 60)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=20,
+            help='Number of concurrent threads (default: 20)',
+        )
+        parser.add_argument(
+            '--seats-per-booking',
+            type=int,
+            default=1,
+            help='Seats assigned per call, e.g. for group bookings (default: 1)',
+        )
+        parser.add_argument(
+            '--cycles',
+            type=int,
+            default=0,
+            help='Assign/release cycles per thread after the fill phase (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        created_recurrence = None
+        if options['occurrence']:
+            try:
+                occurrence = ScheduleOccurrence.objects.select_related('recurrence__bus').get(
+                    id=options['occurrence']
+                )
+            except ScheduleOccurrence.DoesNotExist:
+                raise CommandError(f"Schedule occurrence {options['occurrence']} does not exist.")
+        else:
+            occurrence = LoadTestCommand()._create_occurrence(options['capacity'])
+            created_recurrence = occurrence.recurrence
+
+        SeatInventory.objects.filter(schedule_occurrence=occurrence).delete()
+        concurrency = options['concurrency']
+        per_call = options['seats_per_booking']
+
+        try:
+            self._fill(occurrence, concurrency, per_call)
+            if options['cycles']:
+                self._cycle(occurrence, concurrency, per_call, options['cycles'])
+        finally:
+            SeatInventory.objects.filter(schedule_occurrence=occurrence).delete()
+            if created_recurrence is not None:
+                created_recurrence.delete()
+
+    def _fill(self, occurrence, concurrency, per_call):
+        capacity = occurrence.capacity
+        attempts = capacity // per_call + concurrency
+
+        def assign(_):
+            started = time.perf_counter()
+            try:
+                seats = assign_seats(occurrence, count=per_call)
+            except SeatUnavailable:
+                seats = []
+            finally:
+                connection.close()
+            return seats, (time.perf_counter() - started) * 1000
+
+        self.stdout.write(
+            f'Filling occurrence {occurrence.id} (capacity {capacity}) with {concurrency} threads, '
+            f'{per_call} seat(s) per call...'
+        )
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(assign, range(attempts)))
+        elapsed = time.perf_counter() - started
+
+        assigned = [seat for seats, _ in results for seat in seats]
+        latencies = [latency for _, latency in results]
+        duplicates = sorted(seat for seat, count in Counter(assigned).items() if count > 1)
+        stored = seat_map(occurrence)['occupied']
+
+        self.stdout.write(f'  Seats assigned:  {len(assigned)} / {capacity} in {elapsed:.2f}s')
+        self.stdout.write(f'  Throughput:      {len(assigned) / elapsed:.1f} seats/s')
+        self.stdout.write(
+            '  Latency ms:      p50={:.2f} p95={:.2f} p99={:.2f} max={:.2f}'.format(
+                percentile(latencies, 50), percentile(latencies, 95),
+                percentile(latencies, 99), max(latencies, default=0.0)
+            )
+        )
+        if duplicates:
+            self.stdout.write(self.style.ERROR(f'  Seats assigned twice: {duplicates}'))
+        elif sorted(assigned) != stored:
+            self.stdout.write(self.style.ERROR('  Stored seat map does not match the assigned seats!'))
+        else:
+            self.stdout.write(self.style.SUCCESS('  No seat assigned twice; seat map consistent.'))
+
+    def _cycle(self, occurrence, concurrency, per_call, cycles):
+        # Free a seat block per thread so every cycle has something to assign
+        release_seats(occurrence.id, list(range(1, concurrency * per_call + 1)))
+
+        def run(_):
+            failures = 0
+            for _ in range(cycles):
+                try:
+                    seats = assign_seats(occurrence, count=per_call)
+                except SeatUnavailable:
+                    failures += 1
+                    continue
+                release_seats(occurrence.id, seats)
+            connection.close()
+            return failures
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            failures = sum(executor.map(run, range(concurrency)))
+        elapsed = time.perf_counter() - started
+        operations = concurrency * cycles * 2
+
+        self.stdout.write(f'\nAssign/release cycles: {concurrency} threads x {cycles}')
+        self.stdout.write(f'  Operations:      {operations} in {elapsed:.2f}s ({operations / elapsed:.1f} ops/s)')
+        self.stdout.write(f'  Failed assigns:  {failures}')
@@ -0,0 +1,33 @@
+"""
+Management command to release the seats of unpaid bookings whose hold has expired.
+Run it every minute (via cron) so abandoned bookings do not block seats.
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from bookings.holds import expire_holds
+
+
+class Command(BaseCommand):
+    help = 'Expires pending bookings past their hold time and releases their seats'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Bookings expired per transaction (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        batch_size = options['batch_size']
+        total = 0
+        
+        # Short transactions so payment callbacks are never blocked for long
+        while True:
+            expired = expire_holds(now=now, batch_size=batch_size)
+            total += expired
+            if expired < batch_size:
+                break
+        
+        self.stdout.write(self.style.SUCCESS(f'Expired {total} booking holds'))
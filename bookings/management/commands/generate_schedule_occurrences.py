@@ -3,9 +3,11 @@ Management command to generate schedule occurrences for future dates.
 This ensures that schedule occurrences are always available for booking.
 Run this command daily (via cron) or manually to extend future occurrences.
 """
+import time
 from django.core.management.base import BaseCommand
 from datetime import date, timedelta
 from bookings.models import ScheduleRecurrence, ScheduleOccurrence
+from monitoring.metrics import REGISTRY, SCHEDULE_GENERATION_ROWS, SCHEDULE_GENERATION_RATE
 
 
 class Command(BaseCommand):
@@ -42,6 +44,7 @@ class Command(BaseCommand):
         
         today = date.today()
         end_date = today + timedelta(days=days_ahead)
+        started = time.perf_counter()
         
         total_created = 0
         total_updated = 0
@@ -109,10 +112,17 @@ class Command(BaseCommand):
                     )
                 )
         
+        elapsed = time.perf_counter() - started
+        rows_per_second = total_created / elapsed if elapsed > 0 else 0.0
+        SCHEDULE_GENERATION_ROWS.inc(total_created)
+        SCHEDULE_GENERATION_RATE.set(rows_per_second)
+        REGISTRY.flush()
+        
         self.stdout.write(
             self.style.SUCCESS(
                 f'\nCompleted! Created {total_created} new occurrences, '
-                f'updated {total_updated} existing occurrences.'
+                f'updated {total_updated} existing occurrences '
+                f'in {elapsed:.2f}s ({rows_per_second:.1f} rows/s).'
             )
         )
 
@@ -0,0 +1,260 @@
+"""
+Management command to load test booking creation against a single departure.
+Fires concurrent POST /api/bookings/ requests at one schedule occurrence and
+reports throughput, latency, seat lock wait and final seat-count consistency.
+
+Run against a real database (MySQL) - SQLite ignores select_for_update, so
+lock contention and overbooking results are meaningless there.
+"""
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as dt_time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+
+from routes.models import District, Route
+from buses.models import Bus
+from bookings.models import ScheduleRecurrence, ScheduleOccurrence, Booking
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of values (nearest-rank)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def parse_lock_wait(server_timing):
+    """Extract the lock duration (ms) from a Server-Timing header."""
+    for metric in (server_timing or '').split(','):
+        parts = [part.strip() for part in metric.split(';')]
+        if parts[0] == 'lock':
+            for part in parts[1:]:
+                if part.startswith('dur='):
+                    return float(part[4:])
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Fires concurrent booking requests at one schedule occurrence and reports contention'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--occurrence',
+            type=int,
+            help='ID of the schedule occurrence to book against',
+        )
+        parser.add_argument(
+            '--create-occurrence',
+            action='store_true',
+            help='Create a dedicated load-test route, bus and occurrence for tomorrow',
+        )
+        parser.add_argument(
+            '--capacity',
+            type=int,
+            default=40,
+            help='Bus capacity when using --create-occurrence (default: 40)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=100,
+            help='Total number of booking requests to send (default: 100)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=10,
+            help='Number of concurrent client threads (default: 10)',
+        )
+        parser.add_argument(
+            '--payment-method',
+            choices=['cash', 'mtn', 'airtel'],
+            default='cash',
+            help='Payment method for generated bookings (default: cash)',
+        )
+        parser.add_argument(
+            '--url',
+            help='Base URL of a live server (e.g. http://127.0.0.1:8000). '
+                 'Defaults to the in-process test client.',
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Delete the bookings (and created occurrence) after the run',
+        )
+
+    def handle(self, *args, **options):
+        if settings.PAYMENTS_MODE != 'mock':
+            raise CommandError('Load tests must run with PAYMENTS_MODE=mock.')
+
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'SQLite ignores select_for_update(); lock wait and overbooking results are not meaningful.'
+            ))
+
+        created_recurrence = None
+        if options['create_occurrence']:
+            occurrence = self._create_occurrence(options['capacity'])
+            created_recurrence = occurrence.recurrence
+        elif options['occurrence']:
+            try:
+                occurrence = ScheduleOccurrence.objects.select_related('recurrence__bus').get(
+                    id=options['occurrence']
+                )
+            except ScheduleOccurrence.DoesNotExist:
+                raise CommandError(f"Schedule occurrence {options['occurrence']} does not exist.")
+        else:
+            raise CommandError('Pass --occurrence ID or --create-occurrence.')
+
+        total = options['requests']
+        concurrency = options['concurrency']
+        payment_method = options['payment_method']
+        base_url = options['url']
+        run_id = int(time.time()) % 100000
+        phone_numbers = [f'+2507{run_id:05d}{i:04d}' for i in range(total)]
+
+        self.stdout.write(
+            f'Sending {total} bookings with concurrency {concurrency} to occurrence '
+            f'{occurrence.id} (capacity {occurrence.capacity}, payment {payment_method}) '
+            f'via {base_url or "in-process client"}...'
+        )
+
+        def send(index):
+            payload = {
+                'passenger_name': f'Load Test {index}',
+                'phone_number': phone_numbers[index],
+                'schedule_occurrence_id': occurrence.id,
+                'payment_method': payment_method,
+            }
+            try:
+                if base_url:
+                    return self._send_live(base_url, payload)
+                return self._send_in_process(payload)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(send, range(total)))
+        elapsed = time.perf_counter() - started
+
+        self._report(occurrence, results, elapsed)
+
+        if options['cleanup']:
+            if created_recurrence is not None:
+                created_recurrence.delete()
+            else:
+                Booking.objects.filter(
+                    schedule_occurrence=occurrence,
+                    phone_number__in=phone_numbers
+                ).delete()
+            self.stdout.write('Cleaned up load test bookings.')
+
+    def _create_occurrence(self, capacity):
+        origin = District.objects.get_or_create(name='Load Test Origin', defaults={'code': 'LTO'})[0]
+        destination = District.objects.get_or_create(name='Load Test Destination', defaults={'code': 'LTD'})[0]
+        route = Route.objects.get_or_create(
+            origin=origin,
+            destination=destination,
+            defaults={'name': 'Load Test Route'}
+        )[0]
+        bus = Bus.objects.get_or_create(
+            plate_number=f'LOAD{capacity:04d}',
+            defaults={'capacity': capacity, 'company_name': 'Load Test'}
+        )[0]
+        recurrence = ScheduleRecurrence.objects.create(
+            route=route,
+            bus=bus,
+            recurrence_type='daily',
+            departure_time=dt_time(23, 59),
+            arrival_time=dt_time(23, 59),
+            is_active=False
+        )
+        return ScheduleOccurrence.objects.create(
+            recurrence=recurrence,
+            date=date.today() + timedelta(days=1),
+            departure_time=recurrence.departure_time,
+            arrival_time=recurrence.arrival_time,
+            status='scheduled'
+        )
+
+    def _send_in_process(self, payload):
+        client = Client(HTTP_HOST='localhost')
+        started = time.perf_counter()
+        response = client.post('/api/bookings/', data=json.dumps(payload), content_type='application/json')
+        latency = time.perf_counter() - started
+        return response.status_code, latency, parse_lock_wait(response.get('Server-Timing'))
+
+    def _send_live(self, base_url, payload):
+        request = urllib.request.Request(
+            base_url.rstrip('/') + '/api/bookings/',
+            data=json.dumps(payload).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                status_code, headers = response.status, response.headers
+        except urllib.error.HTTPError as e:
+            status_code, headers = e.code, e.headers
+        except urllib.error.URLError:
+            return None, time.perf_counter() - started, None
+        latency = time.perf_counter() - started
+        return status_code, latency, parse_lock_wait(headers.get('Server-Timing'))
+
+    def _report(self, occurrence, results, elapsed):
+        latencies = [latency * 1000 for _, latency, _ in results]
+        lock_waits = [lock for _, _, lock in results if lock is not None]
+        created = sum(1 for code, _, _ in results if code == 201)
+        rejected = sum(1 for code, _, _ in results if code == 400)
+        payment_failed = sum(1 for code, _, _ in results if code == 402)
+        errors = len(results) - created - rejected - payment_failed
+
+        self.stdout.write('\nResults')
+        self.stdout.write(f'  Requests:        {len(results)} in {elapsed:.2f}s')
+        self.stdout.write(f'  Throughput:      {len(results) / elapsed:.1f} req/s, {created / elapsed:.1f} bookings/s')
+        self.stdout.write(f'  Created (201):   {created}')
+        self.stdout.write(f'  Sold out (400):  {rejected}')
+        self.stdout.write(f'  Payment (402):   {payment_failed}')
+        self.stdout.write(f'  Errors:          {errors}')
+        self.stdout.write(
+            '  Latency ms:      p50={:.1f} p90={:.1f} p95={:.1f} p99={:.1f} max={:.1f}'.format(
+                percentile(latencies, 50), percentile(latencies, 90), percentile(latencies, 95),
+                percentile(latencies, 99), max(latencies, default=0.0)
+            )
+        )
+        if lock_waits:
+            self.stdout.write(
+                '  Lock wait ms:    p50={:.1f} p95={:.1f} max={:.1f} total={:.1f}'.format(
+                    percentile(lock_waits, 50), percentile(lock_waits, 95),
+                    max(lock_waits), sum(lock_waits)
+                )
+            )
+
+        confirmed = Booking.objects.filter(schedule_occurrence=occurrence, status='confirmed').count()
+        capacity = occurrence.capacity
+        self.stdout.write(f'  Seats confirmed: {confirmed} / {capacity}')
+        if confirmed > capacity:
+            self.stdout.write(self.style.ERROR(f'  OVERBOOKED by {confirmed - capacity} seats!'))
+        else:
+            self.stdout.write(self.style.SUCCESS('  No overbooking detected.'))
+
+        duplicate_seats = Booking.objects.filter(
+            schedule_occurrence=occurrence,
+            status='confirmed',
+            seat_number__isnull=False
+        ).values('seat_number').annotate(n=Count('id')).filter(n__gt=1).count()
+        if duplicate_seats:
+            self.stdout.write(self.style.ERROR(f'  {duplicate_seats} seat(s) sold more than once!'))
@@ -0,0 +1,33 @@
+"""
+Management command to promote waitlisted passengers into freed seats.
+Run it every minute (via cron), after expire_booking_holds.
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from bookings.waitlist import promote_waitlist
+
+
+class Command(BaseCommand):
+    help = 'Offers seats freed by cancellations and expired holds to waitlisted passengers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Seat events processed per transaction (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        batch_size = options['batch_size']
+        events = promoted = 0
+        
+        while True:
+            processed, offered = promote_waitlist(now=now, batch_size=batch_size)
+            events += processed
+            promoted += offered
+            if processed < batch_size:
+                break
+        
+        self.stdout.write(self.style.SUCCESS(f'Processed {events} seat events, promoted {promoted} passengers'))
@@ -0,0 +1,34 @@
+"""
+Management command to delete expired Idempotency-Key records.
+Run it hourly (via cron) to keep the idempotency_records table small.
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from bookings.models import IdempotencyRecord
+
+
+class Command(BaseCommand):
+    help = 'Deletes stored Idempotency-Key responses past their expiry'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Records deleted per query (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        total = 0
+        
+        # Delete in batches so a large backlog does not hold long locks
+        while True:
+            ids = list(IdempotencyRecord.objects.filter(
+                expires_at__lte=now
+            ).values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            total += IdempotencyRecord.objects.filter(id__in=ids).delete()[0]
+        
+        self.stdout.write(self.style.SUCCESS(f'Deleted {total} expired idempotency records'))
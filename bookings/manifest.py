@@ -0,0 +1,146 @@
+"""
+Departure manifests (boarding lists).
+
+A manifest is a flat list of the active bookings on one schedule
+occurrence, read with a single values() query. When a departure is marked
+as departed the manifest is finalised: gzip'd CSV and PDF copies are
+written to default storage under manifests/ and served from there
+afterwards instead of being rebuilt.
+"""
+import csv
+import gzip
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import Booking
+
+MANIFEST_STATUSES = ['confirmed', 'pending']
+MANIFEST_COLUMNS = ['seat_number', 'ticket_id', 'passenger_name', 'phone_number', 'status', 'payment_method']
+MANIFEST_FORMATS = {
+    'csv': ('csv.gz', 'application/gzip'),
+    'pdf': ('pdf', 'application/pdf'),
+}
+
+# PDF page layout (A4 at 100 dpi); columns are (heading, x offset, key, width in chars)
+PAGE_SIZE = (827, 1169)
+PAGE_MARGIN = 50
+LINE_HEIGHT = 18
+PDF_COLUMNS = [
+    ('Seat', 0, 'seat_number', 4),
+    ('Passenger', 50, 'passenger_name', 30),
+    ('Phone', 300, 'phone_number', 20),
+    ('Status', 440, 'status', 10),
+    ('Payment', 530, 'payment_method', 8),
+    ('Ticket', 610, 'ticket_id', 8),
+]
+
+
+def build_manifest(schedule_occurrence):
+    """Return the manifest header and passengers for a schedule occurrence."""
+    passengers = [
+        {
+            'seat_number': row['seat_number'],
+            'ticket_id': str(row['id']),
+            'passenger_name': row['passenger_name'],
+            'phone_number': row['phone_number'],
+            'status': row['status'],
+            'payment_method': row['payment_method'],
+        }
+        for row in Booking.objects.filter(
+            schedule_occurrence_id=schedule_occurrence.id,
+            status__in=MANIFEST_STATUSES
+        ).order_by('seat_number', 'created_at').values(
+            'id', 'seat_number', 'passenger_name', 'phone_number', 'status', 'payment_method'
+        )
+    ]
+    return {
+        'schedule_id': schedule_occurrence.id,
+        'route': schedule_occurrence.recurrence.route.name,
+        'bus': schedule_occurrence.recurrence.bus.plate_number,
+        'date': schedule_occurrence.date,
+        'departure_time': schedule_occurrence.departure_time,
+        'status': schedule_occurrence.status,
+        'generated_at': timezone.now(),
+        'count': len(passengers),
+        'passengers': passengers,
+    }
+
+
+def render_csv_gz(manifest):
+    """Render a manifest as gzip-compressed CSV."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Route', manifest['route'], 'Bus', manifest['bus']])
+    writer.writerow(['Date', manifest['date'], 'Departure', manifest['departure_time']])
+    writer.writerow([])
+    writer.writerow(MANIFEST_COLUMNS)
+    for passenger in manifest['passengers']:
+        writer.writerow([passenger[column] for column in MANIFEST_COLUMNS])
+    return gzip.compress(output.getvalue().encode('utf-8'))
+
+
+def render_pdf(manifest):
+    """Render a manifest as a (multi-page) PDF using Pillow."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.load_default()
+    title = [
+        f"Manifest - {manifest['route']} ({manifest['bus']})",
+        f"{manifest['date']} {manifest['departure_time']} - {manifest['count']} passengers",
+    ]
+    headings = {key: heading for heading, _, key, _ in PDF_COLUMNS}
+    rows = [
+        {key: str(passenger[key] or '-')[:width] for _, _, key, width in PDF_COLUMNS}
+        for passenger in manifest['passengers']
+    ]
+
+    per_page = (PAGE_SIZE[1] - 2 * PAGE_MARGIN) // LINE_HEIGHT - len(title) - 2
+    pages = []
+    for start in range(0, max(len(rows), 1), per_page):
+        page = Image.new('RGB', PAGE_SIZE, 'white')
+        draw = ImageDraw.Draw(page)
+        y = PAGE_MARGIN
+        for line in title:
+            draw.text((PAGE_MARGIN, y), line, fill='black', font=font)
+            y += LINE_HEIGHT
+        y += LINE_HEIGHT
+        for row in [headings] + rows[start:start + per_page]:
+            for _, x, key, _ in PDF_COLUMNS:
+                draw.text((PAGE_MARGIN + x, y), row[key], fill='black', font=font)
+            y += LINE_HEIGHT
+        pages.append(page)
+
+    output = io.BytesIO()
+    pages[0].save(output, format='PDF', save_all=True, append_images=pages[1:], resolution=100.0)
+    return output.getvalue()
+
+
+def manifest_path(schedule_occurrence_id, output):
+    extension = MANIFEST_FORMATS[output][0]
+    return f'manifests/{schedule_occurrence_id}.{extension}'
+
+
+def render_manifest(manifest, output):
+    return render_csv_gz(manifest) if output == 'csv' else render_pdf(manifest)
+
+
+def finalize_manifest(schedule_occurrence):
+    """Write the final CSV and PDF manifests for a departed occurrence to storage."""
+    manifest = build_manifest(schedule_occurrence)
+    for output in MANIFEST_FORMATS:
+        path = manifest_path(schedule_occurrence.id, output)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        default_storage.save(path, ContentFile(render_manifest(manifest, output)))
+    return manifest
+
+
+def open_stored_manifest(schedule_occurrence_id, output):
+    """Open a finalised manifest file, or return None if there is none."""
+    path = manifest_path(schedule_occurrence_id, output)
+    if not default_storage.exists(path):
+        return None
+    return default_storage.open(path, 'rb')
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_seats(apps, schema_editor):
+    """Give active bookings on upcoming departures seats in booking order."""
+    Booking = apps.get_model('bookings', 'Booking')
+    SeatInventory = apps.get_model('bookings', 'SeatInventory')
+    
+    active = Booking.objects.filter(
+        status__in=['pending', 'confirmed'],
+        schedule_occurrence__status='scheduled'
+    )
+    occurrence_ids = active.values_list('schedule_occurrence_id', flat=True).distinct()
+    for occurrence_id in list(occurrence_ids):
+        bitmap = bytearray()
+        booking_ids = active.filter(schedule_occurrence_id=occurrence_id).order_by('created_at').values_list('id', flat=True)
+        for seat, booking_id in enumerate(booking_ids, start=1):
+            Booking.objects.filter(pk=booking_id).update(seat_number=seat)
+            byte_index, bit = divmod(seat - 1, 8)
+            if byte_index >= len(bitmap):
+                bitmap.append(0)
+            bitmap[byte_index] |= 1 << bit
+        SeatInventory.objects.create(schedule_occurrence_id=occurrence_id, occupied=bytes(bitmap))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='seat_number',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SeatInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occupied', models.BinaryField(default=b'')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('schedule_occurrence', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='seat_inventory', to='bookings.scheduleoccurrence')),
+            ],
+            options={
+                'db_table': 'seat_inventories',
+            },
+        ),
+        migrations.RunPython(backfill_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_seat_inventory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='group_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['group_id'], name='bookings_group_i_00b787_idx'),
+        ),
+    ]
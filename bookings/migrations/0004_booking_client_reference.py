@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_booking_group_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='client_reference',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
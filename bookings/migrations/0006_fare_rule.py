@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0002_route_fare'),
+        ('bookings', '0005_booking_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FareRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('weekdays', models.JSONField(blank=True, default=list, help_text='Weekday numbers (0 = Monday); empty for every day')),
+                ('start_time', models.TimeField(blank=True, help_text='Departures from this time', null=True)),
+                ('end_time', models.TimeField(blank=True, help_text='Departures before this time', null=True)),
+                ('min_lead_hours', models.PositiveIntegerField(blank=True, null=True)),
+                ('max_lead_hours', models.PositiveIntegerField(blank=True, null=True)),
+                ('min_load_factor', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('max_load_factor', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('multiplier', models.DecimalField(decimal_places=3, default=1, max_digits=5)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, help_text='Added after the multiplier (RWF)', max_digits=10)),
+                ('priority', models.IntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('route', models.ForeignKey(blank=True, help_text='Leave empty to apply to every route', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='fare_rules', to='routes.route')),
+            ],
+            options={
+                'db_table': 'fare_rules',
+                'ordering': ['priority', 'id'],
+                'indexes': [models.Index(fields=['is_active', 'route'], name='fare_rules_is_acti_cd4598_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def expire_stale_pending(apps, schema_editor):
+    # Close bookings left pending by failed payments so the hold worker never
+    # sees them, and free their seats: pending bookings from before seat
+    # inventories were given seats by 0002 and never released them. Seats
+    # since taken by a confirmed booking or an operator allocation stay set.
+    Booking = apps.get_model('bookings', 'Booking')
+    SeatInventory = apps.get_model('bookings', 'SeatInventory')
+    SeatAllocation = apps.get_model('operators', 'SeatAllocation')
+
+    stale = Booking.objects.filter(status='pending')
+    released = {}
+    for occurrence_id, seat in stale.filter(seat_number__isnull=False).values_list('schedule_occurrence_id', 'seat_number'):
+        released.setdefault(occurrence_id, set()).add(seat)
+    stale.update(status='expired')
+
+    for inventory in SeatInventory.objects.filter(schedule_occurrence_id__in=list(released)):
+        occurrence_id = inventory.schedule_occurrence_id
+        held = set(Booking.objects.filter(
+            schedule_occurrence_id=occurrence_id,
+            status='confirmed'
+        ).values_list('seat_number', flat=True))
+        for seats in SeatAllocation.objects.filter(schedule_occurrence_id=occurrence_id).values_list('seats', flat=True):
+            held.update(seats)
+        bitmap = bytearray(bytes(inventory.occupied))
+        for seat in released[occurrence_id] - held:
+            byte_index, bit = divmod(seat - 1, 8)
+            if byte_index < len(bitmap):
+                bitmap[byte_index] &= ~(1 << bit) & 0xFF
+        inventory.occupied = bytes(bitmap)
+        inventory.version += 1
+        inventory.save(update_fields=['occupied', 'version'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operators', '0002_seat_allocation'),
+        ('bookings', '0007_idempotency_record'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending Payment'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded'), ('expired', 'Hold Expired')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, help_text="When an unpaid booking's seat is released", null=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'hold_expires_at'], name='bookings_status_70de1d_idx'),
+        ),
+        migrations.RunPython(expire_stale_pending, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='SeatEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('cancelled', 'Booking Cancelled'), ('expired', 'Hold Expired'), ('payment_failed', 'Payment Failed')], max_length=20)),
+                ('seats', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('schedule_occurrence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_events', to='bookings.scheduleoccurrence')),
+            ],
+            options={
+                'db_table': 'seat_events',
+                'indexes': [models.Index(fields=['processed_at', 'id'], name='seat_events_process_296369_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_booking_hold_expiry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('passenger_name', models.CharField(max_length=200)),
+                ('phone_number', models.CharField(max_length=20)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('payment_method', models.CharField(choices=[('mtn', 'MTN Mobile Money'), ('airtel', 'Airtel Money'), ('cash', 'Cash')], max_length=20)),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('promoted', 'Promoted'), ('expired', 'Expired')], default='waiting', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('promoted_at', models.DateTimeField(blank=True, null=True)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='bookings.booking')),
+                ('schedule_occurrence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='bookings.scheduleoccurrence')),
+            ],
+            options={
+                'db_table': 'waitlist_entries',
+                'indexes': [models.Index(fields=['schedule_occurrence', 'status', 'created_at'], name='waitlist_en_schedul_ec7600_idx')],
+            },
+        ),
+    ]
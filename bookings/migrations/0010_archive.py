@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operators', '0002_seat_allocation'),
+        ('bookings', '0009_waitlist_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOccurrence',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('departure_time', models.TimeField()),
+                ('arrival_time', models.TimeField()),
+                ('status', models.CharField(choices=[('scheduled', 'Scheduled'), ('departed', 'Departed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('recurrence', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_occurrences', to='bookings.schedulerecurrence')),
+            ],
+            options={
+                'db_table': 'schedule_occurrences_archive',
+                'indexes': [models.Index(fields=['date'], name='schedule_oc_date_265510_idx'), models.Index(fields=['recurrence', 'date'], name='schedule_oc_recurre_3bdb95_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('passenger_name', models.CharField(max_length=200)),
+                ('phone_number', models.CharField(max_length=20)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('payment_method', models.CharField(choices=[('mtn', 'MTN Mobile Money'), ('airtel', 'Airtel Money'), ('cash', 'Cash')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending Payment'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded'), ('expired', 'Hold Expired')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('cancelled_at', models.DateTimeField(blank=True, null=True)),
+                ('refund_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('seat_number', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('group_id', models.UUIDField(blank=True, null=True)),
+                ('client_reference', models.CharField(blank=True, max_length=64, null=True)),
+                ('updated_at', models.DateTimeField()),
+                ('hold_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('operator', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_bookings', to='operators.operatoruser')),
+                ('schedule_occurrence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='bookings.archivedoccurrence')),
+            ],
+            options={
+                'db_table': 'bookings_archive',
+                'indexes': [models.Index(fields=['phone_number'], name='bookings_ar_phone_n_255124_idx'), models.Index(fields=['schedule_occurrence', 'status'], name='bookings_ar_schedul_1c2951_idx'), models.Index(fields=['created_at'], name='bookings_ar_created_ea865a_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 import uuid
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 from buses.models import Bus
@@ -93,6 +94,20 @@ class ScheduleOccurrence(models.Model):
         return f"{self.recurrence.route} - {self.date} {self.departure_time}"
 
 
+class SeatInventory(models.Model):
+    """Seat occupancy bitmap for a schedule occurrence (see bookings/seats.py)."""
+    schedule_occurrence = models.OneToOneField(ScheduleOccurrence, on_delete=models.CASCADE, related_name='seat_inventory')
+    occupied = models.BinaryField(default=b'')
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'seat_inventories'
+    
+    def __str__(self):
+        return f"Seats for {self.schedule_occurrence_id} (v{self.version})"
+
+
 class Booking(models.Model):
     """Passenger booking."""
     PAYMENT_METHOD_CHOICES = [
@@ -106,6 +121,7 @@ class Booking(models.Model):
         ('confirmed', 'Confirmed'),
         ('cancelled', 'Cancelled'),
         ('refunded', 'Refunded'),
+        ('expired', 'Hold Expired'),
     ]
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -118,7 +134,12 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     cancelled_at = models.DateTimeField(blank=True, null=True)
     refund_id = models.CharField(max_length=100, blank=True, null=True)
+    seat_number = models.PositiveSmallIntegerField(blank=True, null=True)
+    group_id = models.UUIDField(blank=True, null=True)
+    client_reference = models.CharField(max_length=64, unique=True, blank=True, null=True)
     operator = models.ForeignKey('operators.OperatorUser', on_delete=models.SET_NULL, blank=True, null=True, related_name='bookings')
+    updated_at = models.DateTimeField(auto_now=True)
+    hold_expires_at = models.DateTimeField(blank=True, null=True, help_text="When an unpaid booking's seat is released")
     
     class Meta:
         db_table = 'bookings'
@@ -127,6 +148,9 @@ class Booking(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['schedule_occurrence', 'status']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['group_id']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['status', 'hold_expires_at']),
         ]
     
     def __str__(self):
@@ -149,3 +173,200 @@ class Booking(models.Model):
             return False
         return time_to_departure > 60  # More than 1 hour (60 minutes)
 
+
+
+class FareRule(models.Model):
+    """
+    Adjusts the route fare for departures that match all of the rule's conditions.
+    
+    Empty conditions match every departure. Lead time (hours before departure)
+    and load factor (confirmed bookings / capacity) ranges include the minimum
+    and exclude the maximum. Matching rules apply in priority order as
+    price * multiplier + amount.
+    """
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, blank=True, null=True, related_name='fare_rules',
+                              help_text="Leave empty to apply to every route")
+    name = models.CharField(max_length=100)
+    weekdays = models.JSONField(default=list, blank=True, help_text="Weekday numbers (0 = Monday); empty for every day")
+    start_time = models.TimeField(blank=True, null=True, help_text="Departures from this time")
+    end_time = models.TimeField(blank=True, null=True, help_text="Departures before this time")
+    min_lead_hours = models.PositiveIntegerField(blank=True, null=True)
+    max_lead_hours = models.PositiveIntegerField(blank=True, null=True)
+    min_load_factor = models.DecimalField(max_digits=3, decimal_places=2, blank=True, null=True)
+    max_load_factor = models.DecimalField(max_digits=3, decimal_places=2, blank=True, null=True)
+    multiplier = models.DecimalField(max_digits=5, decimal_places=3, default=1)
+    amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Added after the multiplier (RWF)")
+    priority = models.IntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'fare_rules'
+        ordering = ['priority', 'id']
+        indexes = [
+            models.Index(fields=['is_active', 'route']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.route.name if self.route_id else 'all routes'})"
+
+
+class IdempotencyRecord(models.Model):
+    """Stored response for a request made with an Idempotency-Key header."""
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=255, help_text="Method, path and user the key was used for")
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True, help_text="Empty while the request is in progress")
+    response_body = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'idempotency_records'
+        unique_together = [['scope', 'key']]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope} [{self.key}]"
+
+
+class SeatEvent(models.Model):
+    """Seats freed on a schedule occurrence, for workers that react to released inventory."""
+    REASON_CHOICES = [
+        ('cancelled', 'Booking Cancelled'),
+        ('expired', 'Hold Expired'),
+        ('payment_failed', 'Payment Failed'),
+    ]
+    
+    schedule_occurrence = models.ForeignKey(ScheduleOccurrence, on_delete=models.CASCADE, related_name='seat_events')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    seats = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'seat_events'
+        indexes = [
+            models.Index(fields=['processed_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_reason_display()}: seats {self.seats} on {self.schedule_occurrence_id}"
+
+
+class WaitlistEntry(models.Model):
+    """Passenger waiting for a seat on a sold-out departure (see bookings/waitlist.py)."""
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('promoted', 'Promoted'),
+        ('expired', 'Expired'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    schedule_occurrence = models.ForeignKey(ScheduleOccurrence, on_delete=models.CASCADE, related_name='waitlist_entries')
+    passenger_name = models.CharField(max_length=200)
+    phone_number = models.CharField(max_length=20)
+    email = models.EmailField(blank=True, null=True)
+    payment_method = models.CharField(max_length=20, choices=Booking.PAYMENT_METHOD_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    booking = models.OneToOneField(Booking, on_delete=models.SET_NULL, blank=True, null=True, related_name='waitlist_entry')
+    created_at = models.DateTimeField(auto_now_add=True)
+    promoted_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'waitlist_entries'
+        indexes = [
+            models.Index(fields=['schedule_occurrence', 'status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.passenger_name} - {self.schedule_occurrence_id} ({self.status})"
+    
+    @property
+    def position(self):
+        """1-based place in the queue while waiting, else None."""
+        if self.status != 'waiting':
+            return None
+        return WaitlistEntry.objects.filter(
+            schedule_occurrence_id=self.schedule_occurrence_id,
+            status='waiting',
+            created_at__lte=self.created_at
+        ).count()
+
+
+class ArchivedOccurrence(models.Model):
+    """
+    Schedule occurrence moved out of schedule_occurrences after it departed (see bookings/archive.py).
+    
+    Keeps the original id, so ids stay unique across the live and archive tables.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    recurrence = models.ForeignKey(ScheduleRecurrence, on_delete=models.DO_NOTHING, db_constraint=False,
+                                   related_name='archived_occurrences')
+    date = models.DateField()
+    departure_time = models.TimeField()
+    arrival_time = models.TimeField()
+    status = models.CharField(max_length=20, choices=ScheduleOccurrence.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'schedule_occurrences_archive'
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['recurrence', 'date']),
+        ]
+    
+    @property
+    def bus(self):
+        return self.recurrence.bus
+    
+    @property
+    def route(self):
+        return self.recurrence.route
+    
+    def __str__(self):
+        return f"{self.recurrence.route} - {self.date} {self.departure_time} (archived)"
+
+
+class ArchivedBooking(models.Model):
+    """Booking moved out of bookings together with its departure (see bookings/archive.py)."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    passenger_name = models.CharField(max_length=200)
+    phone_number = models.CharField(max_length=20)
+    email = models.EmailField(blank=True, null=True)
+    schedule_occurrence = models.ForeignKey(ArchivedOccurrence, on_delete=models.CASCADE, related_name='bookings')
+    payment_method = models.CharField(max_length=20, choices=Booking.PAYMENT_METHOD_CHOICES)
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    cancelled_at = models.DateTimeField(blank=True, null=True)
+    refund_id = models.CharField(max_length=100, blank=True, null=True)
+    seat_number = models.PositiveSmallIntegerField(blank=True, null=True)
+    group_id = models.UUIDField(blank=True, null=True)
+    client_reference = models.CharField(max_length=64, blank=True, null=True)
+    operator = models.ForeignKey('operators.OperatorUser', on_delete=models.DO_NOTHING, db_constraint=False,
+                                 blank=True, null=True, related_name='archived_bookings')
+    updated_at = models.DateTimeField()
+    hold_expires_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'bookings_archive'
+        indexes = [
+            models.Index(fields=['phone_number']),
+            models.Index(fields=['schedule_occurrence', 'status']),
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.passenger_name} - {self.schedule_occurrence} ({self.status})"
+    
+    def can_cancel(self):
+        """Archived bookings are for departures long past."""
+        return False
+    
+    def can_refund(self):
+        return False
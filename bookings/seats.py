@@ -0,0 +1,162 @@
+"""
+Seat-level inventory for schedule occurrences.
+
+Occupied seats are stored as a bitmap on one SeatInventory row per
+occurrence (bit n-1 set = seat n taken). Assign and release are
+compare-and-swap updates on that row's version, so there are no per-seat
+rows or locks; only a writer that loses the race takes a short lock on the
+single inventory row.
+
+Releases made for a reason (cancellation, payment failure, hold expiry)
+are also recorded as SeatEvent rows, which workers such as the waitlist
+consume to react to freed seats.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SeatEvent, SeatInventory
+
+
+class SeatUnavailable(Exception):
+    """Requested seats are taken, out of range, or the occurrence is full."""
+
+
+def occupied_seats(bitmap):
+    """Return the sorted seat numbers set in bitmap."""
+    seats = []
+    for byte_index, byte in enumerate(bytes(bitmap)):
+        if not byte:
+            continue
+        for bit in range(8):
+            if byte & (1 << bit):
+                seats.append(byte_index * 8 + bit + 1)
+    return seats
+
+
+def _set_bits(bitmap, seats, value):
+    data = bytearray(bytes(bitmap))
+    for seat in seats:
+        byte_index, bit = divmod(seat - 1, 8)
+        if byte_index >= len(data):
+            data.extend(b'\x00' * (byte_index + 1 - len(data)))
+        if value:
+            data[byte_index] |= 1 << bit
+        else:
+            data[byte_index] &= ~(1 << bit) & 0xFF
+    return bytes(data)
+
+
+def _free_seats(bitmap, capacity):
+    taken = set(occupied_seats(bitmap))
+    return [seat for seat in range(1, capacity + 1) if seat not in taken]
+
+
+def get_inventory(schedule_occurrence_id):
+    """Return the SeatInventory for an occurrence, creating it if needed."""
+    try:
+        return SeatInventory.objects.get_or_create(schedule_occurrence_id=schedule_occurrence_id)[0]
+    except (IntegrityError, SeatInventory.DoesNotExist):
+        # Created concurrently; a locking read sees the committed row even
+        # inside a REPEATABLE READ snapshot.
+        with transaction.atomic():
+            return SeatInventory.objects.select_for_update().get(schedule_occurrence_id=schedule_occurrence_id)
+
+
+def _modify(schedule_occurrence_id, change):
+    """
+    Apply change(bitmap) -> new bitmap to an occurrence's inventory.
+
+    The fast path is an unlocked read followed by a compare-and-swap on
+    version. If another writer got in first, the read is repeated as a
+    locking read, which also sees rows committed after the current
+    transaction's snapshot.
+    """
+    inventory = get_inventory(schedule_occurrence_id)
+    with transaction.atomic():
+        updated = SeatInventory.objects.filter(
+            pk=inventory.pk,
+            version=inventory.version
+        ).update(occupied=change(inventory.occupied), version=F('version') + 1, updated_at=timezone.now())
+    if updated:
+        return
+
+    with transaction.atomic():
+        inventory = SeatInventory.objects.select_for_update().get(pk=inventory.pk)
+        SeatInventory.objects.filter(pk=inventory.pk).update(
+            occupied=change(inventory.occupied),
+            version=F('version') + 1,
+            updated_at=timezone.now()
+        )
+
+
+def assign_seats(schedule_occurrence, count=1, requested=None):
+    """
+    Atomically mark seats as occupied.
+
+    Args:
+        schedule_occurrence: ScheduleOccurrence instance (capacity from its bus)
+        count: Number of seats to assign when requested is not given
+        requested: Optional list of specific seat numbers
+
+    Returns:
+        list: Assigned seat numbers
+
+    Raises:
+        SeatUnavailable: if the seats cannot be assigned
+    """
+    capacity = schedule_occurrence.capacity
+    if requested:
+        requested = list(requested)
+        if len(set(requested)) != len(requested):
+            raise SeatUnavailable('Duplicate seat numbers requested')
+        invalid = [seat for seat in requested if seat < 1 or seat > capacity]
+        if invalid:
+            raise SeatUnavailable(f'Seat {invalid[0]} does not exist on this bus')
+
+    assigned = []
+
+    def occupy(bitmap):
+        free = _free_seats(bitmap, capacity)
+        if requested:
+            taken = [seat for seat in requested if seat not in free]
+            if taken:
+                raise SeatUnavailable(f'Seat {taken[0]} is already taken')
+            seats = requested
+        else:
+            if len(free) < count:
+                raise SeatUnavailable('Not enough seats available for this schedule')
+            seats = free[:count]
+        assigned[:] = seats
+        return _set_bits(bitmap, seats, True)
+
+    _modify(schedule_occurrence.id, occupy)
+    return list(assigned)
+
+
+def release_seats(schedule_occurrence_id, seats, reason=None):
+    """
+    Atomically mark seats as free again.
+
+    With a reason (one of SeatEvent.REASON_CHOICES) a SeatEvent is recorded
+    in the caller's transaction.
+    """
+    seats = [seat for seat in seats if seat]
+    if not seats:
+        return
+    _modify(schedule_occurrence_id, lambda bitmap: _set_bits(bitmap, seats, False))
+    if reason:
+        SeatEvent.objects.create(schedule_occurrence_id=schedule_occurrence_id, reason=reason, seats=seats)
+
+
+def seat_map(schedule_occurrence):
+    """Return {'capacity', 'occupied', 'available'} for an occurrence."""
+    inventory = SeatInventory.objects.filter(schedule_occurrence_id=schedule_occurrence.id).first()
+    bitmap = inventory.occupied if inventory else b''
+    capacity = schedule_occurrence.capacity
+    occupied = [seat for seat in occupied_seats(bitmap) if seat <= capacity]
+    return {
+        'capacity': capacity,
+        'occupied': occupied,
+        'available': _free_seats(bitmap, capacity),
+    }
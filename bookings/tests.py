@@ -1,10 +1,21 @@
+from django.core.cache import cache
 from django.test import TestCase
 from django.utils import timezone
 from datetime import date, time, timedelta
 from routes.models import District, Route
 from buses.models import Bus
 from bookings.models import ScheduleRecurrence, ScheduleOccurrence, Booking
-from payments.models import PaymentTransaction
+from bookings.seats import assign_seats, release_seats, seat_map, SeatUnavailable
+from bookings.manifest import build_manifest, render_csv_gz
+from bookings.fares import QuoteInvalid, current_price, invalidate_fares, sign_quote, verify_quote
+from bookings.models import FareRule, SeatEvent, WaitlistEntry
+from bookings.holds import expire_holds
+from bookings.waitlist import promote_waitlist
+from bookings.archive import archive_cutoff, archive_departures
+from bookings.models import ArchivedBooking, ArchivedOccurrence
+from payments.models import ArchivedPaymentTransaction, PaymentTransaction, Refund
+from operators.models import OperatorUser, OperatorAssignment
+from operators.access import invalidate_operator_access
 from accounts.models import User
 
 
@@ -120,6 +131,26 @@ class BookingModelTest(TestCase):
         )
         
         self.assertFalse(booking2.can_refund())
+    
+    def test_manifest(self):
+        """Test manifest lists active bookings only."""
+        import gzip
+        for name, booking_status in [("Alice", 'confirmed'), ("Bob", 'pending'), ("Carol", 'cancelled')]:
+            Booking.objects.create(
+                passenger_name=name,
+                phone_number="+250788123456",
+                schedule_occurrence=self.occurrence,
+                payment_method='cash',
+                status=booking_status
+            )
+        
+        manifest = build_manifest(self.occurrence)
+        self.assertEqual(manifest['count'], 2)
+        self.assertEqual({p['passenger_name'] for p in manifest['passengers']}, {"Alice", "Bob"})
+        
+        csv_text = gzip.decompress(render_csv_gz(manifest)).decode('utf-8')
+        self.assertIn("Alice", csv_text)
+        self.assertNotIn("Carol", csv_text)
 
 
 class BookingCreationTest(TestCase):
@@ -173,4 +204,259 @@ class BookingCreationTest(TestCase):
         
         # Should not be able to book more
         self.assertEqual(self.occurrence.remaining_seats, 0)
+    
+    def test_seat_assignment(self):
+        """Test that seats are assigned once and can be released."""
+        self.assertEqual(assign_seats(self.occurrence, requested=[2]), [2])
+        with self.assertRaises(SeatUnavailable):
+            assign_seats(self.occurrence, requested=[2])
+        with self.assertRaises(SeatUnavailable):
+            assign_seats(self.occurrence, requested=[3])
+        
+        self.assertEqual(assign_seats(self.occurrence), [1])
+        with self.assertRaises(SeatUnavailable):
+            assign_seats(self.occurrence)
+        
+        release_seats(self.occurrence.id, [2])
+        self.assertEqual(seat_map(self.occurrence)['available'], [2])
+    
+    def test_hold_expiry(self):
+        """Test that expired holds release their seats and record an event."""
+        seat = assign_seats(self.occurrence)[0]
+        booking = Booking.objects.create(
+            passenger_name="Passenger 1",
+            phone_number="+250788111111",
+            schedule_occurrence=self.occurrence,
+            payment_method='mtn',
+            status='pending',
+            seat_number=seat,
+            hold_expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        
+        self.assertEqual(expire_holds(), 1)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'expired')
+        self.assertEqual(seat_map(self.occurrence)['available'], [1, 2])
+        event = SeatEvent.objects.get(schedule_occurrence=self.occurrence)
+        self.assertEqual((event.reason, event.seats), ('expired', [seat]))
+        self.assertEqual(expire_holds(), 0)
+    
+    def test_waitlist_promotion(self):
+        """Test that a released seat is held for the first waitlisted passenger."""
+        assign_seats(self.occurrence, count=2)
+        first, second = [
+            WaitlistEntry.objects.create(
+                schedule_occurrence=self.occurrence,
+                passenger_name=name,
+                phone_number=phone,
+                payment_method='mtn'
+            )
+            for name, phone in [("Waiting 1", "+250788111111"), ("Waiting 2", "+250788222222")]
+        ]
+        self.assertEqual(second.position, 2)
+        
+        release_seats(self.occurrence.id, [1], reason='cancelled')
+        self.assertEqual(promote_waitlist(), (1, 1))
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'promoted')
+        self.assertEqual((first.booking.status, first.booking.seat_number), ('pending', 1))
+        self.assertEqual(seat_map(self.occurrence)['available'], [])
+        self.assertEqual(second.position, 1)
+        self.assertEqual(promote_waitlist(), (0, 0))
+    
+    def test_fare_rules(self):
+        """Test load-factor pricing and signed quotes."""
+        from decimal import Decimal
+        self.route.fare = Decimal('5000.00')
+        self.route.save()
+        FareRule.objects.create(name="Last seat", min_load_factor=Decimal('0.50'), multiplier=Decimal('1.2'))
+        invalidate_fares()
+        self.assertEqual(current_price(self.occurrence), Decimal('5000.00'))
+        
+        Booking.objects.create(
+            passenger_name="Passenger 1",
+            phone_number="+250788111111",
+            schedule_occurrence=self.occurrence,
+            payment_method='cash',
+            status='confirmed'
+        )
+        self.assertEqual(current_price(self.occurrence), Decimal('6000.00'))
+        
+        quote = sign_quote(self.occurrence.id, Decimal('5000.00'))
+        self.assertEqual(verify_quote(quote, self.occurrence.id), Decimal('5000.00'))
+        with self.assertRaises(QuoteInvalid):
+            verify_quote(quote, self.occurrence.id + 1)
+        with self.assertRaises(QuoteInvalid):
+            verify_quote(quote + 'x', self.occurrence.id)
+    
+    def test_group_booking(self):
+        """Test that a group booking reserves every seat with one payment."""
+        response = self.client.post('/api/bookings/group/', {
+            'schedule_occurrence_id': self.occurrence.id,
+            'phone_number': '+250788333333',
+            'payment_method': 'cash',
+            'passengers': [
+                {'passenger_name': 'Parent'},
+                {'passenger_name': 'Child'},
+            ],
+        }, content_type='application/json')
+        
+        self.assertEqual(response.status_code, 201)
+        bookings = Booking.objects.filter(group_id=response.json()['group_id'])
+        self.assertEqual(bookings.filter(status='confirmed').count(), 2)
+        self.assertEqual(sorted(bookings.values_list('seat_number', flat=True)), [1, 2])
+        self.assertEqual(
+            set(PaymentTransaction.objects.filter(booking__in=bookings).values_list('provider_transaction_id', flat=True)),
+            {f"CASH_{response.json()['group_id']}"}
+        )
+        
+        # The bus is now full
+        response = self.client.post('/api/bookings/group/', {
+            'schedule_occurrence_id': self.occurrence.id,
+            'phone_number': '+250788444444',
+            'payment_method': 'cash',
+            'passengers': [{'passenger_name': 'Late'}],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
 
+    
+    def test_cancel_twice_keeps_resold_seat(self):
+        """Test that cancelling an already cancelled booking does not free its seat again."""
+        booking = Booking.objects.create(
+            passenger_name="Passenger 1", phone_number="+250788111111", schedule_occurrence=self.occurrence,
+            payment_method='cash', status='confirmed', seat_number=assign_seats(self.occurrence)[0]
+        )
+        
+        response = self.client.post(f'/api/bookings/{booking.id}/cancel/', content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(assign_seats(self.occurrence, requested=[booking.seat_number]), [booking.seat_number])
+        
+        response = self.client.post(f'/api/bookings/{booking.id}/cancel/', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(booking.seat_number, seat_map(self.occurrence)['occupied'])
+    
+    def test_archive_departures(self):
+        """Test that old departures move to the archive and stay readable."""
+        old_day = archive_cutoff() - timedelta(days=1)
+        old = ScheduleOccurrence.objects.create(
+            recurrence=self.recurrence, date=old_day, departure_time=time(8, 0), arrival_time=time(12, 0), status='departed'
+        )
+        booking = Booking.objects.create(
+            passenger_name="Old Passenger", phone_number="+250788555555", schedule_occurrence=old,
+            payment_method='cash', status='confirmed', seat_number=1
+        )
+        PaymentTransaction.objects.create(booking=booking, provider='cash', amount=5000, status='completed')
+        held = ScheduleOccurrence.objects.create(
+            recurrence=self.recurrence, date=old_day - timedelta(days=1), departure_time=time(8, 0), arrival_time=time(12, 0)
+        )
+        held_booking = Booking.objects.create(
+            passenger_name="Refund Pending", phone_number="+250788666666", schedule_occurrence=held,
+            payment_method='mtn', status='cancelled'
+        )
+        Refund.objects.create(
+            payment_transaction=PaymentTransaction.objects.create(booking=held_booking, provider='mtn', amount=5000, status='completed'),
+            amount=5000, status='pending'
+        )
+        
+        counts = archive_departures(batch_size=1)
+        
+        self.assertEqual(counts, {'occurrences': 1, 'bookings': 1, 'payment_transactions': 1, 'refunds': 0})
+        self.assertFalse(ScheduleOccurrence.objects.filter(id=old.id).exists())
+        self.assertFalse(Booking.objects.filter(id=booking.id).exists())
+        self.assertTrue(ScheduleOccurrence.objects.filter(id=held.id).exists())
+        self.assertTrue(ScheduleOccurrence.objects.filter(id=self.occurrence.id).exists())
+        self.assertEqual(ArchivedOccurrence.objects.get(id=old.id).date, old_day)
+        self.assertEqual(ArchivedBooking.objects.get(id=booking.id).seat_number, 1)
+        self.assertEqual(ArchivedPaymentTransaction.objects.get(booking_id=booking.id).amount, 5000)
+        
+        response = self.client.get(f'/api/bookings/{booking.id}/status/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['schedule_occurrence']['id'], old.id)
+        
+        response = self.client.get('/api/schedules/history/', {
+            'start': (old_day - timedelta(days=1)).isoformat(),
+            'end': self.tomorrow.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], [old.id, held.id, self.occurrence.id])
+
+
+class OperatorBulkSaleTest(TestCase):
+    """Test operator bulk cash sales."""
+    
+    def setUp(self):
+        cache.clear()
+        origin = District.objects.create(name="Kigali", code="KG")
+        self.route = Route.objects.create(
+            name="Kigali - Musanze",
+            origin=origin,
+            destination=District.objects.create(name="Musanze", code="MU")
+        )
+        recurrence = ScheduleRecurrence.objects.create(
+            route=self.route,
+            bus=Bus.objects.create(plate_number="RAB123X", capacity=3),
+            departure_time=time(8, 0),
+            arrival_time=time(12, 0)
+        )
+        self.first, self.second = [
+            ScheduleOccurrence.objects.create(
+                recurrence=recurrence,
+                date=date.today() + timedelta(days=days),
+                departure_time=time(8, 0),
+                arrival_time=time(12, 0)
+            )
+            for days in (1, 2)
+        ]
+        user = User.objects.create_user(username='operator1', password='secret')
+        self.operator = OperatorUser.objects.create(user=user, full_name='Operator One', phone_number='+250788000000')
+        OperatorAssignment.objects.create(operator=self.operator, route=self.route)
+        self.client.force_login(user)
+    
+    def sell(self, *sales):
+        return self.client.post('/api/operator/bookings/bulk/', {'bookings': [
+            dict({'passenger_name': 'Passenger', 'phone_number': '+250788111111'}, **sale) for sale in sales
+        ]}, content_type='application/json')
+    
+    def test_bulk_sale(self):
+        """Test that one request sells seats on several departures."""
+        response = self.sell(
+            {'schedule_occurrence_id': self.first.id, 'seat_number': 2},
+            {'schedule_occurrence_id': self.first.id},
+            {'schedule_occurrence_id': self.second.id},
+        )
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['count'], 3)
+        bookings = Booking.objects.filter(operator=self.operator, status='confirmed')
+        self.assertEqual(sorted(bookings.filter(schedule_occurrence=self.first).values_list('seat_number', flat=True)), [1, 2])
+        self.assertEqual(list(bookings.filter(schedule_occurrence=self.second).values_list('seat_number', flat=True)), [1])
+        self.assertEqual(PaymentTransaction.objects.filter(booking__in=bookings, provider='cash', status='completed').count(), 3)
+    
+    def test_bulk_sale_is_all_or_nothing(self):
+        """Test that an unavailable seat on one departure rolls back the whole batch."""
+        assign_seats(self.second, requested=[3])
+        
+        response = self.sell(
+            {'schedule_occurrence_id': self.first.id},
+            {'schedule_occurrence_id': self.first.id},
+            {'schedule_occurrence_id': self.second.id, 'seat_number': 3},
+        )
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(seat_map(self.first)['available'], [1, 2, 3])
+        self.assertEqual(seat_map(self.second)['occupied'], [3])
+    
+    def test_bulk_sale_validation(self):
+        """Test duplicate seats and unassigned routes are refused."""
+        response = self.sell(
+            {'schedule_occurrence_id': self.first.id, 'seat_number': 1},
+            {'schedule_occurrence_id': self.first.id, 'seat_number': 1},
+        )
+        self.assertEqual(response.status_code, 400)
+        
+        OperatorAssignment.objects.update(is_active=False)
+        invalidate_operator_access(self.operator.id)
+        response = self.sell({'schedule_occurrence_id': self.first.id})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Booking.objects.exists())
@@ -0,0 +1,102 @@
+"""
+Waitlist for sold-out departures.
+
+Passengers join a departure's waitlist when it has no free seat. Promotion
+is driven by SeatEvent rows, which are written whenever a cancellation,
+failed payment or expired hold frees seats, so the booking path itself
+does no waitlist work. promote_waitlist() takes a batch of unprocessed
+events, loads the waiting entries of the affected departures in request
+order with one query, assigns as many free seats as there are waiters and
+creates a pending booking holding each seat for BOOKING_HOLD_SECONDS. The
+promoted passengers are sent an SMS once the batch commits and pay with
+POST /api/bookings/<id>/pay/. A promotion that is not paid expires like
+any other hold, which frees the seat again for the next passenger.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.email import defer_notifications, send_waitlist_offer
+from .holds import hold_expiry
+from .models import Booking, ScheduleOccurrence, SeatEvent, WaitlistEntry
+from .seats import assign_seats, seat_map, SeatUnavailable
+
+
+def _is_bookable(occurrence, now):
+    departure = timezone.make_aware(datetime.combine(occurrence.date, occurrence.departure_time))
+    return occurrence.status == 'scheduled' and departure > now
+
+
+def promote_waitlist(now=None, batch_size=100):
+    """
+    Process one batch of seat events.
+
+    Returns (events processed, passengers promoted); call again until fewer
+    than batch_size events are processed. Events left for a retry are not
+    counted.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        events = list(SeatEvent.objects.select_for_update(skip_locked=True).filter(
+            processed_at__isnull=True
+        ).order_by('id')[:batch_size])
+        if not events:
+            return 0, 0
+
+        waiting = defaultdict(list)
+        for entry in WaitlistEntry.objects.select_for_update().filter(
+            schedule_occurrence_id__in={event.schedule_occurrence_id for event in events},
+            status='waiting'
+        ).order_by('created_at'):
+            waiting[entry.schedule_occurrence_id].append(entry)
+        occurrences = ScheduleOccurrence.objects.select_related(
+            'recurrence__route',
+            'recurrence__bus'
+        ).in_bulk(list(waiting))
+
+        hold_expires_at = hold_expiry(now)
+        bookings, promoted, expired, retry = [], [], [], set()
+        for occurrence_id in sorted(waiting):
+            occurrence = occurrences[occurrence_id]
+            entries = waiting[occurrence_id]
+            if not _is_bookable(occurrence, now):
+                expired.extend(entries)
+                continue
+
+            count = min(len(seat_map(occurrence)['available']), len(entries))
+            if not count:
+                continue
+            try:
+                seats = assign_seats(occurrence, count=count)
+            except SeatUnavailable:
+                # A booking took the seats since seat_map(); try again next run
+                retry.add(occurrence_id)
+                continue
+
+            for entry, seat in zip(entries, seats):
+                booking = Booking(
+                    passenger_name=entry.passenger_name,
+                    phone_number=entry.phone_number,
+                    email=entry.email,
+                    schedule_occurrence=occurrence,
+                    payment_method=entry.payment_method,
+                    status='pending',
+                    seat_number=seat,
+                    hold_expires_at=hold_expires_at
+                )
+                entry.booking = booking
+                entry.status = 'promoted'
+                entry.promoted_at = now
+                bookings.append(booking)
+                promoted.append(entry)
+
+        Booking.objects.bulk_create(bookings)
+        WaitlistEntry.objects.bulk_update(promoted, ['booking', 'status', 'promoted_at'])
+        if expired:
+            WaitlistEntry.objects.filter(id__in=[entry.id for entry in expired]).update(status='expired')
+        done = [event.id for event in events if event.schedule_occurrence_id not in retry]
+        SeatEvent.objects.filter(id__in=done).update(processed_at=now)
+        defer_notifications(bookings, notify=send_waitlist_offer)
+    return len(done), len(bookings)
@@ -0,0 +1,461 @@
+"""
+Small in-process metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms live in process memory. When
+METRICS_MULTIPROC_DIR is set (e.g. under gunicorn with several workers),
+each process writes a snapshot of its values to <dir>/metrics_<pid>.json
+every METRICS_FLUSH_INTERVAL seconds (from a background thread, so idle
+workers stay current) and at exit, and the /metrics endpoint merges every
+snapshot in the directory, so all workers (and one-off management
+commands) are reported together.
+
+Snapshots of processes that are no longer running are folded into
+<dir>/metrics_archive.json when /metrics is collected: their counters and
+histograms are kept, their gauges are dropped. A new process that finds a
+snapshot under its own (reused) pid archives it the same way before
+writing its own.
+"""
+import asyncio
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows, where there are no gunicorn workers sharing a directory
+    fcntl = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ARCHIVE_FILE = 'metrics_archive.json'
+ARCHIVE_LOCK_FILE = 'metrics_archive.lock'
+
+
+class Metric:
+    """Base class for labelled metrics."""
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    """Monotonically increasing counter."""
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with REGISTRY.lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        REGISTRY.maybe_flush()
+
+    def merge(self, values):
+        merged = {}
+        for snapshot in values:
+            for key, value in snapshot:
+                merged[tuple(key)] = merged.get(tuple(key), 0.0) + value
+        return merged
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down.
+
+    multiprocess_mode controls how per-process values are combined:
+    'sum' (e.g. in-flight work), 'max', or 'latest' (most recently set).
+    """
+    metric_type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), multiprocess_mode='sum'):
+        super().__init__(name, documentation, labelnames)
+        self.multiprocess_mode = multiprocess_mode
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with REGISTRY.lock:
+            self._values[key] = [float(value), time.time()]
+        REGISTRY.maybe_flush()
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with REGISTRY.lock:
+            current = self._values.get(key, [0.0, 0.0])[0]
+            self._values[key] = [current + amount, time.time()]
+        REGISTRY.maybe_flush()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def merge(self, values):
+        merged = {}
+        for snapshot in values:
+            for key, (value, updated_at) in snapshot:
+                key = tuple(key)
+                if key not in merged:
+                    merged[key] = [value, updated_at]
+                elif self.multiprocess_mode == 'sum':
+                    merged[key][0] += value
+                elif self.multiprocess_mode == 'max':
+                    merged[key][0] = max(merged[key][0], value)
+                elif updated_at > merged[key][1]:
+                    merged[key] = [value, updated_at]
+        return {key: value for key, (value, _) in merged.items()}
+
+
+class Histogram(Metric):
+    """Cumulative histogram with fixed upper bounds."""
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with REGISTRY.lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][i] += 1
+                    break
+            entry['sum'] += value
+            entry['count'] += 1
+        REGISTRY.maybe_flush()
+
+    def time(self, **labels):
+        """Context manager observing the elapsed time of its block."""
+        return _Timer(self, labels)
+
+    def merge(self, values):
+        merged = {}
+        for snapshot in values:
+            for key, entry in snapshot:
+                key = tuple(key)
+                target = merged.setdefault(key, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+                target['buckets'] = [a + b for a, b in zip(target['buckets'], entry['buckets'])]
+                target['sum'] += entry['sum']
+                target['count'] += entry['count']
+        return merged
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.metrics = {}
+        self._last_flush = 0.0
+        # pids this process has flushed and started its flush thread in (reset by fork)
+        self._flushed_pid = None
+        self._timer_pid = None
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f'Metric {metric.name} already registered')
+            self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        with self.lock:
+            return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    @property
+    def multiproc_dir(self):
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', '')
+
+    def maybe_flush(self):
+        """Write this process's snapshot if the flush interval has elapsed."""
+        if not self.multiproc_dir:
+            return
+        self._start_flush_thread()
+        if time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def _start_flush_thread(self):
+        """Flush every METRICS_FLUSH_INTERVAL from now on, even if no metric changes."""
+        pid = os.getpid()
+        with self.lock:
+            if self._timer_pid == pid:
+                return
+            self._timer_pid = pid
+        threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True).start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError:
+                continue
+
+    def flush(self):
+        """Write this process's snapshot to the multiprocess directory."""
+        directory = self.multiproc_dir
+        if not directory:
+            return
+        self._last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        pid = os.getpid()
+        path = os.path.join(directory, f'metrics_{pid}.json')
+        with self.lock:
+            if self._flushed_pid != pid:
+                # A file under our pid before our first flush was left by an earlier process
+                with _archive_lock(directory):
+                    self._archive(directory, f'metrics_{pid}.json')
+                self._flushed_pid = pid
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _archive(self, directory, filename):
+        """
+        Fold a dead process's snapshot into the archive file and delete it.
+
+        Counters and histograms are added to the archive; gauges describe
+        the dead process's current state and are dropped. Call it holding
+        _archive_lock(), so two workers never archive the same snapshot.
+        """
+        path = os.path.join(directory, filename)
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            snapshot = {}
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        try:
+            with open(archive_path) as f:
+                archive = json.load(f)
+        except (OSError, ValueError):
+            archive = {}
+
+        # Not under self.lock: flush() may hold it while waiting for the archive lock
+        for metric in list(self.metrics.values()):
+            if metric.metric_type == 'gauge' or metric.name not in snapshot:
+                continue
+            merged = metric.merge([archive.get(metric.name, []), snapshot[metric.name]])
+            archive[metric.name] = [[list(key), value] for key, value in merged.items()]
+
+        tmp_path = f'{archive_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(archive, f)
+        os.replace(tmp_path, archive_path)
+        os.remove(path)
+
+    def collect(self):
+        """Return {name: merged values} across all processes."""
+        snapshots = []
+        directory = self.multiproc_dir
+        own_file = f'metrics_{os.getpid()}.json'
+        if directory and os.path.isdir(directory):
+            self.flush()
+            # Archive and read under the lock, so a snapshot being archived is counted exactly once
+            with _archive_lock(directory):
+                for filename in os.listdir(directory):
+                    if not filename.startswith('metrics_') or not filename.endswith('.json') or filename == own_file:
+                        continue
+                    pid = filename[len('metrics_'):-len('.json')]
+                    if pid.isdigit() and not _is_running(int(pid)):
+                        self._archive(directory, filename)
+                for filename in os.listdir(directory):
+                    if not filename.startswith('metrics_') or not filename.endswith('.json') or filename == own_file:
+                        continue
+                    try:
+                        with open(os.path.join(directory, filename)) as f:
+                            snapshots.append(json.load(f))
+                    except (OSError, ValueError):
+                        continue
+        snapshots.append(self.snapshot())
+
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {
+            metric.name: metric.merge([snapshot.get(metric.name, []) for snapshot in snapshots])
+            for metric in metrics
+        }
+
+    def exposition(self):
+        """Render all metrics in the Prometheus text format."""
+        lines = []
+        collected = self.collect()
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.metric_type}')
+            for key, value in sorted(collected[name].items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.metric_type == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets, value['buckets']):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_labels(labels + [("le", _number(bound))])} {cumulative}')
+                    lines.append(f'{name}_bucket{_labels(labels + [("le", "+Inf")])} {value["count"]}')
+                    lines.append(f'{name}_sum{_labels(labels)} {_number(value["sum"])}')
+                    lines.append(f'{name}_count{_labels(labels)} {value["count"]}')
+                else:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+@contextlib.contextmanager
+def _archive_lock(directory):
+    """Hold the multiprocess directory's archive lock across processes."""
+    with open(os.path.join(directory, ARCHIVE_LOCK_FILE), 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = [
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    ]
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+atexit.register(REGISTRY.flush)
+
+
+# Application metrics
+BOOKINGS_CREATED = REGISTRY.register(Counter(
+    'travel_bookings_created_total', 'Confirmed bookings created.', ['route', 'payment_method']
+))
+BOOKINGS_CANCELLED = REGISTRY.register(Counter(
+    'travel_bookings_cancelled_total', 'Bookings cancelled.', ['route', 'payment_method']
+))
+PAYMENT_DURATION = REGISTRY.register(Histogram(
+    'travel_payment_request_duration_seconds', 'Payment adapter call latency.', ['provider', 'operation']
+))
+PAYMENT_FAILURES = REGISTRY.register(Counter(
+    'travel_payment_failures_total', 'Failed payment adapter calls.', ['provider', 'operation']
+))
+PAYMENT_CIRCUIT_STATE = REGISTRY.register(Gauge(
+    'travel_payment_circuit_state', 'Payment provider circuit breaker state (0 closed, 1 half-open, 2 open).',
+    ['provider'], multiprocess_mode='max'
+))
+PAYMENT_REJECTED = REGISTRY.register(Counter(
+    'travel_payment_rejected_total', 'Payment calls failed fast by the circuit breaker or bulkhead.',
+    ['provider', 'reason']
+))
+PAYMENT_IN_FLIGHT = REGISTRY.register(Gauge(
+    'travel_payment_in_flight', 'Payment provider calls in progress.', ['provider']
+))
+NOTIFICATION_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'travel_notification_queue_depth', 'Booking notifications waiting to be sent or in flight.'
+))
+NOTIFICATION_DURATION = REGISTRY.register(Histogram(
+    'travel_notification_send_duration_seconds', 'Notification send latency.', ['channel']
+))
+NOTIFICATION_FAILURES = REGISTRY.register(Counter(
+    'travel_notification_failures_total', 'Failed notification sends.', ['channel']
+))
+SEAT_LOCK_WAIT = REGISTRY.register(Histogram(
+    'travel_seat_lock_wait_seconds', 'Time spent waiting for the schedule occurrence row lock.',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+))
+SCHEDULE_GENERATION_ROWS = REGISTRY.register(Counter(
+    'travel_schedule_generation_rows_total', 'Schedule occurrences created by generate_schedule_occurrences.'
+))
+SCHEDULE_GENERATION_RATE = REGISTRY.register(Gauge(
+    'travel_schedule_generation_rows_per_second', 'Row throughput of the last schedule generation run.',
+    multiprocess_mode='latest'
+))
+
+
+def track_payment(provider, operation):
+    """Decorator observing latency and failures of a payment adapter call (sync or async)."""
+    def observe(started, result):
+        PAYMENT_DURATION.observe(time.perf_counter() - started, provider=provider, operation=operation)
+        if result is None or (isinstance(result, dict) and not result.get('success', True)):
+            PAYMENT_FAILURES.inc(provider=provider, operation=operation)
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                result = None
+                try:
+                    result = await func(*args, **kwargs)
+                    return result
+                finally:
+                    observe(started, result)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                observe(started, result)
+        return wrapper
+    return decorator
+
+
+def track_notification(channel):
+    """Decorator observing latency and failures of a notification send."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with NOTIFICATION_DURATION.time(channel=channel):
+                result = func(*args, **kwargs)
+            if isinstance(result, dict) and not result.get('success', True):
+                NOTIFICATION_FAILURES.inc(channel=channel)
+            return result
+        return wrapper
+    return decorator
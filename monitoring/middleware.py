@@ -0,0 +1,123 @@
+"""
+Request instrumentation middleware.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import timing
+
+logger = logging.getLogger('monitoring.requests')
+
+# Server-Timing metric name for each recorded category
+SERVER_TIMING_METRICS = [
+    ('db', 'db'),
+    ('payment', 'payment'),
+    ('notification', 'notify'),
+    ('serialize', 'serialize'),
+]
+
+
+class RequestTimingMiddleware:
+    """
+    Record per-request DB query count and time, payment and notification
+    call time, response rendering time and total time.
+
+    Results are emitted as a Server-Timing header and a JSON log line on the
+    'monitoring.requests' logger. Repeated identical SQL shapes at or above
+    REQUEST_TIMING_N_PLUS_ONE_THRESHOLD are logged as likely N+1 patterns.
+    Runs natively under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.n_plus_one_threshold = settings.REQUEST_TIMING_N_PLUS_ONE_THRESHOLD
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = timing.start()
+        started = time.perf_counter()
+        try:
+            with self._wrap_connections(timings):
+                response = self.get_response(request)
+        finally:
+            timing.stop(token)
+        return self._finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings, token = timing.start()
+        started = time.perf_counter()
+        try:
+            with self._wrap_connections(timings):
+                response = await self.get_response(request)
+        finally:
+            timing.stop(token)
+        return self._finish(request, response, timings, started)
+
+    def _wrap_connections(self, timings):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timings.execute_wrapper))
+        return stack
+
+    def _finish(self, request, response, timings, started):
+        total = time.perf_counter() - started
+        self._add_server_timing(response, timings, total)
+        self._log(request, response, timings, total)
+        return response
+
+    def process_template_response(self, request, response):
+        """Time rendering of DRF/template responses as serialization."""
+        render_started = time.perf_counter()
+
+        def rendered(response):
+            timing.record('serialize', time.perf_counter() - render_started)
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def _add_server_timing(self, response, timings, total):
+        metrics = []
+        for category, name in SERVER_TIMING_METRICS:
+            if category in timings.counts:
+                metric = f'{name};dur={timings.durations[category] * 1000:.2f}'
+                if category == 'db':
+                    metric += f';desc="{timings.counts["db"]} queries"'
+                metrics.append(metric)
+        metrics.append(f'total;dur={total * 1000:.2f}')
+
+        existing = response.get('Server-Timing')
+        if existing:
+            metrics.insert(0, existing)
+        response['Server-Timing'] = ', '.join(metrics)
+
+    def _log(self, request, response, timings, total):
+        data = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_queries': timings.counts.get('db', 0),
+        }
+        for category, _ in SERVER_TIMING_METRICS:
+            data[f'{category}_ms'] = round(timings.durations.get(category, 0.0) * 1000, 2)
+        logger.info(json.dumps(data, sort_keys=True), extra={'request_timing': data})
+
+        for sql, count in timings.repeated_queries(self.n_plus_one_threshold):
+            logger.warning(
+                f"Possible N+1 on {request.method} {request.path}: "
+                f"{count} executions of: {sql[:300]}"
+            )
@@ -0,0 +1,137 @@
+"""
+Opt-in request profiling.
+
+ProfilingMiddleware captures a cProfile profile for a sampled fraction of
+requests (PROFILING_SAMPLE_RATE) and for staff requests carrying the
+PROFILING_HEADER header. Each profile is stored in PROFILING_DIR as a
+.prof file with a .json metadata sidecar; only the PROFILING_KEEP slowest
+profiles are kept. When PROFILING_ENABLED is False the middleware removes
+itself from the stack, so there is no per-request cost.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+PROFILE_NAME_RE = re.compile(r'^[0-9]{14}_[a-f0-9]{8}$')
+
+
+class ProfilingMiddleware:
+    """Profile sampled or explicitly requested requests (see module docstring)."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.header = settings.PROFILING_HEADER
+
+    def __call__(self, request):
+        trigger = self._trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - started
+
+        save_profile(profiler, {
+            'method': request.method,
+            'path': request.path,
+            'query_string': request.META.get('QUERY_STRING', ''),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'user': request.user.get_username() if request.user.is_authenticated else None,
+            'trigger': trigger,
+        })
+        return response
+
+    def _trigger(self, request):
+        if request.headers.get(self.header):
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated and user.is_staff:
+                return 'header'
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return 'sampled'
+        return None
+
+
+def save_profile(profiler, metadata):
+    """Store a profile with its metadata and prune to the slowest PROFILING_KEEP."""
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    now = timezone.now()
+    name = f"{now.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    metadata = dict(metadata, name=name, created_at=now.isoformat())
+
+    profiler.dump_stats(os.path.join(directory, f'{name}.prof'))
+    with open(os.path.join(directory, f'{name}.json'), 'w') as f:
+        json.dump(metadata, f)
+
+    _prune(directory, settings.PROFILING_KEEP)
+    return name
+
+
+def _read_all(directory):
+    profiles = []
+    if not os.path.isdir(directory):
+        return profiles
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def _prune(directory, keep):
+    profiles = sorted(_read_all(directory), key=lambda p: p.get('duration_ms', 0), reverse=True)
+    for profile in profiles[keep:]:
+        for extension in ('.prof', '.json'):
+            try:
+                os.remove(os.path.join(directory, profile['name'] + extension))
+            except OSError:
+                pass
+
+
+def list_profiles(limit=None):
+    """Return stored profile metadata, slowest first."""
+    profiles = sorted(_read_all(settings.PROFILING_DIR), key=lambda p: p.get('duration_ms', 0), reverse=True)
+    return profiles[:limit] if limit else profiles
+
+
+def profile_path(name):
+    """Return the .prof path for a stored profile, or None if it does not exist."""
+    if not PROFILE_NAME_RE.match(name or ''):
+        return None
+    path = os.path.join(settings.PROFILING_DIR, f'{name}.prof')
+    return path if os.path.exists(path) else None
+
+
+def render_profile_stats(name, sort='cumulative', limit=50):
+    """Return a pstats text report for a stored profile, or None if missing."""
+    path = profile_path(name)
+    if path is None:
+        return None
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.sort_stats(sort).print_stats(limit)
+    return output.getvalue()
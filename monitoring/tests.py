@@ -0,0 +1,139 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.test import TestCase, RequestFactory
+from django.http import HttpResponse
+from django.test.utils import override_settings
+
+from monitoring import timing
+from monitoring.metrics import REGISTRY, BOOKINGS_CREATED, SEAT_LOCK_WAIT
+from monitoring.middleware import RequestTimingMiddleware
+
+
+class RequestTimingTest(TestCase):
+    """Test per-request timing collection."""
+
+    def test_record_outside_request_is_noop(self):
+        """Recording without an active request does nothing."""
+        self.assertIsNone(timing.current())
+        timing.record('payment', 1.0)
+        self.assertIsNone(timing.current())
+
+    def test_timed_decorator_records_category(self):
+        """Decorated calls are accumulated under their category."""
+        @timing.timed('payment')
+        def call_provider():
+            return 'ok'
+
+        timings, token = timing.start()
+        try:
+            self.assertEqual(call_provider(), 'ok')
+            call_provider()
+        finally:
+            timing.stop(token)
+
+        self.assertEqual(timings.counts['payment'], 2)
+        self.assertIsNone(timing.current())
+
+    def test_repeated_queries_threshold(self):
+        """Identical SQL shapes at or above the threshold are reported."""
+        timings = timing.RequestTimings()
+        for _ in range(5):
+            timings.query_shapes['SELECT * FROM bookings WHERE id = %s'] += 1
+        timings.query_shapes['SELECT * FROM routes'] += 1
+
+        repeated = timings.repeated_queries(5)
+        self.assertEqual(repeated, [('SELECT * FROM bookings WHERE id = %s', 5)])
+
+    @override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_N_PLUS_ONE_THRESHOLD=10)
+    def test_middleware_adds_server_timing(self):
+        """Middleware appends its metrics to an existing Server-Timing header."""
+        def view(request):
+            timing.record('payment', 0.25)
+            response = HttpResponse('ok')
+            response['Server-Timing'] = 'lock;dur=1.00'
+            return response
+
+        middleware = RequestTimingMiddleware(view)
+        response = middleware(RequestFactory().get('/api/schedules/'))
+
+        header = response['Server-Timing']
+        self.assertTrue(header.startswith('lock;dur=1.00, '))
+        self.assertIn('payment;dur=250.00', header)
+        self.assertIn('total;dur=', header)
+
+
+class MetricsRegistryTest(TestCase):
+    """Test the in-process metrics registry."""
+
+    def test_counter_exposition(self):
+        """Counters are rendered with their labels."""
+        BOOKINGS_CREATED.inc(route='Kigali - Huye', payment_method='cash')
+        output = REGISTRY.exposition()
+
+        self.assertIn('# TYPE travel_bookings_created_total counter', output)
+        self.assertIn(
+            'travel_bookings_created_total{route="Kigali - Huye",payment_method="cash"}',
+            output
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Histogram buckets accumulate and +Inf equals the count."""
+        SEAT_LOCK_WAIT.observe(0.002)
+        SEAT_LOCK_WAIT.observe(20.0)
+        output = REGISTRY.exposition()
+        count = REGISTRY.collect()['travel_seat_lock_wait_seconds'][()]['count']
+
+        self.assertIn(f'travel_seat_lock_wait_seconds_bucket{{le="+Inf"}} {count}', output)
+        self.assertIn(f'travel_seat_lock_wait_seconds_count {count}', output)
+
+    def test_multiprocess_snapshots_are_merged(self):
+        """Snapshots written by other workers are added to local values."""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_MULTIPROC_DIR=directory):
+                before = REGISTRY.collect()['travel_bookings_created_total'].get(('Route A', 'mtn'), 0.0)
+                with open(os.path.join(directory, 'metrics_999999.json'), 'w') as f:
+                    json.dump({'travel_bookings_created_total': [[['Route A', 'mtn'], 3.0]]}, f)
+
+                merged = REGISTRY.collect()['travel_bookings_created_total']
+                self.assertEqual(merged[('Route A', 'mtn')], before + 3.0)
+
+    def test_dead_worker_snapshots_are_archived(self):
+        """A dead worker's counters are kept in the archive and its gauges are dropped."""
+        worker = subprocess.Popen([sys.executable, '-c', ''])
+        worker.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_MULTIPROC_DIR=directory):
+                before = REGISTRY.collect()
+                with open(os.path.join(directory, f'metrics_{worker.pid}.json'), 'w') as f:
+                    json.dump({
+                        'travel_bookings_created_total': [[['Route A', 'mtn'], 3.0]],
+                        'travel_payment_in_flight': [[['mtn'], [2.0, 0.0]]],
+                    }, f)
+
+                for _ in range(2):
+                    collected = REGISTRY.collect()
+                    self.assertEqual(
+                        collected['travel_bookings_created_total'][('Route A', 'mtn')],
+                        before['travel_bookings_created_total'].get(('Route A', 'mtn'), 0.0) + 3.0
+                    )
+                    self.assertEqual(
+                        collected['travel_payment_in_flight'].get(('mtn',)),
+                        before['travel_payment_in_flight'].get(('mtn',))
+                    )
+                self.assertNotIn(f'metrics_{worker.pid}.json', os.listdir(directory))
+
+    def test_reused_pid_snapshot_is_archived(self):
+        """A snapshot left under this process's pid is archived before it is overwritten."""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_MULTIPROC_DIR=directory):
+                before = REGISTRY.collect()['travel_bookings_created_total'].get(('Route A', 'mtn'), 0.0)
+                with open(os.path.join(directory, f'metrics_{os.getpid()}.json'), 'w') as f:
+                    json.dump({'travel_bookings_created_total': [[['Route A', 'mtn'], 3.0]]}, f)
+                REGISTRY._flushed_pid = None
+
+                merged = REGISTRY.collect()['travel_bookings_created_total']
+                self.assertEqual(merged[('Route A', 'mtn')], before + 3.0)
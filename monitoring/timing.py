@@ -0,0 +1,93 @@
+"""
+Per-request timing collection.
+Call sites record elapsed time under a category ('db', 'payment',
+'notification', 'serialize') and RequestTimingMiddleware reports the totals
+for the current request. Outside a request, recording is a no-op.
+"""
+import asyncio
+import contextvars
+import functools
+import time
+from collections import Counter, defaultdict
+
+_current_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Accumulated durations, call counts and SQL shapes for one request."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.query_shapes = Counter()
+
+    def record(self, category, seconds):
+        self.durations[category] += seconds
+        self.counts[category] += 1
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Database execute wrapper (see connection.execute_wrapper)."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record('db', time.perf_counter() - started)
+            # SQL reaches the wrapper with placeholders, so identical shapes
+            # with different parameters collapse into one key.
+            self.query_shapes[sql] += 1
+
+    def repeated_queries(self, threshold):
+        """Return [(sql, count)] for shapes executed at least threshold times."""
+        return [(sql, count) for sql, count in self.query_shapes.most_common() if count >= threshold]
+
+
+def start():
+    """Begin collecting timings for the current context. Returns (timings, token)."""
+    timings = RequestTimings()
+    return timings, _current_timings.set(timings)
+
+
+def stop(token):
+    """Stop collecting timings started with start()."""
+    _current_timings.reset(token)
+
+
+def current():
+    """Return the RequestTimings for the current request, or None."""
+    return _current_timings.get()
+
+
+def record(category, seconds):
+    """Add seconds to category for the current request, if any."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.record(category, seconds)
+
+
+def timed(category):
+    """
+    Decorator recording the wrapped call's duration under category.
+
+    Apply beneath @staticmethod/@classmethod on adapter methods. Coroutine functions are
+    timed until their result is awaited.
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    record(category, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(category, time.perf_counter() - started)
+        return wrapper
+    return decorator
@@ -0,0 +1,17 @@
+"""
+Metrics exposition endpoint.
+"""
+from django.conf import settings
+from django.http import HttpResponse, Http404
+
+from .metrics import REGISTRY
+
+
+def metrics_view(request):
+    """Expose all metrics in the Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        raise Http404()
+    return HttpResponse(
+        REGISTRY.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -5,13 +5,22 @@ import qrcode
 import io
 import json
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from django.core.mail import EmailMessage
 from django.conf import settings
+from django.db import connection, transaction
 from django.template.loader import render_to_string
+from django.utils import timezone
 import logging
+from monitoring.timing import timed
+from monitoring.metrics import track_notification, NOTIFICATION_QUEUE_DEPTH
 
 logger = logging.getLogger(__name__)
 
+_deferred_executor = None
+_deferred_executor_lock = threading.Lock()
+
 
 def generate_qr_code(booking_id, schedule_id, secret_key=None):
     """
@@ -58,6 +67,8 @@ def generate_qr_code(booking_id, schedule_id, secret_key=None):
     return img_buffer.getvalue()
 
 
+@timed('notification')
+@track_notification('email')
 def send_booking_email(booking, schedule_occurrence):
     """
     Send booking confirmation email with QR code attachment.
@@ -134,6 +145,81 @@ Travel Suite Team
         }
 
 
+@timed('notification')
+@track_notification('email')
+def send_group_booking_email(bookings, schedule_occurrence):
+    """
+    Send one confirmation email for a group booking with a QR code per passenger.
+    
+    Args:
+        bookings: Booking instances sharing a group_id and contact details
+        schedule_occurrence: ScheduleOccurrence instance
+        
+    Returns:
+        dict: {
+            'success': bool,
+            'error': str or None
+        }
+    """
+    lead = bookings[0]
+    if not lead.email:
+        return {
+            'success': False,
+            'error': 'No email address provided'
+        }
+    
+    try:
+        passenger_lines = '\n'.join(
+            f"  Seat {booking.seat_number or '-'}: {booking.passenger_name} (Ref: {booking.id})"
+            for booking in bookings
+        )
+        email = EmailMessage(
+            subject=f'Travel Suite - Group Booking Confirmation {lead.group_id}',
+            body=f"""
+Dear {lead.passenger_name},
+
+Your group booking for {len(bookings)} passengers has been confirmed!
+
+Group Reference: {lead.group_id}
+Route: {schedule_occurrence.route.name}
+Date: {schedule_occurrence.date}
+Departure Time: {schedule_occurrence.departure_time}
+Phone: {lead.phone_number}
+
+Passengers:
+{passenger_lines}
+
+Please find one QR code ticket per passenger attached. Each passenger presents their own QR code at the departure point.
+
+Thank you for choosing Travel Suite!
+
+Best regards,
+Travel Suite Team
+            """,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[lead.email],
+        )
+        
+        for booking in bookings:
+            qr_image = generate_qr_code(booking.id, schedule_occurrence.id, secret_key=settings.SECRET_KEY)
+            email.attach(f'ticket_qr_seat_{booking.seat_number or booking.id}.png', qr_image, 'image/png')
+        
+        email.send()
+        
+        logger.info(f"Group booking email sent to {lead.email} for group {lead.group_id}")
+        
+        return {
+            'success': True,
+            'error': None
+        }
+    except Exception as e:
+        logger.error(f"Failed to send group booking email to {lead.email}: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
 def send_notification_async(booking, schedule_occurrence):
     """
     Async wrapper for sending notifications.
@@ -153,8 +239,10 @@ def send_notification_async(booking, schedule_occurrence):
     # MVP: Run synchronously
     from .twilio_client import send_sms
     
-    # Send SMS
-    sms_message = f"""
+    NOTIFICATION_QUEUE_DEPTH.inc()
+    try:
+        # Send SMS
+        sms_message = f"""
 Travel Suite Booking Confirmed!
 
 Ref: {booking.id}
@@ -162,10 +250,111 @@ Route: {schedule_occurrence.route.name}
 Date: {schedule_occurrence.date} {schedule_occurrence.departure_time}
 
 Thank you for choosing Travel Suite!
+        """
+        send_sms(booking.phone_number, sms_message)
+        
+        # Send email with QR if email provided
+        if booking.email:
+            send_booking_email(booking, schedule_occurrence)
+    finally:
+        NOTIFICATION_QUEUE_DEPTH.dec()
+
+
+def _get_deferred_executor():
+    global _deferred_executor
+    with _deferred_executor_lock:
+        if _deferred_executor is None:
+            _deferred_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='notifications')
+        return _deferred_executor
+
+
+def send_waitlist_offer(booking, schedule_occurrence):
+    """
+    Tell a waitlisted passenger that a seat is being held for them.
+    
+    Args:
+        booking: Pending Booking created by the waitlist promotion
+        schedule_occurrence: ScheduleOccurrence instance
+    """
+    from .twilio_client import send_sms
+    
+    hold_until = timezone.localtime(booking.hold_expires_at).strftime('%H:%M') if booking.hold_expires_at else ''
+    sms_message = f"""
+Travel Suite: A seat is available!
+
+Ref: {booking.id}
+Seat: {booking.seat_number}
+Route: {schedule_occurrence.route.name}
+Date: {schedule_occurrence.date} {schedule_occurrence.departure_time}
+
+Pay{f' by {hold_until}' if hold_until else ''} to confirm your seat.
     """
     send_sms(booking.phone_number, sms_message)
+
+
+def _send_deferred(bookings, notify):
+    try:
+        for booking in bookings:
+            try:
+                notify(booking, booking.schedule_occurrence)
+            except Exception as e:
+                logger.error(f"Failed to send deferred notification for booking {booking.id}: {str(e)}")
+    finally:
+        NOTIFICATION_QUEUE_DEPTH.dec(len(bookings))
+        connection.close()
+
+
+def defer_notifications(bookings, notify=send_notification_async):
+    """
+    Send booking notifications in the background once the current transaction commits.
+    
+    Used by batch endpoints and workers so they do not wait on SMS/email providers.
+    Nothing is sent if the transaction rolls back. Each booking should have its
+    schedule_occurrence (with recurrence and route) loaded.
+    
+    Args:
+        bookings: Booking instances
+        notify: Function called as notify(booking, schedule_occurrence)
+    """
+    bookings = list(bookings)
+    if not bookings:
+        return
+    
+    def submit():
+        NOTIFICATION_QUEUE_DEPTH.inc(len(bookings))
+        _get_deferred_executor().submit(_send_deferred, bookings, notify)
+    
+    transaction.on_commit(submit)
+
+
+def send_group_notification_async(bookings, schedule_occurrence):
+    """
+    Send one SMS and one email (with every passenger's QR code) for a group booking.
+    Runs synchronously in MVP, like send_notification_async.
+    
+    Args:
+        bookings: Booking instances sharing a group_id and contact details
+        schedule_occurrence: ScheduleOccurrence instance
+    """
+    from .twilio_client import send_sms
     
-    # Send email with QR if email provided
-    if booking.email:
-        send_booking_email(booking, schedule_occurrence)
+    lead = bookings[0]
+    NOTIFICATION_QUEUE_DEPTH.inc()
+    try:
+        seats = ', '.join(str(booking.seat_number) for booking in bookings if booking.seat_number)
+        sms_message = f"""
+Travel Suite Group Booking Confirmed!
+
+Group Ref: {lead.group_id}
+Passengers: {len(bookings)}{f' (seats {seats})' if seats else ''}
+Route: {schedule_occurrence.route.name}
+Date: {schedule_occurrence.date} {schedule_occurrence.departure_time}
 
+Thank you for choosing Travel Suite!
+        """
+        send_sms(lead.phone_number, sms_message)
+        
+        if lead.email:
+            send_group_booking_email(bookings, schedule_occurrence)
+    finally:
+        NOTIFICATION_QUEUE_DEPTH.dec()
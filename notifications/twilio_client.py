@@ -4,10 +4,14 @@ In MVP, uses placeholder credentials. Replace with actual Twilio credentials for
 """
 from django.conf import settings
 import logging
+from monitoring.timing import timed
+from monitoring.metrics import track_notification
 
 logger = logging.getLogger(__name__)
 
 
+@timed('notification')
+@track_notification('sms')
 def send_sms(phone_number, message):
     """
     Send SMS via Twilio.
@@ -0,0 +1,81 @@
+"""
+Cached operator access control.
+
+The set of routes an operator is actively assigned to is read at most once
+per request (memoised on the request) and shared between requests through
+the Django cache. Cache keys include a per-operator version that is bumped
+by invalidate_operator_access() whenever the operator's assignments change,
+so an edited assignment takes effect on the next request. With the default
+per-process LocMemCache, other worker processes pick the change up when
+their entry expires (OPERATOR_ACCESS_CACHE_TIMEOUT); configure a shared
+cache backend for immediate invalidation everywhere.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import OperatorAssignment
+
+REQUEST_ATTR = '_operator_route_ids'
+
+
+def _version_key(operator_id):
+    return f'operator_access:version:{operator_id}'
+
+
+def _get_version(operator_id):
+    key = _version_key(operator_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a version lost on eviction is never reused
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_operator_access(operator_id):
+    """Discard cached assignments for an operator after they change."""
+    key = _version_key(operator_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def assigned_route_ids(operator, request=None):
+    """
+    Return the frozenset of route ids the operator is actively assigned to.
+
+    Pass the current request to memoise the result for the rest of it.
+    """
+    memo = getattr(request, REQUEST_ATTR, None) if request is not None else None
+    if memo is not None and operator.id in memo:
+        return memo[operator.id]
+
+    key = f'operator_access:routes:{operator.id}:{_get_version(operator.id)}'
+    route_ids = cache.get(key)
+    if route_ids is None:
+        # Read from the primary so a lagging replica cannot cache stale access
+        route_ids = frozenset(OperatorAssignment.objects.using(DEFAULT_DB_ALIAS).filter(
+            operator_id=operator.id,
+            is_active=True
+        ).values_list('route_id', flat=True))
+        cache.set(key, route_ids, settings.OPERATOR_ACCESS_CACHE_TIMEOUT)
+
+    if request is not None:
+        if memo is None:
+            memo = {}
+            setattr(request, REQUEST_ATTR, memo)
+        memo[operator.id] = route_ids
+    return route_ids
+
+
+def can_access_route(operator, route_id, request=None):
+    """Check whether the operator is actively assigned to a route."""
+    try:
+        route_id = int(route_id)
+    except (TypeError, ValueError):
+        return False
+    return route_id in assigned_route_ids(operator, request)
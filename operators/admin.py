@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import OperatorUser, OperatorAssignment
+from .models import OperatorUser, OperatorAssignment, SeatAllocation
+from .access import invalidate_operator_access
 
 
 @admin.register(OperatorUser)
@@ -14,4 +15,25 @@ class OperatorAssignmentAdmin(admin.ModelAdmin):
     list_display = ['operator', 'route', 'is_active', 'created_at']
     list_filter = ['is_active', 'route']
     search_fields = ['operator__full_name', 'route__name']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_operator_access(obj.operator_id)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_operator_access(obj.operator_id)
+    
+    def delete_queryset(self, request, queryset):
+        operator_ids = set(queryset.values_list('operator_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for operator_id in operator_ids:
+            invalidate_operator_access(operator_id)
+
+
+@admin.register(SeatAllocation)
+class SeatAllocationAdmin(admin.ModelAdmin):
+    list_display = ['operator', 'schedule_occurrence', 'seats', 'updated_at']
+    search_fields = ['operator__full_name']
+    readonly_fields = ['seats', 'created_at', 'updated_at']
 
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_client_reference'),
+        ('operators', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='operatorassignment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='SeatAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('operator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_allocations', to='operators.operatoruser')),
+                ('schedule_occurrence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_allocations', to='bookings.scheduleoccurrence')),
+            ],
+            options={
+                'db_table': 'operator_seat_allocations',
+                'unique_together': {('operator', 'schedule_occurrence')},
+            },
+        ),
+    ]
@@ -29,6 +29,7 @@ class OperatorAssignment(models.Model):
     route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='operator_assignments')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'operator_assignments'
@@ -41,3 +42,19 @@ class OperatorAssignment(models.Model):
     def __str__(self):
         return f"{self.operator.full_name} → {self.route.name}"
 
+
+class SeatAllocation(models.Model):
+    """Seats held for an operator's device so it can sell them while offline."""
+    operator = models.ForeignKey(OperatorUser, on_delete=models.CASCADE, related_name='seat_allocations')
+    schedule_occurrence = models.ForeignKey('bookings.ScheduleOccurrence', on_delete=models.CASCADE, related_name='seat_allocations')
+    seats = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'operator_seat_allocations'
+        unique_together = [['operator', 'schedule_occurrence']]
+    
+    def __str__(self):
+        return f"{self.operator.full_name}: {len(self.seats)} seats on {self.schedule_occurrence_id}"
+
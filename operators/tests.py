@@ -0,0 +1,170 @@
+from datetime import date, time, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from routes.models import District, Route
+from buses.models import Bus
+from bookings.models import ScheduleRecurrence, ScheduleOccurrence, Booking
+from bookings.seats import assign_seats, seat_map
+from operators.models import OperatorUser, OperatorAssignment, SeatAllocation
+from operators.access import assigned_route_ids, can_access_route, invalidate_operator_access
+
+
+class OperatorAccessCacheTest(TestCase):
+    """Test cached operator route assignments."""
+    
+    def setUp(self):
+        cache.clear()
+        origin = District.objects.create(name="Kigali", code="KG")
+        destination = District.objects.create(name="Huye", code="HU")
+        self.route = Route.objects.create(name="Kigali - Huye", origin=origin, destination=destination)
+        user = User.objects.create_user(username='operator1', password='secret')
+        self.operator = OperatorUser.objects.create(user=user, full_name='Operator One', phone_number='+250788000000')
+        self.assignment = OperatorAssignment.objects.create(operator=self.operator, route=self.route)
+    
+    def test_assignments_are_cached(self):
+        """Assignments are queried once and then served from the cache."""
+        self.assertEqual(assigned_route_ids(self.operator), {self.route.id})
+        with self.assertNumQueries(0):
+            self.assertTrue(can_access_route(self.operator, self.route.id))
+            self.assertFalse(can_access_route(self.operator, 'not-a-route'))
+    
+    def test_invalidation_picks_up_changes(self):
+        """Bumping the version makes the next lookup see new assignments."""
+        self.assertTrue(can_access_route(self.operator, self.route.id))
+        self.assignment.is_active = False
+        self.assignment.save()
+        invalidate_operator_access(self.operator.id)
+        
+        self.assertFalse(can_access_route(self.operator, self.route.id))
+
+
+class OperatorSyncTest(TestCase):
+    """Test the offline operator sync protocol."""
+    
+    def setUp(self):
+        cache.clear()
+        origin = District.objects.create(name="Kigali", code="KG")
+        destination = District.objects.create(name="Huye", code="HU")
+        self.route = Route.objects.create(name="Kigali - Huye", origin=origin, destination=destination)
+        recurrence = ScheduleRecurrence.objects.create(
+            route=self.route,
+            bus=Bus.objects.create(plate_number="RAE200B", capacity=4),
+            departure_time=time(8, 0),
+            arrival_time=time(11, 0)
+        )
+        self.occurrence = ScheduleOccurrence.objects.create(
+            recurrence=recurrence,
+            date=date.today() + timedelta(days=1),
+            departure_time=time(8, 0),
+            arrival_time=time(11, 0)
+        )
+        self.user = User.objects.create_user(username='operator1', email='operator1@example.com', password='secret')
+        self.operator = OperatorUser.objects.create(user=self.user, full_name='Operator One', phone_number='+250788000000')
+        self.assignment = OperatorAssignment.objects.create(operator=self.operator, route=self.route)
+        self.client.force_login(self.user)
+    
+    def test_removed_assignment_is_synced(self):
+        """Removing an assignment in the dashboard is reported by the next delta sync."""
+        token = self.client.get('/api/operator/sync/').json()['token']
+        
+        admin = User.objects.create_user(username='admin1', email='admin1@example.com', password='secret', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.delete(f'/api/admin/operator-assignments/{self.assignment.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/api/admin/operator-assignments/').json(), [])
+        
+        self.client.force_login(self.user)
+        data = self.client.get('/api/operator/sync/', {'since': token}).json()
+        self.assertEqual(data['removed_route_ids'], [self.route.id])
+        self.assertEqual(data['routes'], [])
+        self.assertEqual(data['schedules'], [])
+    
+    @override_settings(OPERATOR_SYNC_OVERLAP_SECONDS=0)
+    def test_delta_sync(self):
+        """A delta sync returns only the schedules changed since the token."""
+        data = self.client.get('/api/operator/sync/').json()
+        self.assertTrue(data['full'])
+        self.assertEqual([route['id'] for route in data['routes']], [self.route.id])
+        self.assertEqual(len(data['schedules']), 1)
+        self.assertEqual(data['schedules'][0]['capacity'], 4)
+        self.assertEqual(data['schedules'][0]['occupied'], [])
+        
+        # Make everything older than the token
+        earlier = timezone.now() - timedelta(hours=1)
+        OperatorAssignment.objects.update(updated_at=earlier)
+        Route.objects.update(updated_at=earlier)
+        ScheduleRecurrence.objects.update(updated_at=earlier)
+        ScheduleOccurrence.objects.update(updated_at=earlier)
+        token = data['token']
+        
+        data = self.client.get('/api/operator/sync/', {'since': token}).json()
+        self.assertFalse(data['full'])
+        self.assertEqual((data['routes'], data['schedules'], data['removed_route_ids']), ([], [], []))
+        
+        assign_seats(self.occurrence, requested=[3])
+        data = self.client.get('/api/operator/sync/', {'since': token}).json()
+        self.assertEqual([(schedule['id'], schedule['occupied']) for schedule in data['schedules']], [(self.occurrence.id, [3])])
+        
+        self.assertEqual(self.client.get('/api/operator/sync/', {'since': 'nonsense'}).status_code, 400)
+    
+    def test_seat_allocation(self):
+        """Seats are held for the device, listed, synced and returned."""
+        response = self.client.post('/api/operator/sync/allocations/', {
+            'schedule_occurrence_id': self.occurrence.id,
+            'seats': 2,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['seats'], [1, 2])
+        
+        self.assertEqual([allocation['seats'] for allocation in self.client.get('/api/operator/sync/allocations/').json()], [[1, 2]])
+        schedule = self.client.get('/api/operator/sync/').json()['schedules'][0]
+        self.assertEqual((schedule['occupied'], schedule['allocated']), ([1, 2], [1, 2]))
+        
+        response = self.client.post('/api/operator/sync/allocations/', {
+            'schedule_occurrence_id': self.occurrence.id,
+            'seats': 3,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)  # Only two seats left
+        
+        response = self.client.delete(f'/api/operator/sync/allocations/?schedule_occurrence_id={self.occurrence.id}')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(SeatAllocation.objects.exists())
+        self.assertEqual(seat_map(self.occurrence)['available'], [1, 2, 3, 4])
+    
+    def test_upload(self):
+        """Offline sales are created, reassigned, rejected, and deduplicated on retry."""
+        SeatAllocation.objects.create(
+            operator=self.operator,
+            schedule_occurrence=self.occurrence,
+            seats=assign_seats(self.occurrence, count=2)
+        )
+        assign_seats(self.occurrence, requested=[3])  # Sold online while the device was offline
+        sale = {'passenger_name': 'Offline', 'phone_number': '+250788111111', 'schedule_occurrence_id': self.occurrence.id}
+        batch = {'sales': [
+            dict(sale, client_reference='device-1', seat_number=1),
+            dict(sale, client_reference='device-2', seat_number=3),
+            dict(sale, client_reference='device-3', schedule_occurrence_id=self.occurrence.id + 100),
+        ]}
+        
+        response = self.client.post('/api/operator/sync/upload/', batch, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([(result['status'], result.get('seat_number')) for result in data['results']], [
+            ('created', 1), ('reassigned', 2), ('rejected', None),
+        ])
+        self.assertEqual(data['results'][1]['reason'], 'Seat 3 was taken')
+        self.assertEqual((data['created'], data['conflicts']), (2, 2))
+        self.assertEqual(SeatAllocation.objects.get().seats, [])
+        bookings = Booking.objects.filter(operator=self.operator)
+        self.assertEqual(sorted(bookings.values_list('seat_number', flat=True)), [1, 2])
+        self.assertFalse(bookings.filter(payment_transaction__isnull=True).exists())
+        
+        # Retrying the batch after a dropped connection creates nothing new
+        data = self.client.post('/api/operator/sync/upload/', batch, content_type='application/json').json()
+        self.assertEqual([result['status'] for result in data['results']], ['duplicate', 'duplicate', 'rejected'])
+        self.assertEqual(data['results'][1]['booking_id'], str(bookings.get(client_reference='device-2').id))
+        self.assertEqual(bookings.count(), 2)
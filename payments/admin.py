@@ -1,5 +1,7 @@
+import json
 from django.contrib import admin
-from .models import PaymentTransaction, Refund
+from bookings.admin import ArchiveAdmin
+from .models import ArchivedPaymentTransaction, ArchivedRefund, PaymentEvent, PaymentTransaction, Refund
 
 
 @admin.register(PaymentTransaction)
@@ -12,8 +14,45 @@ class PaymentTransactionAdmin(admin.ModelAdmin):
 
 @admin.register(Refund)
 class RefundAdmin(admin.ModelAdmin):
-    list_display = ['id', 'payment_transaction', 'amount', 'status', 'created_at']
+    list_display = ['id', 'payment_transaction', 'amount', 'status', 'attempts', 'batch_id', 'created_at']
     list_filter = ['status', 'created_at']
-    search_fields = ['provider_refund_id']
+    search_fields = ['provider_refund_id', 'batch_id']
     readonly_fields = ['id', 'created_at', 'updated_at']
 
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'provider', 'operation', 'reference', 'success', 'created_at']
+    list_filter = ['provider', 'operation', 'success', 'month']
+    search_fields = ['reference']
+    raw_id_fields = ['payment_transaction', 'refund']
+    readonly_fields = ['provider', 'operation', 'reference', 'payment_transaction', 'refund', 'success',
+                       'month', 'created_at', 'payload_json']
+    exclude = ['payload']
+    
+    def payload_json(self, obj):
+        return json.dumps(obj.data, indent=2)
+    payload_json.short_description = 'Payload'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        # The log is append-only
+        return False
+
+
+@admin.register(ArchivedPaymentTransaction)
+class ArchivedPaymentTransactionAdmin(ArchiveAdmin):
+    list_display = ['id', 'provider', 'amount', 'status', 'booking', 'created_at']
+    list_filter = ['provider', 'status']
+    search_fields = ['provider_transaction_id', 'idempotency_key']
+    raw_id_fields = ['booking']
+
+
+@admin.register(ArchivedRefund)
+class ArchivedRefundAdmin(ArchiveAdmin):
+    list_display = ['id', 'payment_transaction', 'amount', 'status', 'attempts', 'batch_id', 'created_at']
+    list_filter = ['status']
+    search_fields = ['provider_refund_id', 'batch_id']
+    raw_id_fields = ['payment_transaction']
@@ -2,17 +2,30 @@
 Airtel Money payment adapter.
 In MVP, this is mocked. Replace with actual Airtel API calls for production.
 """
+import asyncio
 import time
 import uuid
 from decimal import Decimal
 from django.conf import settings
+from monitoring.timing import timed
+from monitoring.metrics import track_payment
+from .base import PaymentAdapter
+from .resilience import guarded
 
 
-class AirtelAdapter:
+class AirtelAdapter(PaymentAdapter):
     """Airtel Money payment adapter."""
+    name = 'airtel'
+    supports_refunds = True
+    supports_async_confirmation = True
+    supports_batch_refunds = True
+    base_url = settings.AIRTEL_API_URL
     
-    @staticmethod
-    def create_payment(phone_number, amount, transaction_id=None, idempotency_key=None):
+    @classmethod
+    @guarded('airtel')
+    @timed('payment')
+    @track_payment('airtel', 'create')
+    def create_payment(cls, phone_number, amount, transaction_id=None, idempotency_key=None):
         """
         Create a payment request.
         
@@ -54,17 +67,19 @@ class AirtelAdapter:
         else:
             # TODO: Replace with actual Airtel API call
             # Example structure:
-            # import requests
-            # response = requests.post(
-            #     'https://api.airtel.com/v1/payments',
-            #     headers={'Authorization': f'Bearer {AIRTEL_API_KEY}'},
-            #     json={'phone': phone_number, 'amount': amount, ...}
+            # status_code, body = cls.request(
+            #     'POST', '/v1/payments',
+            #     {'phone': phone_number, 'amount': amount, ...},
+            #     headers={'Authorization': f'Bearer {AIRTEL_API_KEY}'}
             # )
-            # return parse_response(response)
+            # return parse_response(status_code, body)
             raise NotImplementedError("Airtel live payment integration not implemented. Set PAYMENTS_MODE=mock for MVP.")
     
-    @staticmethod
-    def verify_payment(transaction_id):
+    @classmethod
+    @guarded('airtel', reject=False)
+    @timed('payment')
+    @track_payment('airtel', 'verify')
+    def verify_payment(cls, transaction_id):
         """
         Verify payment status.
         
@@ -99,8 +114,69 @@ class AirtelAdapter:
             # TODO: Replace with actual Airtel API verification call
             raise NotImplementedError("Airtel live payment verification not implemented. Set PAYMENTS_MODE=mock for MVP.")
     
-    @staticmethod
-    def refund_payment(transaction_id, amount, refund_id=None):
+    @classmethod
+    @guarded('airtel')
+    @timed('payment')
+    @track_payment('airtel', 'create')
+    async def acreate_payment(cls, phone_number, amount, transaction_id=None, idempotency_key=None):
+        """
+        Async version of create_payment for ASGI views (api/async_views.py).
+        
+        Waiting on the provider yields the event loop instead of a thread.
+        Arguments and result are the same as create_payment.
+        """
+        if settings.PAYMENTS_MODE == 'mock':
+            await asyncio.sleep(0.5)  # Simulate API delay
+            
+            mock_transaction_id = transaction_id or f"AIRTEL_{uuid.uuid4().hex[:16].upper()}"
+            
+            return {
+                'success': True,
+                'transaction_id': mock_transaction_id,
+                'status': 'pending',
+                'message': 'Payment request created successfully',
+                'response_raw': {
+                    'provider': 'airtel',
+                    'transaction_id': mock_transaction_id,
+                    'phone_number': phone_number,
+                    'amount': str(amount),
+                    'status': 'pending',
+                    'timestamp': time.time(),
+                }
+            }
+        else:
+            # TODO: Replace with an async Airtel API call (e.g. httpx.AsyncClient)
+            raise NotImplementedError("Airtel live payment integration not implemented. Set PAYMENTS_MODE=mock for MVP.")
+    
+    @classmethod
+    @guarded('airtel', reject=False)
+    @timed('payment')
+    @track_payment('airtel', 'verify')
+    async def averify_payment(cls, transaction_id):
+        """Async version of verify_payment; same arguments and result."""
+        if settings.PAYMENTS_MODE == 'mock':
+            await asyncio.sleep(0.3)
+            
+            return {
+                'success': True,
+                'status': 'completed',
+                'message': 'Payment verified successfully',
+                'response_raw': {
+                    'provider': 'airtel',
+                    'transaction_id': transaction_id,
+                    'status': 'completed',
+                    'timestamp': time.time(),
+                }
+            }
+        else:
+            # TODO: Replace with an async Airtel API verification call
+            raise NotImplementedError("Airtel live payment verification not implemented. Set PAYMENTS_MODE=mock for MVP.")
+    
+    @classmethod
+    @guarded('airtel')
+    @timed('payment')
+    @track_payment('airtel', 'refund')
+    def refund_payment(cls, transaction_id, amount, refund_id=None):
         """
         Refund a payment.
         
@@ -141,4 +217,54 @@ class AirtelAdapter:
         else:
             # TODO: Replace with actual Airtel API refund call
             raise NotImplementedError("Airtel live refund not implemented. Set PAYMENTS_MODE=mock for MVP.")
-
+    
+    @classmethod
+    @guarded('airtel')
+    @timed('payment')
+    @track_payment('airtel', 'refund_batch')
+    def refund_batch(cls, refunds):
+        """
+        Refund several payments with one bulk disbursement request.
+        
+        Args:
+            refunds: list of {'reference', 'transaction_id', 'amount'}
+            
+        Returns:
+            dict: {
+                'success': bool,
+                'batch_id': str,
+                'message': str,
+                'response_raw': dict,
+                'results': {reference: {'success', 'refund_id', 'status', 'message'}}
+            }
+        """
+        if settings.PAYMENTS_MODE == 'mock':
+            # Mock implementation - one round trip for the whole batch
+            time.sleep(0.5)
+            
+            batch_id = f"AIRTEL_BATCH_{uuid.uuid4().hex[:16].upper()}"
+            results = {
+                item['reference']: {
+                    'success': True,
+                    'refund_id': f"AIRTEL_REFUND_{uuid.uuid4().hex[:16].upper()}",
+                    'status': 'completed',
+                    'message': 'Refund processed successfully',
+                }
+                for item in refunds
+            }
+            
+            return {
+                'success': True,
+                'batch_id': batch_id,
+                'message': 'Batch refund processed successfully',
+                'results': results,
+                'response_raw': {
+                    'provider': 'airtel',
+                    'batch_id': batch_id,
+                    'items': len(refunds),
+                    'timestamp': time.time(),
+                }
+            }
+        else:
+            # TODO: Replace with the Airtel bulk disbursement API call
+            raise NotImplementedError("Airtel live batch refund not implemented. Set PAYMENTS_MODE=mock for MVP.")
@@ -0,0 +1,159 @@
+"""
+Base interface for payment provider adapters.
+
+Adapters are classes used without instances: views call
+adapter.create_payment(...) on the class, as they always have. A provider
+subclasses PaymentAdapter, implements the operations it offers and
+declares its capabilities, so callers branch on a flag rather than on the
+provider name:
+
+    supports_refunds            refund_payment() is implemented
+    supports_async_confirmation create_payment() only starts the payment
+                                (status 'pending'); the caller must
+                                confirm it with verify_payment()
+    supports_batch_refunds      refund_batch() submits many refunds in one
+                                provider call (see payments/refunds.py)
+
+Adapters are registered by name in settings.PAYMENT_ADAPTERS and loaded on
+first use by payments.registry.get_adapter().
+
+For live mode, request() talks JSON to the provider's base_url over one
+keep-alive HTTPS connection per adapter per thread, with the adapter's
+timeout, so consecutive calls skip the TCP and TLS handshakes.
+"""
+import http.client
+import json
+import threading
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+_connections = threading.local()
+
+
+class PaymentAdapter:
+    """Interface and shared plumbing for payment provider adapters."""
+    name = None
+    supports_refunds = False
+    supports_async_confirmation = False
+    supports_batch_refunds = False
+    # Calls a payment provider; its calls are logged as PaymentEvents
+    external = True
+    # Most items one refund_batch() call accepts
+    max_refund_batch_size = 100
+    # Provider API root for live mode, e.g. 'https://api.provider.example'
+    base_url = None
+    # Seconds to wait for the provider; None uses PAYMENT_PROVIDER_TIMEOUT_SECONDS
+    timeout = None
+
+    @classmethod
+    def create_payment(cls, phone_number, amount, transaction_id=None, idempotency_key=None):
+        """
+        Create a payment request.
+
+        Returns:
+            dict: {'success', 'transaction_id', 'status', 'message', 'response_raw'}
+        """
+        raise NotImplementedError(f'{cls.__name__} does not implement create_payment')
+
+    @classmethod
+    def verify_payment(cls, transaction_id):
+        """
+        Verify payment status.
+
+        Returns:
+            dict: {'success', 'status', 'message', 'response_raw'}
+        """
+        raise NotImplementedError(f'{cls.__name__} does not implement verify_payment')
+
+    @classmethod
+    def refund_payment(cls, transaction_id, amount, refund_id=None):
+        """
+        Refund a payment.
+
+        Returns:
+            dict: {'success', 'refund_id', 'status', 'message', 'response_raw'}
+        """
+        raise NotImplementedError(f'{cls.__name__} does not support refunds')
+
+    @classmethod
+    def refund_batch(cls, refunds):
+        """
+        Refund several payments with one bulk disbursement call.
+
+        Args:
+            refunds: list of {'reference', 'transaction_id', 'amount'}, where
+                reference is our id for the item, unique within the batch
+
+        Returns:
+            dict: {'success', 'batch_id', 'message', 'response_raw',
+                   'results': {reference: {'success', 'refund_id', 'status', 'message'}}}
+        """
+        raise NotImplementedError(f'{cls.__name__} does not support batch refunds')
+
+    @classmethod
+    async def acreate_payment(cls, phone_number, amount, transaction_id=None, idempotency_key=None):
+        """Async create_payment. Adapters with a native async client override this."""
+        return await sync_to_async(cls.create_payment, thread_sensitive=False)(
+            phone_number=phone_number,
+            amount=amount,
+            transaction_id=transaction_id,
+            idempotency_key=idempotency_key
+        )
+
+    @classmethod
+    async def averify_payment(cls, transaction_id):
+        """Async verify_payment. Adapters with a native async client override this."""
+        return await sync_to_async(cls.verify_payment, thread_sensitive=False)(transaction_id)
+
+    @classmethod
+    def get_timeout(cls):
+        return cls.timeout if cls.timeout is not None else settings.PAYMENT_PROVIDER_TIMEOUT_SECONDS
+
+    @classmethod
+    def connection(cls):
+        """Return this thread's keep-alive connection to base_url, opening it if needed."""
+        pool = getattr(_connections, 'pool', None)
+        if pool is None:
+            pool = _connections.pool = {}
+        conn = pool.get(cls)
+        if conn is None:
+            url = urlsplit(cls.base_url)
+            conn_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+            conn = pool[cls] = conn_class(url.netloc, timeout=cls.get_timeout())
+        return conn
+
+    @classmethod
+    def close_connection(cls):
+        conn = getattr(_connections, 'pool', {}).pop(cls, None)
+        if conn is not None:
+            conn.close()
+
+    @classmethod
+    def request(cls, method, path, payload=None, headers=None):
+        """
+        Send a JSON request to the provider and return (status code, decoded body).
+
+        A reused connection the provider has since closed is reopened and the
+        request sent once more; any other error closes the connection and
+        propagates (and counts against the circuit breaker).
+        """
+        body = json.dumps(payload) if payload is not None else None
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json', **(headers or {})}
+        path = urlsplit(cls.base_url).path.rstrip('/') + path
+        for attempt in (1, 2):
+            conn = cls.connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                cls.close_connection()
+                if attempt == 2:
+                    raise
+            except Exception:
+                cls.close_connection()
+                raise
+        return response.status, json.loads(data) if data else {}
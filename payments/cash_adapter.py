@@ -0,0 +1,31 @@
+"""
+Cash payment adapter.
+Cash is collected by the operator at boarding, so payments complete at once.
+"""
+from .base import PaymentAdapter
+
+
+class CashAdapter(PaymentAdapter):
+    """Cash payments: confirmed synchronously, no provider, no refunds."""
+    name = 'cash'
+    external = False
+
+    @classmethod
+    def create_payment(cls, phone_number, amount, transaction_id=None, idempotency_key=None):
+        return {
+            'success': True,
+            'transaction_id': transaction_id or f'CASH_{idempotency_key}',
+            'status': 'completed'
+        }
+
+    @classmethod
+    def verify_payment(cls, transaction_id):
+        return {'success': True, 'status': 'completed'}
+
+    @classmethod
+    async def acreate_payment(cls, phone_number, amount, transaction_id=None, idempotency_key=None):
+        return cls.create_payment(phone_number, amount, transaction_id, idempotency_key)
+
+    @classmethod
+    async def averify_payment(cls, transaction_id):
+        return cls.verify_payment(transaction_id)
@@ -0,0 +1,76 @@
+"""
+Payment event log.
+
+Every call to a payment provider is appended to payment_events with the
+adapter's full result (including the provider's raw response), instead of
+overwriting a response_raw column on the transaction or refund. The hot
+payment_transactions and refunds rows stay narrow and cheap to update, and
+the log keeps the full history of every call: create, each verification,
+each refund attempt and each refund batch.
+
+Payloads are JSON compressed with zlib, which shrinks typical provider
+responses to a third or less. Events are never updated. The month column
+(YYYYMM) lets old months be pruned by index range, or the table be
+partitioned by RANGE (month) on MySQL.
+"""
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import PaymentEvent
+
+COMPRESSION_LEVEL = 6
+
+
+def pack(payload):
+    return zlib.compress(
+        json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode(),
+        COMPRESSION_LEVEL
+    )
+
+
+def unpack(data):
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+def payment_event(operation, result, provider=None, payment_transaction=None, refund=None, reference=None):
+    """Build (without saving) the event for one provider call and its result dict."""
+    if payment_transaction is not None:
+        provider = provider or payment_transaction.provider
+        reference = reference or payment_transaction.provider_transaction_id
+    if refund is not None:
+        reference = reference or refund.provider_refund_id
+    now = timezone.now()
+    return PaymentEvent(
+        provider=provider,
+        operation=operation,
+        reference=reference,
+        payment_transaction=payment_transaction,
+        refund=refund,
+        success=bool(result.get('success')),
+        payload=pack(result),
+        month=now.year * 100 + now.month
+    )
+
+
+def record_event(operation, result, **kwargs):
+    """Append one provider call to the log. See payment_event() for arguments."""
+    event = payment_event(operation, result, **kwargs)
+    event.save()
+    return event
+
+
+def record_events(events):
+    """Append several events built with payment_event() in one INSERT."""
+    return PaymentEvent.objects.bulk_create(events)
+
+
+def latest_payload(payment_transaction, operation=None):
+    """Decoded result of the transaction's most recent (or most recent operation) call, or None."""
+    events = payment_transaction.events.order_by('-id')
+    if operation is not None:
+        events = events.filter(operation=operation)
+    event = events.only('payload').first()
+    return unpack(event.payload) if event is not None else None
@@ -0,0 +1,52 @@
+"""
+Management command to submit pending refunds to payment providers in batches
+(see payments/refunds.py).
+Run it every few minutes (via cron) so cancelled bookings are refunded promptly.
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.refunds import process_refunds
+from payments.registry import get_adapter, payment_methods
+from payments.resilience import ProviderUnavailable
+
+
+class Command(BaseCommand):
+    help = 'Submits pending refunds to each provider, in batches where the provider supports it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--provider',
+            action='append',
+            help='Only process this provider (repeatable; default: every provider that supports refunds)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Refunds per provider call (default: REFUND_BATCH_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        providers = options['provider'] or [
+            name for name in payment_methods() if get_adapter(name).supports_refunds
+        ]
+
+        for provider in providers:
+            totals = {'submitted': 0, 'completed': 0, 'failed': 0, 'calls': 0}
+            # One short transaction per batch; each refund is tried once per run
+            while True:
+                try:
+                    counts = process_refunds(provider, batch_size=options['batch_size'], now=now)
+                except ProviderUnavailable as e:
+                    self.stdout.write(self.style.WARNING(f'{provider}: {e.detail} (will retry next run)'))
+                    break
+                for key in totals:
+                    totals[key] += counts[key]
+                if not counts['claimed'] or counts['submitted'] < counts['claimed']:
+                    break
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{provider}: refunded {totals['completed']} of {totals['submitted']} "
+                f"in {totals['calls']} provider calls ({totals['failed']} given up)"
+            ))
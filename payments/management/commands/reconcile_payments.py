@@ -0,0 +1,112 @@
+"""
+Management command to reconcile payment transactions and refunds against
+provider statement CSVs (see payments/reconciliation.py).
+Run it daily (via cron) on the previous day's MTN and Airtel statements.
+"""
+import csv
+import sys
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from payments.reconciliation import (
+    REPORT_FIELDS, open_statement, payment_index, read_statement, reconcile, refund_index
+)
+
+
+class Command(BaseCommand):
+    help = 'Reconciles payment transactions and refunds against provider statement files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'statements',
+            nargs='+',
+            help='Statement CSV files (.csv or .csv.gz) covering the period',
+        )
+        parser.add_argument(
+            '--provider',
+            choices=['mtn', 'airtel'],
+            required=True,
+            help='Provider that issued the statements',
+        )
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            help='First statement day, YYYY-MM-DD (default: yesterday)',
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            help='Last statement day, YYYY-MM-DD (default: same as --from)',
+        )
+        parser.add_argument(
+            '--margin-hours',
+            type=int,
+            default=24,
+            help='Also load transactions this many hours either side of the period (default: 24)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the mismatch report CSV here (default: stdout)',
+        )
+        parser.add_argument('--id-column', default='transaction_id', help='Statement column with the provider reference')
+        parser.add_argument('--type-column', default='type', help='Statement column with the payment/refund type')
+        parser.add_argument('--amount-column', default='amount', help='Statement column with the amount')
+        parser.add_argument('--status-column', default='status', help='Statement column with the settlement status')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Rows fetched per database round trip while indexing (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            date_from = (datetime.strptime(options['date_from'], '%Y-%m-%d').date()
+                         if options['date_from'] else timezone.localdate() - timedelta(days=1))
+            date_to = (datetime.strptime(options['date_to'], '%Y-%m-%d').date()
+                       if options['date_to'] else date_from)
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format.')
+        if date_to < date_from:
+            raise CommandError('--to must not be before --from.')
+
+        start = timezone.make_aware(datetime.combine(date_from, time.min))
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+        margin = timedelta(hours=options['margin_hours'])
+        provider = options['provider']
+        columns = {
+            'id': options['id_column'],
+            'type': options['type_column'],
+            'amount': options['amount_column'],
+            'status': options['status_column'],
+        }
+
+        payments = payment_index(provider, start, end, margin, options['chunk_size'])
+        refunds = refund_index(provider, start, end, margin, options['chunk_size'])
+        self.stderr.write(f'Indexed {len(payments)} payments and {len(refunds)} refunds')
+
+        def statement_rows():
+            for path in options['statements']:
+                with open_statement(path) as lines:
+                    yield from read_statement(lines, columns)
+
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        stats = Counter()
+        try:
+            writer = csv.DictWriter(output, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            for mismatch in reconcile(statement_rows(), payments, refunds, stats):
+                writer.writerow(mismatch)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        mismatches = sum(count for key, count in stats.items() if key not in ('lines', 'matched'))
+        summary = ', '.join(f'{key}={count}' for key, count in sorted(stats.items()))
+        message = f'Reconciled {stats["lines"]} statement lines: {summary or "nothing to report"}'
+        self.stderr.write(self.style.SUCCESS(message) if not mismatches else self.style.WARNING(message))
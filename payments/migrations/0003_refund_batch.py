@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_paymenttransaction_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refund',
+            name='batch_id',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='refund',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='refund',
+            index=models.Index(fields=['status', 'created_at'], name='refunds_status_df4b9c_idx'),
+        ),
+    ]
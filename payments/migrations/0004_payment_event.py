@@ -0,0 +1,102 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:20
+
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_raw_responses(apps, schema_editor):
+    # Copy inline response_raw values into the event log before the
+    # columns are dropped. The original call time is not known, so the
+    # row's created_at stands in for it.
+    PaymentTransaction = apps.get_model('payments', 'PaymentTransaction')
+    Refund = apps.get_model('payments', 'Refund')
+    PaymentEvent = apps.get_model('payments', 'PaymentEvent')
+
+    def pack(payload):
+        return zlib.compress(json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode(), 6)
+
+    def flush(events):
+        PaymentEvent.objects.bulk_create(events)
+        events.clear()
+
+    events = []
+    rows = PaymentTransaction.objects.exclude(response_raw__isnull=True).values_list(
+        'id', 'provider', 'provider_transaction_id', 'status', 'response_raw', 'created_at'
+    ).iterator(chunk_size=2000)
+    for transaction_id, provider, reference, status, raw, created_at in rows:
+        if not raw:
+            continue
+        events.append(PaymentEvent(
+            provider=provider,
+            operation='create',
+            reference=reference,
+            payment_transaction_id=transaction_id,
+            success=status != 'failed',
+            payload=pack({'response_raw': raw}),
+            month=created_at.year * 100 + created_at.month
+        ))
+        if len(events) >= 1000:
+            flush(events)
+
+    rows = Refund.objects.exclude(response_raw__isnull=True).values_list(
+        'id', 'payment_transaction_id', 'payment_transaction__provider', 'provider_refund_id', 'status',
+        'response_raw', 'created_at'
+    ).iterator(chunk_size=2000)
+    for refund_id, transaction_id, provider, reference, status, raw, created_at in rows:
+        if not raw:
+            continue
+        events.append(PaymentEvent(
+            provider=provider,
+            operation='refund',
+            reference=reference,
+            payment_transaction_id=transaction_id,
+            refund_id=refund_id,
+            success=status == 'completed',
+            payload=pack({'response_raw': raw}),
+            month=created_at.year * 100 + created_at.month
+        ))
+        if len(events) >= 1000:
+            flush(events)
+    flush(events)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_refund_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('mtn', 'MTN Mobile Money'), ('airtel', 'Airtel Money'), ('cash', 'Cash')], max_length=20)),
+                ('operation', models.CharField(choices=[('create', 'Create Payment'), ('verify', 'Verify Payment'), ('refund', 'Refund'), ('refund_batch', 'Batch Refund')], max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=200, null=True)),
+                ('success', models.BooleanField(default=True)),
+                ('payload', models.BinaryField()),
+                ('month', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment_transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='payments.paymenttransaction')),
+                ('refund', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='payments.refund')),
+            ],
+            options={
+                'db_table': 'payment_events',
+                'indexes': [models.Index(fields=['payment_transaction', 'id'], name='payment_eve_payment_c22c1c_idx'), models.Index(fields=['refund', 'id'], name='payment_eve_refund__84ff44_idx'), models.Index(fields=['reference'], name='payment_eve_referen_dc0c0e_idx'), models.Index(fields=['month'], name='payment_eve_month_1983e6_idx')],
+            },
+        ),
+        migrations.RunPython(move_raw_responses, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='paymenttransaction',
+            name='response_raw',
+        ),
+        migrations.RemoveField(
+            model_name='refund',
+            name='response_raw',
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_archive'),
+        ('payments', '0004_payment_event'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentevent',
+            name='payment_transaction',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='events', to='payments.paymenttransaction'),
+        ),
+        migrations.AlterField(
+            model_name='paymentevent',
+            name='refund',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='events', to='payments.refund'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedPaymentTransaction',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('provider', models.CharField(choices=[('mtn', 'MTN Mobile Money'), ('airtel', 'Airtel Money'), ('cash', 'Cash')], max_length=20)),
+                ('provider_transaction_id', models.CharField(blank=True, max_length=200, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed'), ('refunded', 'Refunded')], max_length=20)),
+                ('idempotency_key', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('booking', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='payment_transaction', to='bookings.archivedbooking')),
+            ],
+            options={
+                'db_table': 'payment_transactions_archive',
+                'indexes': [models.Index(fields=['provider', 'status'], name='payment_tra_provide_fe3cba_idx'), models.Index(fields=['idempotency_key'], name='payment_tra_idempot_f91b78_idx'), models.Index(fields=['created_at'], name='payment_tra_created_4e4ced_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedRefund',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], max_length=20)),
+                ('provider_refund_id', models.CharField(blank=True, max_length=200, null=True)),
+                ('batch_id', models.CharField(blank=True, max_length=200, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('payment_transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refunds', to='payments.archivedpaymenttransaction')),
+            ],
+            options={
+                'db_table': 'refunds_archive',
+                'indexes': [models.Index(fields=['created_at'], name='refunds_arc_created_a93985_idx')],
+            },
+        ),
+    ]
@@ -23,7 +23,6 @@ class PaymentTransaction(models.Model):
     provider_transaction_id = models.CharField(max_length=200, blank=True, null=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    response_raw = models.JSONField(blank=True, null=True)
     idempotency_key = models.CharField(max_length=100, unique=True, blank=True, null=True)
     booking = models.OneToOneField('bookings.Booking', on_delete=models.CASCADE, related_name='payment_transaction')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -35,6 +34,7 @@ class PaymentTransaction(models.Model):
             models.Index(fields=['provider', 'status']),
             models.Index(fields=['idempotency_key']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
@@ -54,7 +54,8 @@ class Refund(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     provider_refund_id = models.CharField(max_length=200, blank=True, null=True)
-    response_raw = models.JSONField(blank=True, null=True)
+    batch_id = models.CharField(max_length=200, blank=True, null=True)  # Provider batch it was submitted in
+    attempts = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -63,8 +64,109 @@ class Refund(models.Model):
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['status', 'created_at']),
         ]
     
     def __str__(self):
         return f"Refund {self.id} - {self.amount} ({self.status})"
 
+
+class PaymentEvent(models.Model):
+    """
+    Append-only log of provider calls and their raw responses.
+    
+    The payload is zlib-compressed JSON (see payments/events.py), so the
+    hot transaction and refund rows stay narrow. month (YYYYMM) allows
+    pruning or partitioning the log by month. Events keep pointing at
+    archived transactions and refunds, which keep their ids.
+    """
+    OPERATION_CHOICES = [
+        ('create', 'Create Payment'),
+        ('verify', 'Verify Payment'),
+        ('refund', 'Refund'),
+        ('refund_batch', 'Batch Refund'),
+    ]
+    
+    provider = models.CharField(max_length=20, choices=PaymentTransaction.PROVIDER_CHOICES)
+    operation = models.CharField(max_length=20, choices=OPERATION_CHOICES)
+    # Provider transaction, refund or batch id the call was about
+    reference = models.CharField(max_length=200, blank=True, null=True)
+    # No database constraint: events outlive their rows when bookings are archived
+    payment_transaction = models.ForeignKey(
+        PaymentTransaction, on_delete=models.DO_NOTHING, db_constraint=False, related_name='events',
+        blank=True, null=True
+    )
+    refund = models.ForeignKey(
+        Refund, on_delete=models.DO_NOTHING, db_constraint=False, related_name='events', blank=True, null=True
+    )
+    success = models.BooleanField(default=True)
+    payload = models.BinaryField()
+    month = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'payment_events'
+        indexes = [
+            models.Index(fields=['payment_transaction', 'id']),
+            models.Index(fields=['refund', 'id']),
+            models.Index(fields=['reference']),
+            models.Index(fields=['month']),
+        ]
+    
+    def __str__(self):
+        return f"{self.provider} {self.operation} {self.reference or ''} ({self.created_at:%Y-%m-%d %H:%M})"
+    
+    @property
+    def data(self):
+        from .events import unpack
+        return unpack(self.payload)
+
+
+class ArchivedPaymentTransaction(models.Model):
+    """Payment transaction moved to the archive with its booking (see bookings/archive.py)."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    provider = models.CharField(max_length=20, choices=PaymentTransaction.PROVIDER_CHOICES)
+    provider_transaction_id = models.CharField(max_length=200, blank=True, null=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=PaymentTransaction.STATUS_CHOICES)
+    idempotency_key = models.CharField(max_length=100, blank=True, null=True)
+    booking = models.OneToOneField('bookings.ArchivedBooking', on_delete=models.CASCADE, related_name='payment_transaction')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'payment_transactions_archive'
+        indexes = [
+            models.Index(fields=['provider', 'status']),
+            models.Index(fields=['idempotency_key']),
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.provider} - {self.amount} ({self.status}, archived)"
+    
+    @property
+    def events(self):
+        return PaymentEvent.objects.filter(payment_transaction_id=self.id)
+
+
+class ArchivedRefund(models.Model):
+    """Refund moved to the archive with its payment transaction."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    payment_transaction = models.ForeignKey(ArchivedPaymentTransaction, on_delete=models.CASCADE, related_name='refunds')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Refund.STATUS_CHOICES)
+    provider_refund_id = models.CharField(max_length=200, blank=True, null=True)
+    batch_id = models.CharField(max_length=200, blank=True, null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'refunds_archive'
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Refund {self.id} - {self.amount} ({self.status}, archived)"
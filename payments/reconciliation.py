@@ -0,0 +1,191 @@
+"""
+Reconciliation of payment transactions and refunds against provider statements.
+
+A provider statement is a CSV of what MTN or Airtel actually settled, one
+line per payment or refund. Our side is loaded first, in one streamed pass
+over the statement period (plus a margin for calls that straddle midnight):
+payment_index() maps provider_transaction_id to the amount and status we
+recorded, summing the per-passenger rows of a group booking that share one
+provider transaction, and refund_index() does the same for
+provider_refund_id. The statement is then read line by line and each line
+is looked up in those dicts, so memory is bounded by the number of
+transactions in the period, not by the size of the statement file.
+Matched entries are removed from the index; whatever remains afterwards
+was recorded by us but never settled by the provider.
+"""
+import csv
+import gzip
+import io
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from .models import PaymentTransaction, Refund
+
+# Statement status values that mean the provider settled the item
+SETTLED_STATUSES = {'completed', 'success', 'successful', 'settled'}
+# Statement type values for refunds; anything else is a payment
+REFUND_TYPES = {'refund', 'reversal'}
+# Our payment statuses for money that was collected
+COLLECTED_STATUSES = ('completed', 'refunded')
+
+DEFAULT_COLUMNS = {
+    'id': 'transaction_id',
+    'type': 'type',
+    'amount': 'amount',
+    'status': 'status',
+}
+
+REPORT_FIELDS = ['kind', 'reference', 'line', 'statement_amount', 'recorded_amount', 'detail']
+
+
+def to_cents(value):
+    """Parse an amount (e.g. '5000', '5,000.00' or a Decimal) into integer cents."""
+    amount = Decimal(str(value).replace(',', '').strip())
+    return int((amount * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def _format_cents(cents):
+    return None if cents is None else f'{Decimal(cents) / 100:.2f}'
+
+
+def _window(start, end, margin):
+    return {'created_at__gte': start - margin, 'created_at__lt': end + margin}
+
+
+def payment_index(provider, start, end, margin=timedelta(hours=24), chunk_size=5000):
+    """
+    Return {provider_transaction_id: (amount cents, collected, in period)}.
+
+    collected is True if we recorded the money as received; in period is
+    True if any of the rows was created in [start, end).
+    """
+    index = {}
+    rows = PaymentTransaction.objects.filter(
+        provider=provider,
+        provider_transaction_id__isnull=False,
+        **_window(start, end, margin)
+    ).values_list('provider_transaction_id', 'amount', 'status', 'created_at').iterator(chunk_size=chunk_size)
+    for reference, amount, status, created_at in rows:
+        cents, collected, in_period = index.get(reference, (0, False, False))
+        index[reference] = (
+            cents + to_cents(amount),
+            collected or status in COLLECTED_STATUSES,
+            in_period or start <= created_at < end,
+        )
+    return index
+
+
+def refund_index(provider, start, end, margin=timedelta(hours=24), chunk_size=5000):
+    """Return {provider_refund_id: (amount cents, completed, in period)}."""
+    index = {}
+    rows = Refund.objects.filter(
+        payment_transaction__provider=provider,
+        provider_refund_id__isnull=False,
+        **_window(start, end, margin)
+    ).values_list('provider_refund_id', 'amount', 'status', 'created_at').iterator(chunk_size=chunk_size)
+    for reference, amount, status, created_at in rows:
+        index[reference] = (to_cents(amount), status == 'completed', start <= created_at < end)
+    return index
+
+
+def open_statement(path):
+    """Open a statement CSV (optionally .gz) as text for streaming."""
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8-sig', newline='')
+    return open(path, encoding='utf-8-sig', newline='')
+
+
+def read_statement(lines, columns=None):
+    """
+    Yield (line number, kind, reference, amount cents, settled) per statement row.
+
+    kind is 'payment', 'refund' or 'invalid' (reference and amount may then
+    be None). columns maps 'id', 'type', 'amount' and 'status' to header
+    names; the type and status columns are optional.
+    """
+    columns = dict(DEFAULT_COLUMNS, **(columns or {}))
+    reader = csv.DictReader(lines)
+    missing = [columns[key] for key in ('id', 'amount') if columns[key] not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Statement is missing column(s): {', '.join(missing)}")
+
+    for row in reader:
+        line = reader.line_num
+        reference = (row.get(columns['id']) or '').strip()
+        try:
+            cents = to_cents(row[columns['amount']])
+        except (InvalidOperation, TypeError, ValueError):
+            cents = None
+        if not reference or cents is None:
+            yield line, 'invalid', reference or None, None, False
+            continue
+        kind = 'refund' if (row.get(columns['type']) or '').strip().lower() in REFUND_TYPES else 'payment'
+        status = (row.get(columns['status']) or 'completed').strip().lower()
+        yield line, kind, reference, abs(cents), status in SETTLED_STATUSES
+
+
+def _mismatch(kind, reference, line=None, statement=None, recorded=None, detail=''):
+    return {
+        'kind': kind,
+        'reference': reference,
+        'line': line,
+        'statement_amount': _format_cents(statement),
+        'recorded_amount': _format_cents(recorded),
+        'detail': detail,
+    }
+
+
+def reconcile(statement_rows, payments, refunds, stats):
+    """
+    Match statement rows against the payment and refund indexes.
+
+    Yields mismatch dicts (REPORT_FIELDS) and counts outcomes in stats (a
+    Counter). Consumes the indexes: matched entries are removed.
+    """
+    matched = set()
+    for line, kind, reference, cents, settled in statement_rows:
+        stats['lines'] += 1
+        if kind == 'invalid':
+            stats['invalid'] += 1
+            yield _mismatch('invalid_line', reference, line, detail='Missing reference or unreadable amount')
+            continue
+
+        index = payments if kind == 'payment' else refunds
+        entry = index.pop(reference, None)
+        if entry is None:
+            if (kind, reference) in matched:
+                stats['duplicates'] += 1
+                yield _mismatch('duplicate_in_statement', reference, line, cents)
+            elif kind == 'payment':
+                stats['unknown_payments'] += 1
+                yield _mismatch('missing_in_records', reference, line, cents,
+                                detail='Settled by the provider but not recorded')
+            else:
+                stats['orphan_refunds'] += 1
+                yield _mismatch('orphan_refund', reference, line, cents,
+                                detail='Refunded by the provider with no matching refund record')
+            continue
+
+        matched.add((kind, reference))
+        recorded, ok, _ = entry
+        if recorded != cents:
+            stats['amount_mismatches'] += 1
+            yield _mismatch('amount_mismatch' if kind == 'payment' else 'refund_amount_mismatch',
+                            reference, line, cents, recorded)
+        elif settled != ok:
+            stats['status_mismatches'] += 1
+            detail = 'Provider settled it but it is not recorded as paid' if settled else \
+                'Recorded as paid but the provider did not settle it'
+            yield _mismatch('status_mismatch', reference, line, cents, recorded, detail)
+        else:
+            stats['matched'] += 1
+
+    for kind, index, collected_detail in (
+        ('payment', payments, 'Recorded as paid but not on the statement'),
+        ('refund', refunds, 'Recorded as refunded but not on the statement'),
+    ):
+        for reference, (recorded, ok, in_period) in index.items():
+            if ok and in_period:
+                stats[f'{kind}s_missing_in_statement'] += 1
+                yield _mismatch(f'{kind}_missing_in_statement', reference, recorded=recorded,
+                                detail=collected_detail)
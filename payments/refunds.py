@@ -0,0 +1,165 @@
+"""
+Queued refunds, submitted to providers in batches.
+
+Cancelling a booking only records a pending Refund (queue_refund). The
+process_refunds worker then takes the pending refunds of one provider, up
+to REFUND_BATCH_SIZE at a time, and submits them with a single
+refund_batch() call when the adapter supports bulk disbursement. Other
+adapters get one refund_payment() call per refund. On a mass-cancellation
+day, a thousand refunds take ten provider calls instead of a thousand.
+
+Each item's result is recorded on its own Refund row. A failed item stays
+pending and is retried by the next run until it has failed
+REFUND_MAX_ATTEMPTS times; then it is marked failed for manual follow-up.
+Rows are claimed with SKIP LOCKED, so several workers can run at once. The
+Refund id is sent as each item's reference, so a provider that dedupes on
+it never pays out twice for a batch that is submitted again.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from bookings.models import Booking
+
+from .events import payment_event, record_events
+from .models import PaymentTransaction, Refund
+from .registry import get_adapter
+from .resilience import ProviderUnavailable
+
+
+def queue_refund(payment_transaction, amount=None):
+    """
+    Record a pending refund of payment_transaction (in full by default) for the worker.
+
+    A transaction is refunded once: if it already has a pending or completed
+    refund, that refund is returned and no new one is recorded. Each Refund
+    has its own reference, so provider-side dedupe cannot catch a second one.
+    """
+    with transaction.atomic():
+        # Lock the transaction so concurrent callers queue one refund between them
+        PaymentTransaction.objects.select_for_update().filter(pk=payment_transaction.pk).exists()
+        existing = Refund.objects.filter(
+            payment_transaction=payment_transaction,
+            status__in=['pending', 'completed']
+        ).first()
+        if existing is not None:
+            return existing
+        return Refund.objects.create(
+            payment_transaction=payment_transaction,
+            amount=payment_transaction.amount if amount is None else amount,
+            status='pending'
+        )
+
+
+def _submit(adapter, refunds, transactions):
+    """Send refunds to the provider. Returns (results by refund id, batch result or None, provider calls)."""
+    if adapter.supports_batch_refunds:
+        result = adapter.refund_batch([
+            {
+                'reference': str(refund.id),
+                'transaction_id': transactions[refund.payment_transaction_id].provider_transaction_id,
+                'amount': refund.amount,
+            }
+            for refund in refunds
+        ])
+        if not result.get('success'):
+            # The whole batch was refused; every item counts as one failed attempt
+            failed = {'success': False, 'message': result.get('message')}
+            return {str(refund.id): failed for refund in refunds}, result, 1
+        results = result.get('results', {})
+        missing = {'success': False, 'message': 'Missing from the batch result'}
+        return {str(refund.id): results.get(str(refund.id), missing) for refund in refunds}, result, 1
+
+    results = {}
+    for refund in refunds:
+        try:
+            results[str(refund.id)] = adapter.refund_payment(
+                transaction_id=transactions[refund.payment_transaction_id].provider_transaction_id,
+                amount=refund.amount
+            )
+        except ProviderUnavailable:
+            # Circuit opened mid-run; the rest wait for the next run
+            if not results:
+                raise
+            break
+        except Exception as e:
+            results[str(refund.id)] = {'success': False, 'message': str(e)}
+    return results, None, len(results)
+
+
+def process_refunds(provider, batch_size=None, now=None):
+    """
+    Submit one batch of pending refunds for provider.
+
+    Refunds already attempted since now are skipped, so a worker run
+    (which passes one now for all its batches) tries each refund once.
+    Returns a dict of counts: claimed, submitted, completed, failed (given
+    up) and calls (provider requests made). Raises ProviderUnavailable,
+    without changing any row, if the provider's circuit is open.
+    """
+    adapter = get_adapter(provider)
+    batch_size = min(batch_size or settings.REFUND_BATCH_SIZE, adapter.max_refund_batch_size)
+    now = now or timezone.now()
+    counts = {'claimed': 0, 'submitted': 0, 'completed': 0, 'failed': 0, 'calls': 0}
+
+    with transaction.atomic():
+        refunds = list(Refund.objects.select_for_update(skip_locked=True).filter(
+            Q(attempts=0) | Q(updated_at__lt=now),
+            status='pending',
+            payment_transaction__provider=provider
+        ).order_by('created_at')[:batch_size])
+        counts['claimed'] = len(refunds)
+        if not refunds:
+            return counts
+
+        transactions = PaymentTransaction.objects.in_bulk({refund.payment_transaction_id for refund in refunds})
+        try:
+            results, batch_result, counts['calls'] = _submit(adapter, refunds, transactions)
+        except ProviderUnavailable:
+            raise
+        except Exception as e:
+            # Timeout or provider error: every item counts as one failed attempt
+            error = {'success': False, 'message': str(e)}
+            results, batch_result, counts['calls'] = {str(refund.id): error for refund in refunds}, None, 1
+        counts['submitted'] = len(results)
+        batch_id = batch_result.get('batch_id') if batch_result else None
+
+        refunded, bookings = [], []
+        events = [payment_event('refund_batch', batch_result, provider=provider, reference=batch_id)] if batch_result else []
+        for refund in refunds:
+            result = results.get(str(refund.id))
+            if result is None:
+                # Not submitted this run
+                continue
+            refund.attempts += 1
+            refund.batch_id = batch_id
+            refund.updated_at = now
+            if result.get('success') and result.get('status', 'completed') == 'completed':
+                refund.status = 'completed'
+                refund.provider_refund_id = result.get('refund_id')
+                refunded.append(refund.payment_transaction_id)
+                booking = Booking(id=transactions[refund.payment_transaction_id].booking_id)
+                booking.refund_id = refund.provider_refund_id
+                booking.updated_at = now
+                bookings.append(booking)
+                counts['completed'] += 1
+            elif refund.attempts >= settings.REFUND_MAX_ATTEMPTS:
+                refund.status = 'failed'
+                counts['failed'] += 1
+            events.append(payment_event(
+                'refund', result,
+                payment_transaction=transactions[refund.payment_transaction_id],
+                refund=refund,
+                reference=refund.provider_refund_id or str(refund.id)
+            ))
+
+        Refund.objects.bulk_update(
+            refunds,
+            ['status', 'provider_refund_id', 'batch_id', 'attempts', 'updated_at']
+        )
+        record_events(events)
+        if refunded:
+            PaymentTransaction.objects.filter(id__in=refunded).update(status='refunded', updated_at=now)
+            Booking.objects.bulk_update(bookings, ['refund_id', 'updated_at'])
+    return counts
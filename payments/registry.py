@@ -0,0 +1,49 @@
+"""
+Payment adapter registry.
+
+settings.PAYMENT_ADAPTERS maps a payment method (Booking.payment_method) to
+the dotted path of its adapter class. Adapters are imported on first use and
+cached, so no provider module is loaded at startup and adding a provider
+means adding a setting entry, not editing views.
+"""
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .base import PaymentAdapter
+
+_lock = threading.Lock()
+_adapters = {}
+
+
+class UnknownPaymentMethod(LookupError):
+    """Raised for a payment method with no registered adapter."""
+
+
+def get_adapter(payment_method):
+    """Return the adapter class for payment_method, importing it on first use."""
+    adapter = _adapters.get(payment_method)
+    if adapter is not None:
+        return adapter
+    with _lock:
+        if payment_method not in _adapters:
+            path = settings.PAYMENT_ADAPTERS.get(payment_method)
+            if path is None:
+                raise UnknownPaymentMethod(f'No payment adapter registered for {payment_method!r}')
+            adapter = import_string(path)
+            if not (isinstance(adapter, type) and issubclass(adapter, PaymentAdapter)):
+                raise TypeError(f'{path} is not a PaymentAdapter subclass')
+            _adapters[payment_method] = adapter
+        return _adapters[payment_method]
+
+
+def payment_methods():
+    """Names of all configured payment methods."""
+    return list(settings.PAYMENT_ADAPTERS)
+
+
+def reset():
+    """Forget loaded adapters (after PAYMENT_ADAPTERS changes, and in tests)."""
+    with _lock:
+        _adapters.clear()
@@ -0,0 +1,264 @@
+"""
+Circuit breaker and bulkhead for payment provider calls.
+
+Every provider gets one CircuitBreaker and one Bulkhead per process, shared
+by all worker threads (and the event loop under ASGI):
+
+- The bulkhead caps concurrent calls to the provider at
+  PAYMENT_BULKHEAD_SIZE. A call that cannot get a slot within
+  PAYMENT_BULKHEAD_WAIT_SECONDS fails fast, so a slow provider can tie up
+  at most that many workers and the rest keep serving other providers and
+  cash bookings.
+- The circuit breaker counts consecutive failures (exceptions, or calls
+  slower than PAYMENT_CIRCUIT_SLOW_CALL_SECONDS). After
+  PAYMENT_CIRCUIT_FAILURE_THRESHOLD of them it opens and new calls fail
+  fast for PAYMENT_CIRCUIT_RESET_SECONDS. It then lets a single probe call
+  through (half-open): success closes the circuit, failure opens it again.
+
+A rejected call raises ProviderUnavailable, which DRF turns into a 503 with
+a Retry-After header. It is raised before the provider is contacted, so
+the booking transaction rolls back and releases its row lock at once.
+
+Adapter methods opt in with @guarded(provider). Verification
+calls use reject=False: the charge already exists at the provider, so they
+are never refused, but their outcome still feeds the breaker.
+"""
+import asyncio
+import functools
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from monitoring.metrics import PAYMENT_CIRCUIT_STATE, PAYMENT_IN_FLIGHT, PAYMENT_REJECTED
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Exported as travel_payment_circuit_state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class ProviderUnavailable(APIException):
+    """Raised instead of calling a provider whose circuit is open or bulkhead is full."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_code = 'provider_unavailable'
+
+    def __init__(self, provider, reason, retry_after=None):
+        self.provider = provider
+        self.reason = reason
+        # DRF's exception handler sends `wait` as the Retry-After header
+        self.wait = retry_after
+        super().__init__(f'{provider} payments are temporarily unavailable; please try again shortly')
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker, safe to share between threads."""
+
+    def __init__(self, name, failure_threshold=5, reset_seconds=30.0, slow_call_seconds=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def _set_state(self, state):
+        self._state = state
+        PAYMENT_CIRCUIT_STATE.set(STATE_VALUES[state], provider=self.name)
+
+    def before_call(self):
+        """Admit a call or raise ProviderUnavailable. Returns True if the call is the half-open probe."""
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+            remaining = self.reset_seconds - (time.monotonic() - self._opened_at)
+            if self._state == OPEN and remaining <= 0:
+                self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+        PAYMENT_REJECTED.inc(provider=self.name, reason='circuit_open')
+        raise ProviderUnavailable(self.name, 'circuit_open', retry_after=max(1, int(remaining + 0.999)))
+
+    def cancel_probe(self):
+        """Give up the half-open probe slot without recording an outcome."""
+        with self._lock:
+            self._probing = False
+
+    def after_call(self, duration, error=None, probe=False):
+        """Record the outcome of an admitted call."""
+        failed = error is not None or (
+            self.slow_call_seconds is not None and duration > self.slow_call_seconds
+        )
+        with self._lock:
+            if probe:
+                self._probing = False
+            if not failed:
+                self._failures = 0
+                if self._state != CLOSED:
+                    self._set_state(CLOSED)
+                return
+            self._failures += 1
+            if probe or self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self._state != OPEN:
+                    self._set_state(OPEN)
+
+
+class Bulkhead:
+    """Caps concurrent calls to a provider, shared between threads."""
+
+    def __init__(self, name, max_concurrent=10, max_wait=0.5):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+    def _rejected(self):
+        PAYMENT_REJECTED.inc(provider=self.name, reason='bulkhead_full')
+        return ProviderUnavailable(self.name, 'bulkhead_full', retry_after=1)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.max_wait):
+            raise self._rejected()
+        PAYMENT_IN_FLIGHT.inc(provider=self.name)
+
+    async def aacquire(self):
+        # A threading semaphore cannot be awaited; poll it without blocking
+        # the event loop (asyncio.Semaphore is bound to a single loop)
+        deadline = time.monotonic() + self.max_wait
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise self._rejected()
+            await asyncio.sleep(0.01)
+        PAYMENT_IN_FLIGHT.inc(provider=self.name)
+
+    def release(self):
+        PAYMENT_IN_FLIGHT.dec(provider=self.name)
+        self._slots.release()
+
+
+_lock = threading.Lock()
+_breakers = {}
+_bulkheads = {}
+
+
+def circuit_breaker(provider):
+    """Return the process-wide CircuitBreaker for provider."""
+    with _lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(
+                provider,
+                failure_threshold=settings.PAYMENT_CIRCUIT_FAILURE_THRESHOLD,
+                reset_seconds=settings.PAYMENT_CIRCUIT_RESET_SECONDS,
+                slow_call_seconds=settings.PAYMENT_CIRCUIT_SLOW_CALL_SECONDS or None
+            )
+        return _breakers[provider]
+
+
+def bulkhead(provider):
+    """Return the process-wide Bulkhead for provider."""
+    with _lock:
+        if provider not in _bulkheads:
+            _bulkheads[provider] = Bulkhead(
+                provider,
+                max_concurrent=settings.PAYMENT_BULKHEAD_SIZE,
+                max_wait=settings.PAYMENT_BULKHEAD_WAIT_SECONDS
+            )
+        return _bulkheads[provider]
+
+
+def reset(provider=None):
+    """Forget breaker and bulkhead state (after settings change, and in tests)."""
+    with _lock:
+        for registry in (_breakers, _bulkheads):
+            if provider is None:
+                registry.clear()
+            else:
+                registry.pop(provider, None)
+
+
+def guarded(provider, reject=True):
+    """
+    Decorator running a provider call through its bulkhead and circuit breaker.
+
+    Apply beneath @classmethod and above @timed, so rejected calls are not
+    timed as provider latency. With reject=False the call is always made and
+    only its outcome is recorded.
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                breaker = circuit_breaker(provider)
+                if not reject:
+                    return await _observe_async(breaker, False, func, args, kwargs)
+                probe = breaker.before_call()
+                limiter = bulkhead(provider)
+                try:
+                    await limiter.aacquire()
+                except ProviderUnavailable:
+                    if probe:
+                        breaker.cancel_probe()
+                    raise
+                try:
+                    return await _observe_async(breaker, probe, func, args, kwargs)
+                finally:
+                    limiter.release()
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            breaker = circuit_breaker(provider)
+            if not reject:
+                return _observe(breaker, False, func, args, kwargs)
+            probe = breaker.before_call()
+            limiter = bulkhead(provider)
+            try:
+                limiter.acquire()
+            except ProviderUnavailable:
+                if probe:
+                    breaker.cancel_probe()
+                raise
+            try:
+                return _observe(breaker, probe, func, args, kwargs)
+            finally:
+                limiter.release()
+        return wrapper
+    return decorator
+
+
+def _observe(breaker, probe, func, args, kwargs):
+    started = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    except Exception as e:
+        breaker.after_call(time.perf_counter() - started, error=e, probe=probe)
+        raise
+    breaker.after_call(time.perf_counter() - started, probe=probe)
+    return result
+
+
+async def _observe_async(breaker, probe, func, args, kwargs):
+    started = time.perf_counter()
+    try:
+        result = await func(*args, **kwargs)
+    except Exception as e:
+        breaker.after_call(time.perf_counter() - started, error=e, probe=probe)
+        raise
+    breaker.after_call(time.perf_counter() - started, probe=probe)
+    return result
@@ -1,7 +1,21 @@
-from django.test import TestCase
+import io
+import threading
+import time
+from collections import Counter
+from django.test import TestCase, override_settings
 from django.conf import settings
 from payments.mtn_adapter import MTNAdapter
 from payments.airtel_adapter import AirtelAdapter
+from payments.reconciliation import read_statement, reconcile
+from datetime import date, time as clock, timedelta
+from routes.models import District, Route
+from buses.models import Bus
+from bookings.models import ScheduleRecurrence, ScheduleOccurrence, Booking
+from payments.models import PaymentEvent, PaymentTransaction, Refund
+from payments.refunds import process_refunds, queue_refund
+from payments import registry, resilience
+from payments.cash_adapter import CashAdapter
+from payments.resilience import ProviderUnavailable, guarded
 
 
 class PaymentAdapterTest(TestCase):
@@ -89,3 +103,221 @@ class PaymentAdapterTest(TestCase):
         self.assertIn('refund_id', refund_result)
         self.assertEqual(refund_result['status'], 'completed')
 
+
+
+class ReconciliationTest(TestCase):
+    """Test matching provider statements against recorded payments."""
+    
+    def test_reconcile_reports_mismatches(self):
+        """Test each kind of mismatch is reported once and matches are not."""
+        statement = io.StringIO(
+            "transaction_id,type,amount,status\n"
+            "MTN_OK,payment,5000,completed\n"
+            "MTN_OK,payment,5000,completed\n"
+            "MTN_SHORT,payment,4000.00,completed\n"
+            "MTN_UNKNOWN,payment,3000,completed\n"
+            "REF_UNKNOWN,refund,-2000,completed\n"
+        )
+        payments = {
+            # reference: (amount in cents, collected, created in period)
+            'MTN_OK': (500000, True, True),
+            'MTN_SHORT': (500000, True, True),
+            'MTN_UNSETTLED': (500000, True, True),
+            'MTN_MARGIN': (500000, True, False),
+        }
+        stats = Counter()
+        
+        mismatches = list(reconcile(read_statement(statement), payments, {}, stats))
+        
+        self.assertEqual(
+            [(m['kind'], m['reference']) for m in mismatches],
+            [
+                ('duplicate_in_statement', 'MTN_OK'),
+                ('amount_mismatch', 'MTN_SHORT'),
+                ('missing_in_records', 'MTN_UNKNOWN'),
+                ('orphan_refund', 'REF_UNKNOWN'),
+                ('payment_missing_in_statement', 'MTN_UNSETTLED'),
+            ]
+        )
+        self.assertEqual(stats['matched'], 1)
+        self.assertEqual(stats['lines'], 5)
+
+
+class StandInProvider:
+    """Local provider that can be made to fail or hang."""
+    failing = False
+    release = None
+    calls = 0
+    
+    @staticmethod
+    @guarded('standin')
+    def create_payment(phone_number, amount):
+        StandInProvider.calls += 1
+        if StandInProvider.release is not None:
+            StandInProvider.release.wait(5)
+        if StandInProvider.failing:
+            raise ConnectionError('provider is down')
+        return {'success': True, 'status': 'pending'}
+
+
+@override_settings(
+    PAYMENT_CIRCUIT_FAILURE_THRESHOLD=3,
+    PAYMENT_CIRCUIT_RESET_SECONDS=0.2,
+    PAYMENT_BULKHEAD_SIZE=2,
+    PAYMENT_BULKHEAD_WAIT_SECONDS=0.05
+)
+class ProviderResilienceTest(TestCase):
+    """Test the circuit breaker and bulkhead around provider calls."""
+    
+    def setUp(self):
+        resilience.reset()
+        StandInProvider.failing = False
+        StandInProvider.release = None
+        StandInProvider.calls = 0
+    
+    def tearDown(self):
+        resilience.reset()
+    
+    def test_circuit_opens_and_recovers(self):
+        """Test failures open the circuit, and a half-open probe closes it."""
+        StandInProvider.failing = True
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                StandInProvider.create_payment('+250788123456', 5000)
+        
+        # Open: fails fast without calling the provider
+        with self.assertRaises(ProviderUnavailable) as raised:
+            StandInProvider.create_payment('+250788123456', 5000)
+        self.assertEqual(raised.exception.reason, 'circuit_open')
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(StandInProvider.calls, 3)
+        
+        # Half-open probe fails: open again
+        time.sleep(0.25)
+        with self.assertRaises(ConnectionError):
+            StandInProvider.create_payment('+250788123456', 5000)
+        with self.assertRaises(ProviderUnavailable):
+            StandInProvider.create_payment('+250788123456', 5000)
+        
+        # Half-open probe succeeds: closed
+        StandInProvider.failing = False
+        time.sleep(0.25)
+        self.assertTrue(StandInProvider.create_payment('+250788123456', 5000)['success'])
+        self.assertEqual(resilience.circuit_breaker('standin').state, resilience.CLOSED)
+        self.assertEqual(StandInProvider.calls, 5)
+    
+    def test_bulkhead_rejects_when_provider_is_slow(self):
+        """Test calls beyond the concurrency limit fail fast while the provider hangs."""
+        StandInProvider.release = threading.Event()
+        workers = [
+            threading.Thread(target=StandInProvider.create_payment, args=('+250788123456', 5000))
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+        while StandInProvider.calls < 2:
+            time.sleep(0.01)
+        
+        started = time.perf_counter()
+        with self.assertRaises(ProviderUnavailable) as raised:
+            StandInProvider.create_payment('+250788123456', 5000)
+        self.assertEqual(raised.exception.reason, 'bulkhead_full')
+        self.assertLess(time.perf_counter() - started, 1)
+        
+        StandInProvider.release.set()
+        for worker in workers:
+            worker.join()
+        self.assertTrue(StandInProvider.create_payment('+250788123456', 5000)['success'])
+
+
+class AdapterRegistryTest(TestCase):
+    """Test payment adapters are looked up by payment method."""
+    
+    def test_get_adapter(self):
+        """Test registered adapters load with their capabilities."""
+        self.assertIs(registry.get_adapter('mtn'), MTNAdapter)
+        self.assertIs(registry.get_adapter('airtel'), AirtelAdapter)
+        self.assertTrue(MTNAdapter.supports_async_confirmation)
+        self.assertFalse(CashAdapter.supports_refunds)
+        with self.assertRaises(registry.UnknownPaymentMethod):
+            registry.get_adapter('cheque')
+
+
+class RefundBatchTest(TestCase):
+    """Test queued refunds are submitted in provider batches."""
+    
+    def setUp(self):
+        settings.PAYMENTS_MODE = 'mock'
+        resilience.reset()
+        route = Route.objects.create(
+            name="Kigali - Huye",
+            origin=District.objects.create(name="Kigali", code="KG"),
+            destination=District.objects.create(name="Huye", code="HU"),
+            distance_km=130
+        )
+        recurrence = ScheduleRecurrence.objects.create(
+            route=route,
+            bus=Bus.objects.create(plate_number="RAB456Y", capacity=30),
+            recurrence_type='daily',
+            departure_time=clock(8, 0),
+            arrival_time=clock(11, 0)
+        )
+        self.occurrence = ScheduleOccurrence.objects.create(
+            recurrence=recurrence,
+            date=date.today() + timedelta(days=2),
+            departure_time=clock(8, 0),
+            arrival_time=clock(11, 0)
+        )
+    
+    def test_refunds_are_batched(self):
+        """Test one provider call refunds every queued refund."""
+        for index in range(3):
+            booking = Booking.objects.create(
+                passenger_name=f"Passenger {index}",
+                phone_number=f"+25078812345{index}",
+                schedule_occurrence=self.occurrence,
+                payment_method='mtn',
+                status='cancelled',
+                seat_number=index + 1
+            )
+            queue_refund(PaymentTransaction.objects.create(
+                provider='mtn',
+                provider_transaction_id=f'MTN_TEST_{index}',
+                amount=5000,
+                status='completed',
+                booking=booking
+            ))
+        
+        counts = process_refunds('mtn', batch_size=10)
+        
+        self.assertEqual(counts['completed'], 3)
+        self.assertEqual(counts['calls'], 1)
+        self.assertFalse(Refund.objects.exclude(status='completed').exists())
+        self.assertEqual(Refund.objects.values('batch_id').distinct().count(), 1)
+        self.assertFalse(PaymentTransaction.objects.exclude(status='refunded').exists())
+        self.assertFalse(Booking.objects.filter(refund_id__isnull=True).exists())
+        
+        # One event for the batch call, one per refunded item
+        self.assertEqual(PaymentEvent.objects.filter(operation='refund_batch').count(), 1)
+        refund_event = PaymentEvent.objects.filter(operation='refund').select_related('refund').first()
+        self.assertEqual(refund_event.data['refund_id'], refund_event.refund.provider_refund_id)
+    
+    def test_transaction_is_refunded_once(self):
+        """Test queueing a refund again returns the existing one."""
+        booking = Booking.objects.create(
+            passenger_name="Passenger",
+            phone_number="+250788123450",
+            schedule_occurrence=self.occurrence,
+            payment_method='mtn',
+            status='cancelled',
+            seat_number=1
+        )
+        payment_transaction = PaymentTransaction.objects.create(
+            provider='mtn', provider_transaction_id='MTN_TEST_ONCE', amount=5000, status='completed', booking=booking
+        )
+        
+        refund = queue_refund(payment_transaction)
+        self.assertEqual(queue_refund(payment_transaction), refund)
+        process_refunds('mtn')
+        self.assertEqual(queue_refund(payment_transaction), refund)
+        self.assertEqual(Refund.objects.filter(payment_transaction=payment_transaction).count(), 1)
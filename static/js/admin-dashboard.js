@@ -37,6 +37,9 @@ function loadTabData(tabName) {
         case 'bookings':
             loadBookings();
             break;
+        case 'analytics':
+            loadAnalytics();
+            break;
         case 'operators':
             loadOperators();
             break;
@@ -488,6 +491,77 @@ async function loadBookings() {
     }
 }
 
+// Analytics (served from the daily rollups)
+function formatPercent(value) {
+    return `${(value * 100).toFixed(1)}%`;
+}
+
+function formatMoney(value) {
+    return Number(value).toLocaleString();
+}
+
+async function loadAnalytics() {
+    const params = new URLSearchParams();
+    const start = document.getElementById('analyticsStart').value;
+    const end = document.getElementById('analyticsEnd').value;
+    if (start) params.set('start', start);
+    if (end) params.set('end', end);
+    
+    try {
+        const data = await TravelSuite.apiCall(`/admin/analytics/?${params}`);
+        const totals = data.totals;
+        
+        document.getElementById('analyticsStart').value = data.start;
+        document.getElementById('analyticsEnd').value = data.end;
+        document.getElementById('analyticsUpdated').textContent = data.last_updated
+            ? `Rollups updated ${new Date(data.last_updated).toLocaleString()}`
+            : 'Rollups have not been built yet (run update_daily_rollups)';
+        
+        document.getElementById('analyticsTotals').innerHTML = [
+            ['Bookings', totals.bookings],
+            ['Cancellations', totals.cancellations],
+            ['Load Factor', formatPercent(totals.load_factor)],
+            ['Revenue', formatMoney(totals.revenue.total)],
+            ['MTN', formatMoney(totals.revenue.mtn)],
+            ['Airtel', formatMoney(totals.revenue.airtel)],
+            ['Cash', formatMoney(totals.revenue.cash)],
+        ].map(([label, value]) => `
+            <div class="stat">
+                <div>${label}</div>
+                <div class="stat-value">${value}</div>
+            </div>
+        `).join('');
+        
+        document.getElementById('analyticsRoutesBody').innerHTML = data.routes.map(r => `
+            <tr>
+                <td>${r.route_name}</td>
+                <td>${r.departures}</td>
+                <td>${r.bookings}</td>
+                <td>${r.cancellations}</td>
+                <td>${formatPercent(r.load_factor)}</td>
+                <td>${formatMoney(r.revenue.mtn)}</td>
+                <td>${formatMoney(r.revenue.airtel)}</td>
+                <td>${formatMoney(r.revenue.cash)}</td>
+                <td>${formatMoney(r.revenue.total)}</td>
+            </tr>
+        `).join('') || '<tr><td colspan="9">No data for this period</td></tr>';
+        
+        document.getElementById('analyticsDailyBody').innerHTML = data.daily.map(d => `
+            <tr>
+                <td>${d.date}</td>
+                <td>${d.departures}</td>
+                <td>${d.bookings}</td>
+                <td>${d.cancellations}</td>
+                <td>${formatPercent(d.load_factor)}</td>
+                <td>${formatMoney(d.revenue.total)}</td>
+            </tr>
+        `).join('') || '<tr><td colspan="6">No data for this period</td></tr>';
+    } catch (error) {
+        document.getElementById('analyticsRoutesBody').innerHTML = 
+            `<tr><td colspan="9" class="alert alert-error">Error: ${error.message}</td></tr>`;
+    }
+}
+
 // Operators Management
 async function loadOperators() {
     try {
@@ -622,6 +696,10 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('scheduleForm').addEventListener('submit', saveSchedule);
     document.getElementById('operatorForm').addEventListener('submit', saveOperator);
     document.getElementById('assignmentForm').addEventListener('submit', saveAssignment);
+    document.getElementById('analyticsForm').addEventListener('submit', (e) => {
+        e.preventDefault();
+        loadAnalytics();
+    });
     
     // Load initial data
     loadDistricts();
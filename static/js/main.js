@@ -81,7 +81,9 @@ async function apiCall(endpoint, options = {}) {
     }
     
     if (!response.ok) {
-      throw new Error(data?.error || data?.message || `Request failed with status ${response.status}`);
+      const error = new Error(data?.error || data?.message || data?.detail || `Request failed with status ${response.status}`);
+      error.status = response.status;
+      throw error;
     }
     
     return data;
@@ -147,14 +149,34 @@ async function searchRoutes(fromLocation) {
 }
 
 // Schedules Functions
+const scheduleQuotes = {};
+
+async function loadQuotes(params) {
+  try {
+    const data = await apiCall(`/schedules/quotes/${params}`);
+    return data.results || data;
+  } catch (error) {
+    // Listings still work without prices; the fare is set at booking
+    console.error('Failed to load fare quotes:', error);
+    return [];
+  }
+}
+
 async function loadSchedules(routeId, date = null) {
   try {
     let params = `?route_id=${routeId}`;
     if (date) {
       params += `&date=${date}`;
     }
-    const data = await apiCall(`/schedules/${params}`);
-    return data.results || data;
+    const [data, quotes] = await Promise.all([
+      apiCall(`/schedules/${params}`),
+      loadQuotes(params),
+    ]);
+    quotes.forEach(quote => { scheduleQuotes[quote.schedule_id] = quote; });
+    return (data.results || data).map(schedule => ({
+      ...schedule,
+      price: scheduleQuotes[schedule.id] ? scheduleQuotes[schedule.id].price : null,
+    }));
   } catch (error) {
     console.error('Failed to load schedules:', error);
     throw error;
@@ -203,6 +225,7 @@ function renderScheduleCard(schedule) {
       <p><strong>Route:</strong> ${schedule.route.name}</p>
       <p><strong>Arrival:</strong> ${schedule.arrival_time}</p>
       <p><strong>Time to Departure:</strong> ${timeToDeparture}</p>
+      ${schedule.price ? `<p><strong>Fare:</strong> ${Number(schedule.price).toLocaleString()} RWF</p>` : ''}
       <span class="schedule-seats ${seatsClass}">
         ${schedule.remaining_seats} seats available
       </span>
@@ -218,15 +241,28 @@ function selectSchedule(scheduleId, scheduleDate = null) {
   if (scheduleDate) {
     localStorage.setItem('selectedScheduleDate', scheduleDate);
   }
+  // Keep the signed quote so the booking is charged the price shown
+  if (scheduleQuotes[scheduleId]) {
+    localStorage.setItem('selectedScheduleQuote', JSON.stringify(scheduleQuotes[scheduleId]));
+  } else {
+    localStorage.removeItem('selectedScheduleQuote');
+  }
   window.location.href = `/booking/?schedule_id=${scheduleId}`;
 }
 
 // Booking Functions
-async function createBooking(bookingData) {
+function newIdempotencyKey() {
+  if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+  return `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+}
+
+// Pass the same idempotencyKey when retrying so the booking is made only once
+async function createBooking(bookingData, idempotencyKey = null) {
   try {
     const data = await apiCall('/bookings/', {
       method: 'POST',
       body: bookingData,
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
     });
     return data;
   } catch (error) {
@@ -235,10 +271,11 @@ async function createBooking(bookingData) {
   }
 }
 
-async function cancelBooking(bookingId) {
+async function cancelBooking(bookingId, idempotencyKey = null) {
   try {
     const data = await apiCall(`/bookings/${bookingId}/cancel/`, {
       method: 'POST',
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
     });
     return data;
   } catch (error) {
@@ -296,6 +333,7 @@ window.TravelSuite = {
   loadSchedules,
   renderScheduleCard,
   selectSchedule,
+  newIdempotencyKey,
   createBooking,
   cancelBooking,
   getBookingStatus,
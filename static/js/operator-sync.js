@@ -0,0 +1,158 @@
+// Travel Suite - Operator offline sync
+//
+// Keeps a local copy of the operator's routes and upcoming schedules
+// (refreshed with delta syncs), queues cash sales made while offline and
+// uploads them in one batch when the connection comes back.
+
+const SYNC_STORAGE_KEY = 'travelSuiteOperatorSync';
+const SYNC_INTERVAL_MS = 60000;
+
+function loadSyncState() {
+  try {
+    const stored = JSON.parse(localStorage.getItem(SYNC_STORAGE_KEY));
+    if (stored) return stored;
+  } catch (error) {
+    console.warn('Discarding unreadable sync state:', error);
+  }
+  return { token: null, routes: {}, schedules: {}, queue: [] };
+}
+
+function saveSyncState(state) {
+  localStorage.setItem(SYNC_STORAGE_KEY, JSON.stringify(state));
+}
+
+function newClientReference() {
+  if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+  return `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+}
+
+function isNetworkError(error) {
+  return !navigator.onLine || error instanceof TypeError;
+}
+
+// Fetch routes/schedules changed since the last sync and merge them locally
+async function pullChanges() {
+  const state = loadSyncState();
+  const params = state.token ? `?since=${encodeURIComponent(state.token)}` : '';
+  const data = await TravelSuite.apiCall(`/operator/sync/${params}`);
+
+  if (data.full) {
+    state.routes = {};
+    state.schedules = {};
+  }
+  data.routes.forEach(route => { state.routes[route.id] = route; });
+  data.removed_route_ids.forEach(routeId => { delete state.routes[routeId]; });
+  data.schedules.forEach(schedule => { state.schedules[schedule.id] = schedule; });
+
+  const today = new Date().toISOString().split('T')[0];
+  Object.values(state.schedules).forEach(schedule => {
+    if (schedule.date < today || !state.routes[schedule.route_id]) {
+      delete state.schedules[schedule.id];
+    }
+  });
+
+  state.token = data.token;
+  saveSyncState(state);
+  return state;
+}
+
+// Hold seats on a schedule so they can be sold without a connection
+async function allocateSeats(scheduleId, seats) {
+  const allocation = await TravelSuite.apiCall('/operator/sync/allocations/', {
+    method: 'POST',
+    body: { schedule_occurrence_id: scheduleId, seats },
+  });
+  await pullChanges();
+  return allocation;
+}
+
+// Queue a cash sale; a seat is taken from the local allocation when possible
+function queueSale(sale) {
+  const state = loadSyncState();
+  const schedule = state.schedules[sale.schedule_occurrence_id];
+  const queued = { ...sale, client_reference: newClientReference() };
+
+  if (!queued.seat_number && schedule && schedule.allocated.length > 0) {
+    queued.seat_number = schedule.allocated.shift();
+  }
+  if (schedule && queued.seat_number) {
+    schedule.allocated = schedule.allocated.filter(seat => seat !== queued.seat_number);
+    schedule.occupied.push(queued.seat_number);
+  }
+
+  state.queue.push(queued);
+  saveSyncState(state);
+  return queued;
+}
+
+// Upload queued sales; every sale gets a final result, so the queue is cleared
+async function flushQueue() {
+  const state = loadSyncState();
+  if (state.queue.length === 0) return null;
+
+  const sales = state.queue.slice();
+  const result = await TravelSuite.apiCall('/operator/sync/upload/', {
+    method: 'POST',
+    body: { sales },
+  });
+
+  const uploaded = new Set(sales.map(sale => sale.client_reference));
+  const current = loadSyncState();
+  current.queue = current.queue.filter(sale => !uploaded.has(sale.client_reference));
+  saveSyncState(current);
+  return result;
+}
+
+function cachedSchedules(routeId, date) {
+  const state = loadSyncState();
+  return Object.values(state.schedules)
+    .filter(schedule => String(schedule.route_id) === String(routeId) && schedule.date === date)
+    .map(schedule => ({
+      ...schedule,
+      remaining_seats: schedule.capacity - schedule.occupied.length + schedule.allocated.length,
+      time_to_departure: null,
+    }))
+    .sort((a, b) => a.departure_time.localeCompare(b.departure_time));
+}
+
+function cachedRoutes() {
+  return Object.values(loadSyncState().routes);
+}
+
+function queuedCount() {
+  return loadSyncState().queue.length;
+}
+
+async function syncNow() {
+  const result = await flushQueue();
+  await pullChanges();
+  return result;
+}
+
+function startOperatorSync(onChange) {
+  const run = async () => {
+    if (!navigator.onLine) return;
+    try {
+      const result = await syncNow();
+      if (onChange) onChange(result);
+    } catch (error) {
+      console.error('Operator sync failed:', error);
+    }
+  };
+  window.addEventListener('online', run);
+  setInterval(run, SYNC_INTERVAL_MS);
+  run();
+}
+
+window.OperatorSync = {
+  pullChanges,
+  allocateSeats,
+  queueSale,
+  flushQueue,
+  syncNow,
+  cachedSchedules,
+  cachedRoutes,
+  queuedCount,
+  isNetworkError,
+  startOperatorSync,
+};
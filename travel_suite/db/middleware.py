@@ -0,0 +1,57 @@
+"""
+Middleware keeping clients on the primary database after they write.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .routers import is_pinned, reset_pin, restore_pin
+
+PIN_COOKIE = 'db_primary_pin'
+
+
+class PrimaryPinningMiddleware:
+    """
+    Reset replica routing per request, and after a request writes set a
+    short-lived cookie so the client's next reads (e.g. booking status right
+    after booking) also go to the primary for REPLICA_PIN_SECONDS.
+    Runs natively under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = reset_pin(PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            self._set_pin_cookie(request, response)
+        finally:
+            restore_pin(token)
+        return response
+
+    async def __acall__(self, request):
+        token = reset_pin(PIN_COOKIE in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+            self._set_pin_cookie(request, response)
+        finally:
+            restore_pin(token)
+        return response
+
+    def _set_pin_cookie(self, request, response):
+        if is_pinned() and PIN_COOKIE not in request.COOKIES:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
@@ -0,0 +1,125 @@
+"""
+MySQL backend with an in-process connection pool.
+
+Django's persistent connections (CONN_MAX_AGE) keep one connection per
+thread, which does not help ASGI deployments where each request may run on
+a different executor thread. This backend keeps a pool of idle PyMySQL
+connections per database alias: closing a Django connection returns the
+underlying connection to the pool, and opening one reuses an idle
+connection after a ping health check.
+
+Pool settings (per DATABASES entry):
+    POOL_SIZE: maximum number of idle connections kept (default 10)
+    POOL_RECYCLE: seconds after which a connection is discarded (default 3600)
+"""
+import threading
+import time
+from collections import deque
+
+from django.db.backends.mysql import base as mysql_base
+
+
+class ConnectionPool:
+    """Thread-safe LIFO pool of idle DB-API connections."""
+
+    def __init__(self, max_size, recycle):
+        self.max_size = max_size
+        self.recycle = recycle
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, connect):
+        """Return a healthy idle connection, or a new one from connect()."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, created_at = self._idle.pop()
+            if time.monotonic() - created_at > self.recycle:
+                self._discard(connection)
+                continue
+            try:
+                connection.ping(reconnect=False)
+            except Exception:
+                self._discard(connection)
+                continue
+            with self._lock:
+                self.reused += 1
+            connection._pool_created_at = created_at
+            return connection
+
+        connection = connect()
+        with self._lock:
+            self.created += 1
+        connection._pool_created_at = time.monotonic()
+        return connection
+
+    def release(self, connection):
+        """Return a connection to the pool, closing it if the pool is full."""
+        created_at = getattr(connection, '_pool_created_at', time.monotonic())
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((connection, created_at))
+                return
+        self._discard(connection)
+
+    def clear(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            return {'idle': len(self._idle), 'created': self.created, 'reused': self.reused}
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """Return the pool for a database alias, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(
+                max_size=settings_dict.get('POOL_SIZE', 10),
+                recycle=settings_dict.get('POOL_RECYCLE', 3600),
+            )
+        return pool
+
+
+class DatabaseWrapper(mysql_base.DatabaseWrapper):
+    """MySQL DatabaseWrapper that borrows connections from a ConnectionPool."""
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        parent = super().get_new_connection
+        return self.pool.acquire(lambda: parent(conn_params))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Connections closed mid-transaction or after errors are not reused.
+        if self.in_atomic_block or self.errors_occurred:
+            return super()._close()
+        with self.wrap_database_errors:
+            try:
+                self.connection.rollback()
+            except Exception:
+                return super()._close()
+            self.pool.release(self.connection)
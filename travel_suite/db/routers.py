@@ -0,0 +1,122 @@
+"""
+Read-replica database routing.
+
+ReplicaRouter sends reads to one of the DATABASE_REPLICAS aliases and all
+writes to 'default'. Reads stay on the primary when:
+    - the current request (or, via PrimaryPinningMiddleware's cookie, a
+      recent request from the same client) has written, so users see
+      their own bookings;
+    - they run inside a transaction on the primary (including
+      select_for_update() row locks);
+    - every replica lags more than REPLICA_MAX_LAG_SECONDS or cannot be
+      checked.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+_pinned = contextvars.ContextVar('pin_to_primary', default=False)
+
+_lag_cache = {}
+_lag_lock = threading.Lock()
+
+
+def pin_to_primary():
+    """Route all further reads in the current context to the primary."""
+    _pinned.set(True)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+def reset_pin(pinned=False):
+    """Start a new routing context; returns a token for restore_pin()."""
+    return _pinned.set(pinned)
+
+
+def restore_pin(token):
+    _pinned.reset(token)
+
+
+def replica_lag(alias):
+    """
+    Return replication lag in seconds for a replica alias, or None if it
+    cannot be determined. Results are cached for REPLICA_LAG_CHECK_INTERVAL.
+    """
+    now = time.monotonic()
+    with _lag_lock:
+        cached = _lag_cache.get(alias)
+        if cached and now - cached[1] < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return cached[0]
+
+    lag = _query_lag(alias)
+    with _lag_lock:
+        _lag_cache[alias] = (lag, now)
+    return lag
+
+
+def _query_lag(alias):
+    connection = connections[alias]
+    if connection.vendor != 'mysql':
+        # Local SQLite/other replicas have no replication to measure.
+        return 0
+    try:
+        with connection.cursor() as cursor:
+            for statement, column in (
+                ('SHOW REPLICA STATUS', 'Seconds_Behind_Source'),
+                ('SHOW SLAVE STATUS', 'Seconds_Behind_Master'),
+            ):
+                try:
+                    cursor.execute(statement)
+                except Exception:
+                    continue
+                row = cursor.fetchone()
+                if row is None:
+                    # Not configured as a replica (e.g. a local copy).
+                    return 0
+                columns = [col[0] for col in cursor.description]
+                value = row[columns.index(column)] if column in columns else None
+                return None if value is None else int(value)
+    except Exception as e:
+        logger.warning(f"Replica lag check failed for {alias}: {str(e)}")
+    return None
+
+
+class ReplicaRouter:
+    """Route safe reads to healthy replicas and everything else to the primary."""
+
+    def _healthy_replicas(self):
+        max_lag = settings.REPLICA_MAX_LAG_SECONDS
+        healthy = []
+        for alias in settings.DATABASE_REPLICAS:
+            lag = replica_lag(alias)
+            if lag is not None and lag <= max_lag:
+                healthy.append(alias)
+        return healthy
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or is_pinned():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        healthy = self._healthy_replicas()
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
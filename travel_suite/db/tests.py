@@ -0,0 +1,45 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from travel_suite.db import routers
+from travel_suite.db.routers import ReplicaRouter
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0', 'replica_1'], REPLICA_MAX_LAG_SECONDS=5)
+class ReplicaRouterTest(SimpleTestCase):
+    """Test replica routing decisions."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.token = routers.reset_pin()
+
+    def tearDown(self):
+        routers.restore_pin(self.token)
+
+    @mock.patch('travel_suite.db.routers.replica_lag', return_value=0)
+    def test_reads_go_to_replicas(self, _):
+        """Reads are sent to a replica when none lag."""
+        self.assertIn(self.router.db_for_read(None), ['replica_0', 'replica_1'])
+
+    @mock.patch('travel_suite.db.routers.replica_lag', return_value=0)
+    def test_write_pins_reads_to_primary(self, _):
+        """After a write, reads in the same context use the primary."""
+        self.assertEqual(self.router.db_for_write(None), 'default')
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    @mock.patch('travel_suite.db.routers.replica_lag', side_effect=lambda alias: 60 if alias == 'replica_0' else 1)
+    def test_lagging_replica_is_skipped(self, _):
+        """Replicas beyond the lag limit are not used."""
+        for _ in range(10):
+            self.assertEqual(self.router.db_for_read(None), 'replica_1')
+
+    @mock.patch('travel_suite.db.routers.replica_lag', return_value=None)
+    def test_fallback_to_primary_when_no_replica_is_healthy(self, _):
+        """Reads fall back to the primary when lag cannot be determined."""
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_migrations_only_on_primary(self):
+        """Schema changes are only applied to the primary."""
+        self.assertTrue(self.router.allow_migrate('default', 'bookings'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'bookings'))
@@ -4,6 +4,7 @@ Django settings for travel_suite project.
 import os
 from pathlib import Path
 from decouple import config
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -34,16 +35,21 @@ INSTALLED_APPS = [
     'payments',
     'notifications',
     'operators',
+    'monitoring',
+    'analytics',
     'api',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'travel_suite.db.middleware.PrimaryPinningMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'monitoring.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -67,16 +73,28 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'travel_suite.wsgi.application'
+ASGI_APPLICATION = 'travel_suite.asgi.application'
 
 # Database
+# DATABASE_POOL=True switches to the pooled MySQL backend (travel_suite/db/mysql_pool),
+# recommended for ASGI workers together with DATABASE_CONN_MAX_AGE=0.
+DATABASE_POOL = config('DATABASE_POOL', default=False, cast=bool)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'travel_suite.db.mysql_pool' if DATABASE_POOL else 'django.db.backends.mysql',
         'NAME': config('DATABASE_NAME', default='travel_suite'),
         'USER': config('DATABASE_USER', default='root'),
         'PASSWORD': config('DATABASE_PASSWORD', default='Pass@!123'),
         'HOST': config('DATABASE_HOST', default='localhost'),
         'PORT': config('DATABASE_PORT', default='3306'),
+        # Persistent connections: reuse a connection for this many seconds
+        # instead of reconnecting on every request (0 = close after each request)
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=60, cast=int),
+        # Ping persistent connections before reuse so dropped ones are replaced
+        'CONN_HEALTH_CHECKS': config('DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'POOL_SIZE': config('DATABASE_POOL_SIZE', default=10, cast=int),
+        'POOL_RECYCLE': config('DATABASE_POOL_RECYCLE', default=3600, cast=int),
         'OPTIONS': {
             'charset': 'utf8mb4',
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
@@ -84,6 +102,35 @@ DATABASES = {
     }
 }
 
+# Read replicas: comma-separated host[:port][/name] entries, each added as a
+# 'replica_N' alias that copies the default settings. Safe reads are routed
+# to replicas by travel_suite.db.routers.ReplicaRouter.
+DATABASE_REPLICAS = []
+for index, spec in enumerate(filter(None, config('DATABASE_REPLICA_HOSTS', default='').split(','))):
+    replica = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    address, _, name = spec.strip().partition('/')
+    host, _, port = address.partition(':')
+    replica.update(HOST=host, PORT=port or replica['PORT'], NAME=name or replica['NAME'])
+    DATABASES[f'replica_{index}'] = replica
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['travel_suite.db.routers.ReplicaRouter']
+# Replicas further behind than this are skipped until they catch up
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=5, cast=int)
+REPLICA_LAG_CHECK_INTERVAL = config('REPLICA_LAG_CHECK_INTERVAL', default=5, cast=int)
+# After a client writes, its reads stay on the primary for this long
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+
+# Cache (per-process memory by default). Point CACHE_BACKEND/CACHE_LOCATION at
+# a shared backend (e.g. django.core.cache.backends.memcached.PyMemcacheCache)
+# when running several workers so invalidations reach every process.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -149,10 +196,63 @@ CORS_ALLOWED_ORIGINS = config(
 ).split(',')
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # Payment settings
 PAYMENTS_MODE = config('PAYMENTS_MODE', default='mock')
 
+# Adapter class per payment method, imported on first use (payments/registry.py)
+PAYMENT_ADAPTERS = {
+    'mtn': 'payments.mtn_adapter.MTNAdapter',
+    'airtel': 'payments.airtel_adapter.AirtelAdapter',
+    'cash': 'payments.cash_adapter.CashAdapter',
+}
+PAYMENT_PROVIDER_TIMEOUT_SECONDS = config('PAYMENT_PROVIDER_TIMEOUT_SECONDS', default=10, cast=float)
+MTN_API_URL = config('MTN_API_URL', default='https://sandbox.momodeveloper.mtn.com')
+AIRTEL_API_URL = config('AIRTEL_API_URL', default='https://openapiuat.airtel.africa')
+
+# Payment provider circuit breaker and bulkhead (payments/resilience.py)
+PAYMENT_CIRCUIT_FAILURE_THRESHOLD = config('PAYMENT_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+PAYMENT_CIRCUIT_RESET_SECONDS = config('PAYMENT_CIRCUIT_RESET_SECONDS', default=30, cast=float)
+PAYMENT_CIRCUIT_SLOW_CALL_SECONDS = config('PAYMENT_CIRCUIT_SLOW_CALL_SECONDS', default=10, cast=float)
+PAYMENT_BULKHEAD_SIZE = config('PAYMENT_BULKHEAD_SIZE', default=10, cast=int)
+PAYMENT_BULKHEAD_WAIT_SECONDS = config('PAYMENT_BULKHEAD_WAIT_SECONDS', default=0.5, cast=float)
+
+# Refunds submitted per provider call and retries before giving up (payments/refunds.py)
+REFUND_BATCH_SIZE = config('REFUND_BATCH_SIZE', default=100, cast=int)
+REFUND_MAX_ATTEMPTS = config('REFUND_MAX_ATTEMPTS', default=5, cast=int)
+
+# Largest party accepted by POST /api/bookings/group/
+GROUP_BOOKING_MAX_PASSENGERS = config('GROUP_BOOKING_MAX_PASSENGERS', default=10, cast=int)
+
+# Seconds a pending (unpaid) booking holds its seat (bookings/holds.py)
+BOOKING_HOLD_SECONDS = config('BOOKING_HOLD_SECONDS', default=900, cast=int)
+
+# Travel days kept in the live booking tables before archival (bookings/archive.py)
+ARCHIVE_RETENTION_DAYS = config('ARCHIVE_RETENTION_DAYS', default=365, cast=int)
+
+# Largest batch accepted by POST /api/operator/bookings/bulk/
+OPERATOR_BULK_SALE_MAX = config('OPERATOR_BULK_SALE_MAX', default=100, cast=int)
+
+# Seconds an operator's route assignments stay cached (operators/access.py)
+OPERATOR_ACCESS_CACHE_TIMEOUT = config('OPERATOR_ACCESS_CACHE_TIMEOUT', default=300, cast=int)
+
+# Offline operator sync (api/sync_views.py)
+OPERATOR_SYNC_DAYS_AHEAD = config('OPERATOR_SYNC_DAYS_AHEAD', default=7, cast=int)
+OPERATOR_SYNC_OVERLAP_SECONDS = config('OPERATOR_SYNC_OVERLAP_SECONDS', default=5, cast=int)
+OPERATOR_SYNC_MAX_ALLOCATION = config('OPERATOR_SYNC_MAX_ALLOCATION', default=20, cast=int)
+OPERATOR_SYNC_MAX_UPLOAD = config('OPERATOR_SYNC_MAX_UPLOAD', default=500, cast=int)
+
+# Seconds a stored Idempotency-Key response is replayed (api/idempotency.py)
+IDEMPOTENCY_KEY_TTL_SECONDS = config('IDEMPOTENCY_KEY_TTL_SECONDS', default=86400, cast=int)
+
+# Fare engine (bookings/fares.py): price table cache and signed quote lifetime
+FARE_TABLE_CACHE_TIMEOUT = config('FARE_TABLE_CACHE_TIMEOUT', default=300, cast=int)
+FARE_QUOTE_TTL_SECONDS = config('FARE_QUOTE_TTL_SECONDS', default=600, cast=int)
+
+# Daily route rollups (analytics/rollups.py)
+ANALYTICS_ROLLUP_OVERLAP_SECONDS = config('ANALYTICS_ROLLUP_OVERLAP_SECONDS', default=60, cast=int)
+
 # Twilio settings
 TWILIO_SID = config('TWILIO_SID', default='')
 TWILIO_TOKEN = config('TWILIO_TOKEN', default='')
@@ -167,6 +267,23 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('EMAIL_FROM', default='noreply@travelsuite.rw')
 
+# Request instrumentation (Server-Timing headers + structured timing logs)
+REQUEST_TIMING_ENABLED = config('REQUEST_TIMING_ENABLED', default=True, cast=bool)
+REQUEST_TIMING_N_PLUS_ONE_THRESHOLD = config('REQUEST_TIMING_N_PLUS_ONE_THRESHOLD', default=10, cast=int)
+
+# Metrics (/metrics, Prometheus text format)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+# Shared directory for per-process snapshots when running several workers
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5.0, cast=float)
+
+# Request profiling (off by default; see monitoring/profiling.py)
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_HEADER = config('PROFILING_HEADER', default='X-Profile')
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_KEEP = config('PROFILING_KEEP', default=50, cast=int)
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -186,6 +303,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'monitoring.requests': {
+            'handlers': ['console'],
+            'level': config('REQUEST_TIMING_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
     },
 }
 
@@ -6,10 +6,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from api.urls import api_urlpatterns
+from monitoring.views import metrics_view
 
 urlpatterns = [
     path('django-admin/', admin.site.urls),  # Django admin at different path
     path('api/', include(api_urlpatterns)),
+    path('metrics', metrics_view, name='metrics'),
     path('', include('api.urls')),  # Frontend routes (includes custom admin routes)
 ]
 